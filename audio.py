@@ -0,0 +1,238 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Setting this environment variable (to anything but "" or "0") starts the game without sound, like --no-audio
+NO_AUDIO_ENV = "LABYRINTHS_NO_AUDIO"
+
+# Length of the crossfade between two music tracks
+DEFAULT_FADE_MS = 800
+
+# Decoded audio kept in memory; the least recently used sounds beyond this are dropped
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024
+
+# Channels reserved for music: the track playing and the one fading in
+MUSIC_CHANNELS = 2
+
+
+class AudioManager:
+    def __init__(self, directory=None, enabled=True, fade_ms=DEFAULT_FADE_MS, cache_bytes=AUDIO_CACHE_BYTES):
+        """
+        Initialize the AudioManager class.
+
+        Tracks and effects are decoded into mixer.Sound objects on a background thread, ahead of the
+        scene that needs them, so starting one never reads the disk on the main loop. Music plays on two
+        reserved channels, which lets a new track fade in while the old one fades out.
+
+        pygame is only imported, and the audio device opened, by start, on that same thread: neither
+        delays the first frame, and nothing is loaded for scripts and tests that never start audio.
+        Every call is safe without an audio device or with a missing file: the game simply stays silent,
+        and what went wrong is kept in `errors`.
+
+        :param directory: is the folder the audio files are in, the game's folder by default.
+        :param enabled: is False to never load pygame or play anything (--no-audio).
+        :param fade_ms: is the length of the crossfade between tracks.
+        :param cache_bytes: is the amount of decoded audio kept in memory.
+        """
+        self.directory = directory if directory is not None else os.path.dirname(os.path.abspath(__file__))
+        self.fade_ms = fade_ms
+        self.cache_bytes = cache_bytes
+        self.enabled = enabled and os.environ.get(NO_AUDIO_ENV, "") in ("", "0")
+        self.available = False  # True once the mixer is running
+        self.mixer = None  # pygame.mixer, once imported
+        self.errors = {}  # File name (or "mixer") -> why it cannot be played
+        self.music = None  # Name of the track playing or about to play
+
+        self._sounds = OrderedDict()  # File name -> Future of its mixer.Sound, least recently used first
+        self._executor = None
+        self._opening = None  # Future of the background import and device initialization
+        self._channels = []
+        self._current = 0  # Index of the music channel playing the current track
+        self._pending_music = None  # Track to start as soon as it is decoded
+        self._pending_effects = []  # Effects to play as soon as they are decoded
+
+    def start(self, wait=False):
+        """
+        Import pygame and start the mixer on the background thread. Without an audio device the manager
+        stays silent instead of failing.
+
+        :param wait: is True to block until the mixer is running, or has failed to start.
+        :return: is True if audio is available (always False when not waiting, until the next update).
+        """
+        if not self.enabled:
+            return False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-preload")
+            self._opening = self._executor.submit(self._open)
+        if wait:
+            self._opening.exception()
+        return self._check_opened()
+
+    def preload(self, *names):
+        """
+        Decode audio files in the background so they can start without touching the disk.
+
+        :param names: are the file names, relative to the audio directory.
+        """
+        if not self.enabled or self._executor is None:
+            return
+        for name in names:
+            if name in self._sounds:
+                self._sounds.move_to_end(name)
+            else:
+                self._sounds[name] = self._executor.submit(self._decode, name)
+
+    def is_loaded(self, name):
+        future = self._sounds.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def play_music(self, name, loops=-1):
+        """
+        Crossfade to a music track. If it is still being decoded it starts once ready, without waiting.
+
+        :param name: is the file name of the track.
+        :param loops: is the number of extra times to play it, -1 to loop forever.
+        """
+        if not self.enabled or name == self.music:
+            return
+        self.music = name
+        self.preload(name)
+        self._pending_music = (name, loops)
+        self.update()
+
+    def stop_music(self):
+        """
+        Fade the current track out.
+        """
+        self.music = None
+        self._pending_music = None
+        if self.available:
+            self._channels[self._current].fadeout(self.fade_ms)
+
+    def play_effect(self, name):
+        """
+        Play a short sound over the music, as soon as it is decoded.
+        """
+        if not self.enabled:
+            return
+        self.preload(name)
+        self._pending_effects.append(name)
+        self.update()
+
+    def update(self):
+        """
+        Start whatever finished decoding since the last call. Called once per tick by the game loop.
+        """
+        if not self._check_opened():
+            return
+
+        if self._pending_music is not None:
+            name, loops = self._pending_music
+            sound = self._ready(name)
+            if sound is not None or name in self.errors:
+                self._pending_music = None
+                old, new = self._channels[self._current], self._channels[1 - self._current]
+                old.fadeout(self.fade_ms)
+                if sound is not None:
+                    new.play(sound, loops=loops, fade_ms=self.fade_ms)
+                    self._current = 1 - self._current
+
+        waiting = []
+        for name in self._pending_effects:
+            sound = self._ready(name)
+            if sound is not None:
+                sound.play()
+            elif name not in self.errors:
+                waiting.append(name)
+        self._pending_effects = waiting
+
+        self._evict()
+
+    def memory_footprint(self):
+        """
+        Return the estimated number of bytes of decoded audio held in memory.
+        """
+        if not self.available:
+            return 0
+        return sum(self._sound_bytes(future.result()) for future in self._sounds.values()
+                   if future.done() and future.exception() is None)
+
+    def shutdown(self):
+        """
+        Stop the preload thread and the mixer.
+        """
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        if self.available:
+            self.mixer.quit()
+        self.available = False
+        self._sounds.clear()
+
+    def _open(self):
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Its banner would be printed over the curses screen
+        import pygame
+        from pygame import mixer
+
+        try:
+            mixer.init()
+        except pygame.error as error:
+            raise OSError(str(error)) from None
+        mixer.set_reserved(MUSIC_CHANNELS)
+        self._channels = [mixer.Channel(index) for index in range(MUSIC_CHANNELS)]
+        self.mixer = mixer
+
+    def _check_opened(self):
+        """
+        Return True once the mixer is running. If it could not start, audio is turned off for good.
+        """
+        if self.available:
+            return True
+        if self._opening is None or not self._opening.done():
+            return False
+        if self._opening.exception() is not None:
+            self.errors["mixer"] = str(self._opening.exception())
+            self.shutdown()
+            self.enabled = False
+            return False
+        self.available = True
+        return True
+
+    def _decode(self, name):
+        path = os.path.join(self.directory, name)
+        if self.mixer is None:
+            raise OSError("audio is not available")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{name} is missing")
+        return self.mixer.Sound(path)
+
+    def _ready(self, name):
+        """
+        Return the decoded sound if it is ready, recording the error if it could not be decoded.
+        """
+        future = self._sounds.get(name)
+        if future is None or not future.done():
+            return None
+        if future.exception() is not None:
+            self.errors[name] = str(future.exception())
+            return None
+        return future.result()
+
+    def _sound_bytes(self, sound):
+        frequency, size, channels = self.mixer.get_init()
+        return int(sound.get_length() * frequency * channels * abs(size) // 8)
+
+    def _evict(self):
+        """
+        Drop the least recently used decoded sounds while over the memory budget, never the music playing.
+        """
+        total = self.memory_footprint()
+        for name in list(self._sounds):
+            if total <= self.cache_bytes:
+                break
+            future = self._sounds[name]
+            if name == self.music or not future.done() or future.exception() is not None:
+                continue
+            total -= self._sound_bytes(future.result())
+            del self._sounds[name]
@@ -0,0 +1,243 @@
+import copy
+import os
+import queue
+import struct
+import threading
+import zlib
+import save_format
+from game_state import GameState
+
+# The latest snapshot, in the save file format, and the moves made since it was written
+SNAPSHOT_FILE = "autosave.sav"
+JOURNAL_FILE = "autosave.journal"
+
+# How often the game asks the writer to fold the journal into a new snapshot
+COMPACT_SECONDS = 5
+
+# Journal records: kind, payload length and CRC-32 of the payload, then the payload (save_format values).
+# Every record holds absolute state (a scene, a position), so replaying one twice is harmless.
+RECORD = struct.Struct("<BHI")
+NEW_GAME, SCENE, MOVE, FINISHED = 1, 2, 3, 4
+
+# Writer thread commands, queued alongside the records
+_COMPACT, _FLUSH, _STOP = "compact", "flush", "stop"
+
+
+def apply_record(state, kind, value):
+    """
+    Apply one journal record to a game state.
+
+    :param state: is the GameState built so far, or None before the first record.
+    :return: is the updated state, or None once the game was finished.
+    """
+    if kind == NEW_GAME:
+        return GameState(None, None, player_name=value)
+    if state is None or kind == FINISHED:
+        return None
+    if kind == SCENE:
+        state.set_current_scene(value)
+        state.set_player_position(None)
+        state.set_window_data({})
+    elif kind == MOVE:
+        state.set_window_data(value)
+        state.set_player_position(value.get("player"))
+    return state
+
+
+def read_journal(data):
+    """
+    Yield the (kind, value) records of a journal. A record cut short by a crash, and anything after it, is ignored.
+    """
+    offset = 0
+    while offset + RECORD.size <= len(data):
+        kind, length, crc = RECORD.unpack_from(data, offset)
+        payload = data[offset + RECORD.size:offset + RECORD.size + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            return
+        yield kind, save_format.decode_value(payload)
+        offset += RECORD.size + length
+
+
+class AutoSave:
+    def __init__(self, directory=".", snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE, enabled=True):
+        """
+        Initialize the AutoSave class.
+
+        Moves and scene transitions are queued by the game loop and written to an append-only journal by a
+        background thread, so the game never waits on the disk. When asked to compact, the writer saves
+        the state the journal adds up to as a snapshot and empties the journal. Continuing a game loads
+        the snapshot and replays what was journaled after it; while the writer runs, the game keeps that
+        state up to date itself as it queues records, so continuing never waits for the writer to catch up.
+
+        :param directory: is the folder the snapshot and journal are kept in.
+        :param snapshot_file: is the file name of the snapshot.
+        :param journal_file: is the file name of the journal.
+        :param enabled: is False to never write anything, as when a recorded session is replayed.
+        """
+        self.snapshot_path = os.path.join(directory, snapshot_file)
+        self.journal_path = os.path.join(directory, journal_file)
+        self.enabled = enabled
+        self.records = 0  # Records written by the writer thread
+        self.compactions = 0
+        self.error = None  # Last I/O error of the writer; autosaving stops after one
+        self._state = None  # What the snapshot and journal add up to; only touched by the writer thread
+        self._latest = None  # What the records queued so far add up to; only touched by the game thread
+        self._journaled = 0  # Records written since the last snapshot
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._last_move = None  # Window data of the last queued move, to skip batches where the player did not move
+
+    def start(self):
+        """
+        Start the writer thread, continuing from what is on disk.
+        """
+        if self._thread is not None or not self.enabled:
+            return
+        # Read before the writer starts, once for each thread, so neither ever waits on the other
+        self._state = self._read()
+        self._latest = self._read()
+        self._thread = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+        self._thread.start()
+
+    def new_game(self, player_name):
+        self._put((NEW_GAME, player_name))
+
+    def record_scene(self, scene):
+        self._last_move = None
+        self._put((SCENE, scene))
+
+    def record_move(self, window):
+        """
+        Queue the player's position in a scene window, if it changed since the last call. Never blocks.
+        """
+        if self._thread is None or not hasattr(window, "get_window_data"):
+            return
+        data = window.get_window_data()
+        if data != self._last_move:
+            self._last_move = data
+            self._put((MOVE, data))
+
+    def finish(self):
+        """
+        Record that the story ended, so there is nothing left to continue.
+        """
+        self._put((FINISHED, None))
+
+    def compact(self):
+        """
+        Ask the writer to fold the journal into a new snapshot. Driven by TickScheduler.every.
+        """
+        self._put((_COMPACT, None))
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued so far is on disk. For tests and before reading the files back.
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def stop(self):
+        """
+        Write what is queued, compact, and stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self.compact()
+        self._queue.put((_STOP, None))
+        self._thread.join()
+        self._thread = None
+
+    def restore(self):
+        """
+        Return the game to continue: the latest snapshot with the journal written after it replayed, and
+        whatever is still queued for the writer. Never waits on the writer thread.
+
+        :return: is the GameState to continue from, or None if there is no game to continue.
+        """
+        state = copy.deepcopy(self._latest) if self._thread is not None else self._read()
+        if state is None or not state.get_current_scene():
+            return None
+        return state
+
+    def _read(self):
+        """
+        Load the latest snapshot and replay the journal written after it.
+        """
+        try:
+            state = GameState.load(self.snapshot_path)
+        except save_format.SaveError:
+            state = None  # A snapshot is only replaced whole, but never trust a damaged file
+        try:
+            with open(self.journal_path, "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            journal = b""
+        for kind, value in read_journal(journal):
+            state = apply_record(state, kind, value)
+        return state
+
+    def _put(self, item):
+        if self._thread is not None and self.error is None:
+            self._queue.put(item)
+            if item[0] != _COMPACT:
+                self._latest = apply_record(self._latest, *item)
+
+    def _run(self):
+        try:
+            with open(self.journal_path, "ab") as journal:
+                while True:
+                    items = [self._queue.get()]
+                    while True:
+                        try:
+                            items.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    for kind, value in items:
+                        if kind == _STOP:
+                            return
+                        elif kind == _FLUSH:
+                            journal.flush()
+                            value.set()
+                        elif kind == _COMPACT:
+                            self._compact(journal)
+                        else:
+                            self._write(journal, kind, value)
+                    journal.flush()
+        except (OSError, save_format.SaveError) as error:
+            self.error = error
+        finally:
+            # Nobody may wait forever on a writer that is gone
+            while True:
+                try:
+                    kind, value = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == _FLUSH:
+                    value.set()
+
+    def _write(self, journal, kind, value):
+        payload = save_format.encode_value(value)
+        journal.write(RECORD.pack(kind, len(payload), zlib.crc32(payload)) + payload)
+        self._state = apply_record(self._state, kind, value)
+        self._journaled += 1
+        self.records += 1
+
+    def _compact(self, journal):
+        if self._journaled == 0:
+            return
+        if self._state is None:
+            if os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)  # The story was finished: nothing to continue
+        elif self._state.get_current_scene() is None:
+            return  # A new game that has not reached its first scene; the journal keeps it until then
+        else:
+            self._state.save(self.snapshot_path)
+        # The snapshot is in place before the journal is emptied; a crash in between only replays it twice
+        journal.flush()
+        journal.seek(0)
+        journal.truncate()
+        self._journaled = 0
+        self.compactions += 1
@@ -0,0 +1,522 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import fov
+import headless
+import maze_cache
+import maze_files
+import maze_gen
+import random
+import solver
+import utils
+from display_windows import Battle_Window, House_Window
+from entity import Entity
+from game_loop import TickScheduler
+from game_state import GameState
+from input_handler import InputHandler, LatencyMeter
+from windows import Windows
+from world import pursuer, wanderer
+
+# Baselines are committed next to this file; results of each run can be written anywhere with --output.
+# A baseline is always a full run: --quick times fewer rounds on smaller inputs, so it only checks call counts.
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+FORMAT_VERSION = 1
+
+# A timing regresses when it is this fraction slower than its baseline (0.25 -> 25% slower) and also
+# slower by more than NOISE_FLOOR_SECONDS, so sub-microsecond timings don't fail on scheduler jitter.
+# On shared or noisy machines, loosen it for the run with --threshold; call counts are the strict gate either way.
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR_SECONDS = 1e-6
+
+# Timed rounds per measurement; the fastest round is kept, so more rounds filter out more interference.
+# A full run also repeats the whole suite and keeps each timing's fastest run, since a slow spell of the
+# machine can outlast every round of one measurement.
+ROUNDS = 11
+QUICK_ROUNDS = 3
+RUNS = 3
+
+# Generated mazes are built at these sizes (cells per side) to show how construction scales
+GENERATED_SIZES = (16, 64, 256, 512)
+QUICK_GENERATED_SIZES = (16, 64)
+
+# Fog of war is walked through these utils mazes and a generated maze of the largest size above,
+# for at most this many steps of the solver's path
+FOG_LEVELS = ("maze2", "maze3")
+FOG_STEPS = 500
+
+# World ticks are measured with this many wandering entities spread over a generated maze
+WORLD_POPULATIONS = (100, 1000, 10000)
+QUICK_WORLD_POPULATIONS = (100, 1000)
+WORLD_MAZE_SIZE = 256
+
+# The shared flow field is refreshed along this many steps of the player, with this many pursuers on the same maze
+FLOW_POPULATIONS = (10, 100, 1000)
+FLOW_STEPS = 200
+
+# The level index is scanned over this many maze files of a generated maze of this size
+LEVEL_INDEX_SIZE = 300
+QUICK_LEVEL_INDEX_SIZE = 50
+LEVEL_MAZE_SIZE = 64
+
+# Metric names end in "_seconds" for timings, compared against the threshold, or in "_calls" for
+# call counts, which are deterministic and must never grow. Any other metric is informational.
+TIMING_SUFFIX = "_seconds"
+COUNT_SUFFIX = "_calls"
+
+# A fake terminal big enough for every scene, like the 40 x 140 terminals the game is played in
+TERMINAL_HEIGHT, TERMINAL_WIDTH = 40, 140
+
+TYPE_TEXT_SAMPLE = "Hudson: I'll probably take a walk in the forest.\nIt'll help get my mind off things a little."
+
+
+# Fast functions are called in loops of at least this many seconds, so timer resolution does not dominate
+MIN_ROUND_SECONDS = 0.005
+
+
+def measure(function, repeat=5, number=None):
+    """
+    Time a function.
+
+    :param function: is the function to call without arguments.
+    :param repeat: is the number of timed rounds.
+    :param number: is the number of calls per round; by default it grows until a round takes MIN_ROUND_SECONDS.
+    :return: is the fastest round's seconds per call; slower rounds only measure interference from other processes.
+    """
+    # Like timeit, collections are kept out of the timed rounds: when one lands depends on what ran before
+    gc.collect()
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(function, repeat, number)
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _measure(function, repeat, number):
+    if number is None:
+        number = 1
+        started = time.perf_counter()
+        function()
+        while (time.perf_counter() - started) < MIN_ROUND_SECONDS and number < 10_000:
+            number *= 2
+            started = time.perf_counter()
+            for _ in range(number):
+                function()
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - started) / number)
+    return min(times)
+
+
+def bench_battle_window(stdscr, input_handler, quick=False):
+    """
+    Battle_Window construction for every maze in utils.LEVELS and for generated mazes of increasing size.
+    """
+    results = {}
+    for name, level in utils.LEVELS.items():
+        maze = maze_cache.load(level["maze"])  # Warm, like every construction after the first launch
+
+        def build():
+            return Battle_Window(stdscr, input_handler, maze, *level["view"], *level["start"], exit_position=level["exit"])
+
+        window = build()
+        results[f"battle_window[{name}]"] = {
+            "cells": maze.height * maze.width,
+            "construction_seconds": measure(build, repeat=QUICK_ROUNDS if quick else ROUNDS),
+            "draw_calls": window.draw_calls,
+        }
+
+    for size in QUICK_GENERATED_SIZES if quick else GENERATED_SIZES:
+        maze = maze_gen.generate(size, size, seed=size)
+        results[f"battle_window[generated {size}x{size}]"] = {
+            "cells": maze.height * maze.width,
+            "construction_seconds": measure(lambda: Battle_Window.for_maze(stdscr, input_handler, maze), repeat=3),
+        }
+    return results
+
+
+def bench_entity_move(quick=False):
+    """
+    Entity.move throughput against the walls of the largest utils maze.
+    """
+    level = utils.LEVELS["maze3"]
+    maze = maze_cache.load(level["maze"])
+    pad = headless.FakeWindow(maze.height * 2, maze.width * 2)
+    entity = Entity(pad, *level["start"])
+    directions = ("left", "right", "up", "down") * 250  # Open and blocked moves alike
+
+    def walk():
+        for direction in directions:
+            entity.move(direction, maze.walls)
+
+    seconds = measure(walk, repeat=QUICK_ROUNDS if quick else ROUNDS) / len(directions)
+    return {"entity_move": {"move_seconds": seconds, "moves_per_second": 1 / seconds}}
+
+
+def bench_battle_input(stdscr, input_handler, source, burst=1):
+    """
+    Per-key cost of InputHandler.handle_battle_window_input on maze1, and the input-to-display latency.
+
+    :param burst: is the number of keys queued per frame; 1 is a solver bot pressing one key at a
+                  time, more is a held key repeating faster than frames are drawn (random walk).
+    """
+    level = utils.LEVELS["maze1"]
+    window = Battle_Window(stdscr, input_handler, level["maze"], *level["view"], *level["start"], exit_position=level["exit"])
+    window.render()
+    keys = 500  # The solver bot reaches the exit after about 90 keys, then keeps pressing keys around it
+    bot = headless.path_follower(window, seed=0) if burst == 1 else headless.random_walk(seed=0)
+    source.burst, source.count = burst, 0
+    source.set_keys(bot)
+    input_handler.latency = LatencyMeter()
+
+    pad_calls, pad_refreshes, started = window.window.draw_calls, window.window.refreshes, time.perf_counter()
+    while source.count < keys:
+        input_handler.handle_battle_window_input(window)
+    seconds = (time.perf_counter() - started) / source.count
+    latency = input_handler.latency.summary()
+
+    name = "battle_input" if burst == 1 else f"battle_input[burst {burst}]"
+    return {name: {
+        "key_seconds": seconds,
+        "latency_seconds": latency["mean_seconds"],
+        "latency_p95": latency["p95_seconds"],  # Informational, a single slow frame moves it
+        "keys_per_frame": latency["keys_per_batch"],
+        "draw_calls": (window.window.draw_calls - pad_calls) / source.count,
+        "refresh_calls": (window.window.refreshes - pad_refreshes) / source.count,
+    }}
+
+
+def bench_fog(stdscr, input_handler, quick=False):
+    """
+    Battle_Window.update_fog along the solver's path towards the exit: the cost of a step with every visibility
+    computed by shadowcasting (cold) and looked up from the cache (warm), and the curses calls per step.
+    """
+    mazes = {name: (utils.LEVELS[name]["maze"], utils.LEVELS[name]["start"], utils.LEVELS[name]["exit"]) for name in FOG_LEVELS}
+    size = (QUICK_GENERATED_SIZES if quick else GENERATED_SIZES)[-1]
+    generated = maze_gen.generate(size, size, seed=size)
+    mazes[f"generated {size}x{size}"] = (generated, generated.start, generated.exit)
+
+    results = {}
+    for name, (maze, start, exit_position) in mazes.items():
+        window = Battle_Window(stdscr, input_handler, maze, 0, 0, *start, exit_position=exit_position, fog=True)
+        path = solver.bfs(window.maze, start, exit_position)[:FOG_STEPS]
+
+        def walk():
+            window.fov.reset()
+            for window.entity.y, window.entity.x in path:
+                window.update_fog()
+
+        def cold_walk():
+            fov.invalidate(window.maze)
+            walk()
+
+        draw_calls = window.draw_calls
+        walk()
+        draw_calls = (window.draw_calls - draw_calls) / len(path)
+        results[f"fog[{name}]"] = {
+            "steps": len(path),
+            "cold_step_seconds": measure(cold_walk, repeat=3) / len(path),
+            "warm_step_seconds": measure(walk, repeat=QUICK_ROUNDS if quick else ROUNDS) / len(path),
+            "draw_calls": draw_calls,
+        }
+    return results
+
+
+def bench_world(stdscr, input_handler, quick=False):
+    """
+    World.update with more and more wandering entities on a large generated maze: the cost of a tick grows
+    with the entities around the viewport, not with the population.
+    """
+    maze = maze_gen.generate(WORLD_MAZE_SIZE, WORLD_MAZE_SIZE, seed=WORLD_MAZE_SIZE)
+    results = {}
+    for population in QUICK_WORLD_POPULATIONS if quick else WORLD_POPULATIONS:
+        window = Battle_Window.for_maze(stdscr, input_handler, maze)
+        world = window.world
+        rng = random.Random(population)
+        while len(world) < population:
+            y, x = rng.randrange(maze.height), rng.randrange(maze.width)
+            if world.is_free(y, x):
+                world.spawn(y, x, behaviour=wanderer(len(world)))
+        world.update()
+        results[f"world[{population} entities]"] = {
+            "tick_seconds": measure(world.update, repeat=QUICK_ROUNDS if quick else ROUNDS),
+            "updated_per_tick": world.updated,
+            "drawn": len(world.in_rect(window.view_y, window.view_x, window.view_y + window.view_size[0] - 1, window.view_x + window.view_size[1] - 1)),
+        }
+    return results
+
+
+def bench_flow(stdscr, input_handler, quick=False):
+    """
+    World ticks with more and more pursuers while the player walks the solver's path, on a generated maze and
+    maze3: refreshing the shared flow field costs the same whatever the number of pursuers.
+    """
+    generated = maze_gen.generate(WORLD_MAZE_SIZE, WORLD_MAZE_SIZE, seed=WORLD_MAZE_SIZE)
+    mazes = {
+        f"generated {WORLD_MAZE_SIZE}x{WORLD_MAZE_SIZE}": (generated, generated.start, generated.exit),
+        "maze3": (utils.LEVELS["maze3"]["maze"], utils.LEVELS["maze3"]["start"], utils.LEVELS["maze3"]["exit"]),
+    }
+    results = {}
+    for name, (maze, start, exit_position) in mazes.items():
+        for population in FLOW_POPULATIONS:
+            window = Battle_Window(stdscr, input_handler, maze, 0, 0, *start, exit_position=exit_position)
+            world = window.world
+            path = solver.bfs(window.maze, start, exit_position)[:FLOW_STEPS]
+            rng = random.Random(population)
+            while len(world) < population:
+                y, x = rng.randrange(window.maze.height), rng.randrange(window.maze.width)
+                if world.is_free(y, x):
+                    world.spawn(y, x, behaviour=pursuer())
+
+            def walk():
+                flow_seconds = 0.0
+                for window.entity.y, window.entity.x in path:
+                    world.update()
+                    flow_seconds += world.timings["flow_seconds"]
+                return flow_seconds / len(path)
+
+            walk()
+            results[f"flow[{name}, {population} pursuers]"] = {
+                "steps": len(path),
+                "tick_seconds": measure(walk, repeat=QUICK_ROUNDS if quick else ROUNDS, number=1) / len(path),
+                "flow_tick_seconds": min(walk() for _ in range(QUICK_ROUNDS if quick else ROUNDS)),
+                "cells_per_update": world.flow.visited,
+            }
+    return results
+
+
+def bench_house_render(stdscr, input_handler, quick=False):
+    """
+    House_Window.render time and the curses calls one render issues.
+    """
+    house = House_Window(stdscr, input_handler)
+    house.render(Box=True, Walls=True)
+    draw_calls, refresh_calls = house.window.draw_calls, house.window.refreshes
+    return {"house_render": {
+        "render_seconds": measure(lambda: house.render(Box=True, Walls=True), repeat=5 if quick else 20),
+        "draw_calls": draw_calls,
+        "refresh_calls": refresh_calls,
+    }}
+
+
+def bench_type_text():
+    """
+    The curses calls Windows.type_text makes for one narration line, typed without delay.
+    """
+    window = headless.FakeWindow(5, 70)
+    ticks = TickScheduler(realtime=False)
+    asyncio.run(ticks.run(Windows.type_text(window, TYPE_TEXT_SAMPLE, 1, 1, ticks, delay=0)))
+    return {"type_text": {
+        "characters": len(TYPE_TEXT_SAMPLE),
+        "draw_calls": window.draw_calls,
+        "refresh_calls": window.refreshes,
+    }}
+
+
+def bench_save_load(quick=False):
+    """
+    Writing and reading a save file in the binary format, with window data and a small inventory.
+    """
+    state = GameState((4, 150), "battle_scene_2", {"player": (4, 150), "view": (0, 85)}, {"lantern": 1, "key": 2})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "game.sav")
+        state.save(path)
+        return {"save_load": {
+            "bytes": os.path.getsize(path),
+            "save_seconds": measure(lambda: state.save(path), repeat=QUICK_ROUNDS if quick else ROUNDS),
+            "load_seconds": measure(lambda: GameState.load(path), repeat=QUICK_ROUNDS if quick else ROUNDS),
+        }}
+
+
+def bench_level_index(quick=False):
+    """
+    Enumerating a directory of maze files through a LevelIndex, which only reads their headers, and
+    opening one of them: mapping the file and decoding its first row.
+    """
+    maze = maze_gen.generate(LEVEL_MAZE_SIZE, LEVEL_MAZE_SIZE, seed=LEVEL_MAZE_SIZE)
+    count = QUICK_LEVEL_INDEX_SIZE if quick else LEVEL_INDEX_SIZE
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(count):
+            maze_files.write(os.path.join(directory, f"level{number:03}{maze_files.EXTENSION}"), maze, maze.start, maze.exit)
+        path = os.path.join(directory, f"level000{maze_files.EXTENSION}")
+
+        def open_first_row():
+            maze_file = maze_files.MazeFile(path)
+            maze_file[0]
+            maze_file.close()
+
+        return {f"level_index[{count} mazes]": {
+            "bytes_per_maze": os.path.getsize(path),
+            "scan_seconds": measure(lambda: list(maze_files.LevelIndex(directory).values()), repeat=QUICK_ROUNDS if quick else ROUNDS),
+            "open_seconds": measure(open_first_row, repeat=QUICK_ROUNDS if quick else ROUNDS),
+        }}
+
+
+def bench_tick_scheduler(quick=False):
+    """
+    Scheduling jitter of the asyncio game loop while it ticks idle, in seconds late per tick.
+    Informational only: it depends on the machine's load more than on the code.
+    """
+    ticks = TickScheduler(fps=120)
+
+    async def idle():
+        await ticks.sleep(0.25 if quick else 1.0)
+
+    asyncio.run(ticks.run(idle()))
+    jitter = ticks.jitter.summary()
+    return {"tick_scheduler": {
+        "fps": ticks.fps,
+        "ticks": ticks.ticks,
+        "late_ticks": ticks.late_ticks,
+        "jitter_mean": jitter["mean_seconds"],
+        "jitter_p95": jitter["p95_seconds"],
+        "jitter_max": jitter["max_seconds"],
+    }}
+
+
+def run_benchmarks(quick=False):
+    """
+    Run every benchmark headlessly.
+
+    :param quick: is True to use fewer rounds and only the small generated mazes.
+    :return: is a dict of benchmark name to its metrics.
+    """
+    source = headless.KeySource()
+    results = {}
+    with headless.headless_curses(source, TERMINAL_HEIGHT, TERMINAL_WIDTH) as stdscr:
+        input_handler = InputHandler(stdscr)
+        results.update(bench_battle_window(stdscr, input_handler, quick))
+        results.update(bench_entity_move(quick))
+        results.update(bench_battle_input(stdscr, input_handler, source))
+        results.update(bench_battle_input(stdscr, input_handler, source, burst=8))
+        results.update(bench_fog(stdscr, input_handler, quick))
+        results.update(bench_world(stdscr, input_handler, quick))
+        results.update(bench_flow(stdscr, input_handler, quick))
+        results.update(bench_house_render(stdscr, input_handler, quick))
+        results.update(bench_type_text())
+    results.update(bench_save_load(quick))
+    results.update(bench_level_index(quick))
+    results.update(bench_tick_scheduler(quick))
+    return results
+
+
+def fastest(runs):
+    """
+    Merge the results of several runs, keeping the fastest of each timing and the first run's other metrics.
+    """
+    merged = {name: dict(metrics) for name, metrics in runs[0].items()}
+    for results in runs[1:]:
+        for name, metrics in results.items():
+            for metric, value in metrics.items():
+                if metric.endswith(TIMING_SUFFIX) and metric in merged.get(name, {}):
+                    merged[name][metric] = min(merged[name][metric], value)
+    return merged
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, floor=NOISE_FLOOR_SECONDS, timings=True):
+    """
+    Compare results with a baseline.
+
+    :param results: is the dict returned by run_benchmarks.
+    :param baseline: is a dict of the same shape, usually loaded from BASELINE_FILE.
+    :param threshold: is the fraction a timing may grow before it counts as a regression.
+    :param floor: is the number of seconds a timing may grow by regardless of the threshold.
+    :param timings: is False to only compare call counts, for runs not timed like the baseline (--quick).
+    :return: is the list of regressions, as readable strings.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(name, {}).get(metric)
+            if expected is None:
+                continue  # New benchmarks have nothing to regress from
+            if metric.endswith(TIMING_SUFFIX):
+                if timings and value > expected * (1 + threshold) and value - expected > floor:
+                    regressions.append(f"{name} {metric}: {value * 1e6:.1f} us, baseline {expected * 1e6:.1f} us "
+                                       f"(+{(value / expected - 1) * 100:.0f}%)")
+            elif metric.endswith(COUNT_SUFFIX) and value > expected + 1e-9:
+                regressions.append(f"{name} {metric}: {value:g}, baseline {expected:g}")
+    return regressions
+
+
+def report(results, quick=False):
+    """
+    Wrap results with the information needed to compare runs across releases, machines and modes.
+    """
+    return {
+        "version": FORMAT_VERSION,
+        "mode": "quick" if quick else "full",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def print_results(results, file=sys.stdout):
+    for name, metrics in results.items():
+        parts = []
+        for metric, value in metrics.items():
+            if metric.endswith(TIMING_SUFFIX):
+                parts.append(f"{metric}={value * 1e6:.1f}us")
+            else:
+                parts.append(f"{metric}={value:g}")
+        print(f"{name:<36} " + " ".join(parts), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths and check them against a baseline.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed timing growth, as a fraction")
+    parser.add_argument("--quick", action="store_true",
+                        help="fewer rounds and only small generated mazes; checks call counts, not timings")
+    parser.add_argument("--runs", type=int, help=f"runs of the suite to keep the fastest timings of (default {RUNS}, 1 with --quick)")
+    arguments = parser.parse_args(argv)
+    if arguments.quick and arguments.update_baseline:
+        parser.error("baselines are full runs; --update-baseline can't be combined with --quick")
+
+    runs = arguments.runs or (1 if arguments.quick else RUNS)
+    results = fastest([run_benchmarks(arguments.quick) for _ in range(runs)])
+    print_results(results)
+
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            json.dump(report(results, arguments.quick), f, indent=2)
+
+    if arguments.update_baseline:
+        with open(arguments.baseline, "w") as f:
+            json.dump(report(results, arguments.quick), f, indent=2)
+        print(f"Baseline written to {arguments.baseline}")
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        print("No baseline to compare with; run with --update-baseline to store one.")
+        return 0
+    with open(arguments.baseline) as f:
+        baseline = json.load(f)
+    # Timings from a run of the other mode differ in rounds and inputs, so only their call counts are comparable
+    timings = not arguments.quick and baseline.get("mode", "full") == "full"
+    if not timings:
+        print("Quick run: comparing call counts only")
+    regressions = compare(results, baseline["results"], arguments.threshold, timings=timings)
+    for regression in regressions:
+        print(f"REGRESSION  {regression}")
+    print(f"{len(regressions)} regressions against {arguments.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
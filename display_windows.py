@@ -1,14 +1,23 @@
 import curses
-import time
-from windows import Windows
+from windows import Windows, Typewriter
 from input_handler import InputHandler
 from entity import Entity
+from grid import WallGrid
+import maze_cache
+import render
+from tiles import TiledPad, TILED_MAZE_CELLS
+import solver
+from fov import FieldOfView
+from world import World
 
 
 
 
 ##fix
+@InputHandler.register(InputHandler.handle_narration_window_input)
 class Narration_Window(Windows):
+    overlay = True
+
     def __init__(self, stdscr: curses.window, input_handler: InputHandler, name, height = 5, width = 50, box = True):
         super().__init__(stdscr, input_handler)
         self.height = height
@@ -28,35 +37,67 @@ class Narration_Window(Windows):
         
 
 
-    def render_narration(self, narration, delay = 0.03):
-        
+    def relayout(self, height, width):
+        super().relayout(height, width)
+        self.move_window(self.window, self.middle_height + (self.height*2) + 5, self.middle_width - self.width//2)
+
+    def repaint(self):
         if self.box == True:
             self.window.box()
-        text = f"{self.name}: {narration}"
-        Windows.type_text(self.window, text, 1, 1, delay)
+        super().repaint()
+
+    async def narrate(self, narration, ticks, delay = 0.03):
+        """
+        Type a line of narration and wait for Enter, tick by tick, so other coroutines keep running meanwhile. Characters are revealed by elapsed game time and
+        drawn with the tick's frame; Enter completes the line at once.
+
+        :param narration: is the text to show after the speaker's name.
+        :param ticks: is the game_loop.TickScheduler the game runs on.
+        :param delay: is the delay (in seconds) between each character.
+        """
+        if self.box == True:
+            self.window.box()
+        typewriter = Typewriter(self.window, f"{self.name}: {narration}", 1, 1, delay)
+
+        scheduler = self.input_handler.scheduler
+        while True:
+            if typewriter.reveal(ticks.time()):
+                scheduler.mark_window(self.window)  # Drawn with the tick's frame
+            if typewriter.finished:
+                break
+            await ticks.next_tick()
+            if self.handle_input() == 's':
+                typewriter.finish()
+                scheduler.mark_window(self.window)
+                break
+
+        while self.handle_input() != 's':
+            await ticks.next_tick()
 
-        s = self.handle_input()
-        while s != 's':
-            s = self.handle_input()
-        
         self.clear_and_refresh(self.window)
 
 
+@InputHandler.register(InputHandler.handle_battle_window_input)
 class Battle_Window(Windows):
-    def __init__(self, stdscr: curses.window, input_handler: InputHandler, maze,  view_y, view_x, player_y, player_x, view_height = 18, view_width = 64):
+    def __init__(self, stdscr: curses.window, input_handler: InputHandler, maze,  view_y, view_x, player_y, player_x, view_height = 18, view_width = 64, exit_position = (12, 1), fog = False):
 
         
         super().__init__(stdscr, input_handler)
         
     
-        self.maze = maze 
-        self.walls = set()
+        # Compiled once and cached on disk, so unchanged mazes are not re-scanned at startup
+        self.maze = maze_cache.load(maze)
+        self.walls = self.maze.walls
 
+        self.view_size = (view_height, view_width)  # Size of the visible area, in maze cells
         self.viewport_start_y = (self.stdscrheight // 2) - (view_height//2)
         self.viewport_start_x = (self.stdscrwidth // 2) - (view_width//2)
 
         self.view_y, self.view_x = view_y, view_x#0, 85
         self.player_y, self.player_x =player_y, player_x# 4, 150
+        self.exit_position = exit_position
+        self.hint_position = None  # Cell currently showing the hint glyph
+        self.stop_positions = set()  # Screen positions where a batch of moves stops so the game can react
         self.view_height, self.view_width = view_height +self.viewport_start_y, view_width+self.viewport_start_x  # Size of the visible area
 
         # Center the viewport on the screen
@@ -64,34 +105,165 @@ class Battle_Window(Windows):
         # Create the maze pad
         self.box = curses.newwin(view_height + 5, view_width + 10, self.viewport_start_y-2, self.viewport_start_x -5)
         
-        self.window = curses.newpad(len(self.maze)*2, len(self.maze[0])*2)
+        # Under fog of war the pad starts dark and only the cells the player can see are drawn
+        self.fov = FieldOfView(self.maze) if fog else None
+        if self.maze.height * self.maze.width > TILED_MAZE_CELLS:
+            # Very large mazes only keep the tiles around the viewport in memory
+            self.window = TiledPad(self.maze, self.maze.height*2, self.maze.width*2, blank=fog)
+        else:
+            self.window = curses.newpad(self.maze.height*2, self.maze.width*2)
+            if not fog:
+                # Populate the maze with walls and paths, one call per row
+                self.draw_calls += render.draw_rows(self.window, self.maze)
         
         self.entity = Entity(self.window, self.player_y, self.player_x, '@')
-
-        # Populate the maze with walls and paths (simple random generation)
-        for y, row in enumerate(self.maze):
-            for x, char in enumerate(row):
-                self.window.addstr(y, x, char)
-                if char != ' ':  # Add all non-space characters as walls
-                    self.walls.add((y, x))
+        self.world = World(self)  # NPCs and enemies, if the scene has any
 
         
     
     def get_window_data(self):
-        pass
+        """
+        Return what a save needs to put the player back where they were: their cell and the scroll position.
+        """
+        return {"player": (self.entity.y, self.entity.x), "view": (self.view_y, self.view_x)}
+
+    def set_window_data(self, window_data):
+        """
+        Restore the player and the scroll position from get_window_data; missing keys keep the scene's start.
+        """
+        self.window.addch(self.entity.y, self.entity.x, " ")  # In case the player was drawn at the start already
+        self.entity.y, self.entity.x = window_data.get("player", (self.entity.y, self.entity.x))
+        self.view_y, self.view_x = window_data.get("view", (self.view_y, self.view_x))
     
+    def viewport(self):
+        """
+        Return the (pad_y, pad_x, top, left, bottom, right) arguments the pad is refreshed with.
+        """
+        return (self.view_y, self.view_x, self.viewport_start_y, self.viewport_start_x, self.view_height - 1, self.view_width - 1)
+
+    def refresh_viewport(self, cells=None):
+        """
+        Send the visible part of the maze to the terminal in a single update.
+
+        :param cells: is an optional list of (y, x) cells that changed; the whole viewport is sent otherwise.
+        """
+        fog_cells = self.update_fog()
+        scheduler = self.input_handler.scheduler
+        scheduler.mark_pad(self.window, self.viewport(), cells + fog_cells if cells is not None else None)
+        scheduler.flush()
+
+    def update_fog(self):
+        """
+        Under fog of war, reveal what the player sees from where they stand and darken what went out of
+        sight. Only cells whose visibility changed are drawn, one call per run of neighbouring cells in a row.
+
+        :return: is the top-left and bottom-right corners of the area that changed, or [] if nothing did.
+        """
+        if self.fov is None:
+            return []
+        changed = sorted(self.fov.update(self.entity.y, self.entity.x))
+        if not changed:
+            return []
+
+        width, visible = self.maze.width, self.fov.visible
+        left, right = width, 0
+        run_start = previous = changed[0]
+        for index in changed[1:] + [-1]:
+            if index == previous + 1 and index % width:
+                previous = index
+                continue
+            # Draw the run from run_start to previous: maze glyphs where visible, darkness elsewhere
+            y, first = divmod(run_start, width)
+            last = previous - y * width
+            segment = self._row_segment(y, first, last + 1)
+            text = "".join(
+                (segment[x - first] if x - first < len(segment) else " ") if y * width + x in visible else " "
+                for x in range(first, last + 1)
+            )
+            self.window.addstr(y, first, text)
+            self.draw_calls += 1
+            left, right = min(left, first), max(right, last)
+            run_start = previous = index
+        self.entity.draw()
+        # The scheduler only needs the bounding box
+        return [(changed[0] // width, left), (changed[-1] // width, right)]
+
+    def _row_segment(self, y, start, stop):
+        if hasattr(self.maze, "row_segment"):
+            return self.maze.row_segment(y, start, stop)
+        return self.maze[y][start:stop]
+
+    def relayout(self, height, width):
+        """
+        Re-center the viewport and its box on the resized screen. The maze pad is kept as it is.
+        """
+        super().relayout(height, width)
+        view_height, view_width = self.view_size
+        self.viewport_start_y = self.middle_height - view_height//2
+        self.viewport_start_x = self.middle_width - view_width//2
+        self.view_height, self.view_width = view_height + self.viewport_start_y, view_width + self.viewport_start_x
+        self.move_window(self.box, self.viewport_start_y - 2, self.viewport_start_x - 5)
+
+    def repaint(self):
+        self.box.box()
+        self.box.touchwin()
+        self.window.touchwin()
+        self.input_handler.scheduler.mark_window(self.box)
+        self.input_handler.scheduler.mark_pad(self.window, self.viewport())
+
     def render(self):
         self.box.box()
-        self.box.refresh()
+        # Flush stdscr first, otherwise its next getch repaints it over the maze
+        self.input_handler.scheduler.mark_window(self.stdscr)
+        self.input_handler.scheduler.mark_window(self.box)
         self.entity.draw()
-        self.window.refresh(self.view_y, self.view_x, self.viewport_start_y, self.viewport_start_x,  self.view_height - 1,   self.view_width - 1)
+        self.refresh_viewport()
 
     
        
 
+    @classmethod
+    def for_maze(cls, stdscr: curses.window, input_handler: InputHandler, maze, view_height = 18, view_width = 64):
+        """
+        Build a battle window for a maze that knows its own start and exit, such as a maze_gen.GeneratedMaze.
+        The viewport starts scrolled so the player is in view.
+        """
+        player_y, player_x = maze.start
+        view_y = max(0, min(player_y - view_height // 2, maze.height - view_height))
+        view_x = max(0, min(player_x - view_width // 2, maze.width - view_width))
+        return cls(stdscr, input_handler, maze, view_y, view_x, player_y, player_x, view_height, view_width, exit_position=maze.exit)
+
+    def show_hint(self, char = '.'):
+        """
+        Mark the next step towards the exit. The distance field is computed once per maze and
+        cached by the solver, so each hint is an O(1) lookup.
+
+        :return: is the list of pad cells that changed.
+        """
+        cells = self.clear_hint()
+        field = solver.distance_field(self.maze, self.exit_position)
+        step = field.next_step(self.entity.y, self.entity.x)
+        if step is not None:
+            self.window.addch(step[0], step[1], char)
+            self.hint_position = step
+            cells.append(step)
+        return cells
+
+    def clear_hint(self):
+        """
+        Erase the hint glyph, unless the player is standing on it.
+
+        :return: is the list of pad cells that changed.
+        """
+        position, self.hint_position = self.hint_position, None
+        if position is None or position == (self.entity.y, self.entity.x):
+            return []
+        self.window.addch(position[0], position[1], ' ')
+        return [position]
+
     def should_exit(self): #(12,1)
         # Define exit condition: player should be in a specific position
-      return  (self.entity.position() == (12,1))
+      return  (self.entity.position() == self.exit_position)
         
 
 class DisplayWindow(Windows):
@@ -105,26 +277,31 @@ class DisplayWindow(Windows):
         self.window_x = self.middle_width - self.width // 2
         self.window = curses.newwin(self.height, self.width, self.window_y, self.window_x)
         
-        self.walls = set()
+        self.walls = WallGrid(self.height, self.width)
+
+    def relayout(self, height, width):
+        super().relayout(height, width)
+        self.window_y, self.window_x = self.move_window(
+            self.window, self.middle_height - self.height // 2, self.middle_width - self.width // 2)
 
     def render(self, Box = True, Walls = True):
         if Box:
             self.window.box()
 
-        for index, row in enumerate(self.display):
-            display_x = (self.width - len(row)) // 2
-            display_y = self.height // 2 - len(self.display) // 2 + index
-            self.window.addstr(display_y, display_x, row)
+        top = self.height // 2 - len(self.display) // 2
+        self.draw_calls += render.draw_rows(self.window, self.display, top, center_width=self.width)
 
-            if Walls:
-                for i, char in enumerate(row):
-                    if char != ' ':  # Assuming non-empty characters (excluding borders) should be stored as walls
-                        self.walls.add((display_y, display_x + i))
+        if Walls:
+            for index, row in enumerate(self.display):
+                # Assuming non-empty characters (excluding borders) should be stored as walls
+                self.walls.add_row(top + index, (self.width - len(row)) // 2, row)
 
         self.window.refresh()
 
+@InputHandler.register(InputHandler.handle_exit_window_input)
 class ExitWindow(DisplayWindow):
     _instance = None
+    overlay = True
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -143,6 +320,7 @@ class ExitWindow(DisplayWindow):
             super().__init__(stdscr, input_handler, height=10, width=34, display=message)
             self._initialized = True
 
+@InputHandler.register(InputHandler.handle_name_box_input)
 class NameBox(DisplayWindow):
     _instance = None
 
@@ -175,6 +353,7 @@ class NameBox(DisplayWindow):
 
 
 
+@InputHandler.register(InputHandler.handle_house_window_input)
 class House_Window(DisplayWindow):
     def __init__(self, stdscr: curses.window, input_handler: InputHandler, x = 24, y = 4):
         house = [
@@ -202,16 +381,21 @@ class House_Window(DisplayWindow):
         self.entity = Entity(self.window, self.y, self.x, "@")
         
     def get_window_data(self):
-       pass
+        return {"player": (self.entity.y, self.entity.x)}
+
+    def set_window_data(self, window_data):
+        self.entity.y, self.entity.x = window_data.get("player", (self.entity.y, self.entity.x))
+
+    def relayout(self, height, width):
+        super().relayout(height, width)
+        self.entity.begin_y, self.entity.begin_x = self.window.getbegyx()
     
     def render(self, Box=False, Walls=False):
         
 
     
-        for y in range(self.height-1):
-            for x in range(self.width):
-                self.window.addstr(y, x, ';')
-        
+        # Fill the background in a single run instead of one call per cell
+        self.draw_calls += render.fill(self.window, ';', self.height - 1, self.width)
             
         super().render(Box=Box, Walls=Walls)
    
@@ -220,12 +404,17 @@ class House_Window(DisplayWindow):
         self.entity.draw()
         self.window.refresh()
 
-    def animate_scene1st(self):
+    async def animate_scene1st(self, ticks):
+        """
+        Walk the player up five steps, one every 0.08 seconds of game time, without blocking the game loop.
+
+        :param ticks: is the game_loop.TickScheduler the game runs on.
+        """
         self.window.refresh()
         for i in range(5):
             self.entity.move('up', self.walls)
             self.window.refresh()
-            time.sleep(0.08)
+            await ticks.sleep(0.08)
         
         self.render()
 
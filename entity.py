@@ -25,11 +25,13 @@ class Entity:
             new_x += 1
 
         # Check wether the new position is within the wall boundaries and within the screen
-        if (new_y, new_x) not in walls and 0 < new_y < max_y - 1 and 0 < new_x < max_x - 1:
+        if not walls.is_wall(new_y, new_x) and 0 < new_y < max_y - 1 and 0 < new_x < max_x - 1:
             # Erase the character from the old position
             self.window.addch(self.y, self.x, " ")
             self.y, self.x = new_y, new_x
             self.draw()
+            return True
+        return False
 
     def position(self):
         return (self.y + self.begin_y, self.x + self.begin_x)
@@ -0,0 +1,120 @@
+import time
+from array import array
+from collections import deque
+import maze_cache
+import solver
+
+# Enemies further than this many moves from the player have nothing to follow
+FLOW_RADIUS = 48
+
+# Stored for cells the field has never reached
+_UNKNOWN = 2 ** 31 - 1
+
+# The stored distances are rebased before the offset added on every move could overflow them
+_MAX_OFFSET = 2 ** 30
+
+
+class FlowField:
+    def __init__(self, maze, radius=FLOW_RADIUS):
+        """
+        Initialize the FlowField class.
+
+        One distance map from the player's cell, shared by every enemy chasing them: an enemy's next move
+        is the neighbour one step closer, an O(1) lookup, however many enemies there are. The map only
+        reaches `radius` moves from the player, so building it never depends on the size of the maze.
+
+        When the player steps to a neighbouring cell no distance can grow by more than one, so every cell
+        is first pushed one step further in O(1), by raising an offset the stored values are read with,
+        and a breadth-first search from the new cell then only visits the cells that got closer.
+
+        :param maze: is a list of strings or any compiled maze.
+        :param radius: is the number of moves the map reaches from the player.
+        """
+        self.grid = solver.passable_grid(maze_cache.load(maze))  # Shared with the solver, keyed by maze content
+        self.radius = radius
+        self.source = None  # Cell the distances are measured from
+        self.updates = 0  # Moves of the player handled incrementally
+        self.rebuilds = 0  # Times the map was built from scratch
+        self.visited = 0  # Cells set by the last update
+        self.last_seconds = 0.0  # Time taken by the last update
+        self.total_seconds = 0.0
+        self._stored = array("i", [_UNKNOWN]) * len(self.grid.cells)  # Distance minus offset, per cell
+        self._offset = 0
+        width = self.grid.width
+        self._moves = ((1, (0, 1)), (-1, (0, -1)), (width, (1, 0)), (-width, (-1, 0)))  # Index step -> (dy, dx)
+
+    def update(self, y, x):
+        """
+        Move the source of the map to the player's cell. Called once per tick; free when the player did not move.
+        """
+        if (y, x) == self.source:
+            return
+        started = time.perf_counter()
+        width = self.grid.width
+        previous, self.source = self.source, (y, x)
+        # The player can spawn on a glyph: paths through it do not exist once they leave it, so start over then
+        if (previous is not None and abs(previous[0] - y) + abs(previous[1] - x) == 1
+                and self.grid.is_passable(*previous) and self._offset < _MAX_OFFSET):
+            self._offset += 1  # Every distance grows by at most one; the cells that got closer are fixed below
+            self.updates += 1
+        else:
+            self._stored = array("i", [_UNKNOWN]) * len(self.grid.cells)
+            self._offset = 0
+            self.rebuilds += 1
+        self.visited = self._lower(y * width + x)
+        self.last_seconds = time.perf_counter() - started
+        self.total_seconds += self.last_seconds
+
+    def distance(self, y, x):
+        """
+        Return the number of moves from (y, x) to the player, or -1 if it is further than the radius or unreachable.
+        """
+        if not (0 <= y < self.grid.height and 0 <= x < self.grid.width):
+            return -1
+        stored = self._stored[y * self.grid.width + x]
+        if stored == _UNKNOWN or stored + self._offset > self.radius:
+            return -1
+        return stored + self._offset
+
+    def next_step(self, y, x):
+        """
+        Return the (dy, dx) move from (y, x) one step closer to the player, in O(1), or None if there is none.
+        """
+        distance = self.distance(y, x)
+        if distance <= 0:
+            return None
+        stored, target = self._stored, distance - 1 - self._offset
+        index = y * self.grid.width + x
+        for step, move in self._moves:
+            if stored[index + step] == target:
+                return move
+        return None
+
+    def _lower(self, start):
+        """
+        Breadth-first search from the source, setting every cell whose distance went down, up to the radius.
+
+        Only cells that got closer are queued: the cell before one of them on a shortest path got closer too,
+        so the search reaches every cell that has to change and nothing else.
+
+        :return: is the number of cells set.
+        """
+        cells, steps, stored = self.grid.cells, self.grid.steps, self._stored
+        offset, radius = self._offset, self.radius
+        stored[start] = -offset
+        frontier = deque((start,))
+        visited = 1
+        while frontier:
+            index = frontier.popleft()
+            distance = stored[index] + offset + 1
+            if distance > radius:
+                continue
+            for step in steps:
+                neighbour = index + step
+                if cells[neighbour]:
+                    known = stored[neighbour]
+                    if known == _UNKNOWN or known + offset > distance:
+                        stored[neighbour] = distance - offset
+                        frontier.append(neighbour)
+                        visited += 1
+        return visited
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+import maze_cache
+
+# How far the player sees, in columns. Terminal cells are about twice as tall as wide, so rows count double.
+FOV_RADIUS = 16
+
+# Number of visibility sets kept in memory, most recently used last. A set holds the cells seen from one
+# cell, so this covers the ground a player walks over long before any of it is recomputed.
+VISIBILITY_CACHE_SIZE = 2048
+
+# The eight octants, as the (xx, xy, yx, yy) transform from octant coordinates to grid offsets
+_OCTANTS = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+)
+
+_visibility = OrderedDict()  # (maze key, y, x, radius) -> frozenset of visible cell indices
+
+
+def compute_visibility(maze, y, x, radius=FOV_RADIUS):
+    """
+    Find every cell visible from (y, x) with recursive shadowcasting over the maze's walls.
+
+    Each octant is scanned row by row away from the viewer; a wall casts a shadow by narrowing the
+    slopes the next rows are scanned between, so cells behind it are never even looked at. Walls
+    themselves are visible, and cells outside the maze block sight.
+
+    :param maze: is a compiled maze (CompiledMaze, GeneratedMaze) with height, width and walls.
+    :param y: is the row of the viewer.
+    :param x: is the column of the viewer.
+    :param radius: is how far the viewer sees, in columns.
+    :return: is the frozenset of visible cells, as ``y * width + x`` indices.
+    """
+    height, width = maze.height, maze.width
+    is_wall = maze.walls.is_wall
+    limit = radius * radius
+    visible = {y * width + x}
+
+    def blocked(cell_y, cell_x):
+        return not (0 <= cell_y < height and 0 <= cell_x < width) or is_wall(cell_y, cell_x)
+
+    def cast(row, start, end, xx, xy, yx, yy):
+        if start < end:
+            return
+        reach = radius // 2 if yy else radius  # Octants scanned row by row only see half as far
+        new_start = start
+        for distance in range(row, reach + 1):
+            dy = -distance
+            in_shadow = False
+            for dx in range(-distance, 1):
+                left_slope, right_slope = (dx - 0.5) / (dy + 0.5), (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+                offset_y, offset_x = dx * yx + dy * yy, dx * xx + dy * xy
+                cell_y, cell_x = y + offset_y, x + offset_x
+                if offset_x * offset_x + 4 * offset_y * offset_y <= limit and 0 <= cell_y < height and 0 <= cell_x < width:
+                    visible.add(cell_y * width + cell_x)
+
+                if in_shadow:
+                    if blocked(cell_y, cell_x):
+                        new_start = right_slope
+                    else:
+                        in_shadow = False
+                        start = new_start
+                elif blocked(cell_y, cell_x) and distance < reach:
+                    in_shadow = True
+                    cast(distance + 1, start, left_slope, xx, xy, yx, yy)
+                    new_start = right_slope
+            if in_shadow:
+                break
+
+    for octant in _OCTANTS:
+        cast(1, 1.0, 0.0, *octant)
+    return frozenset(visible)
+
+
+def visibility(maze, y, x, radius=FOV_RADIUS):
+    """
+    Return the cells visible from (y, x), cached per maze content, cell and radius.
+
+    :param maze: is a list of strings or any compiled maze.
+    """
+    maze = maze_cache.load(maze)
+    key = (maze_cache.cache_key(maze), y, x, radius)
+    cells = _visibility.get(key)
+    if cells is None:
+        cells = _visibility[key] = compute_visibility(maze, y, x, radius)
+        while len(_visibility) > VISIBILITY_CACHE_SIZE:
+            _visibility.popitem(last=False)
+    else:
+        _visibility.move_to_end(key)
+    return cells
+
+
+def invalidate(maze=None):
+    """
+    Drop the cached visibility of one maze, or of every maze.
+    """
+    if maze is None:
+        _visibility.clear()
+        return
+    key = maze_cache.cache_key(maze_cache.load(maze))
+    for cell_key in [cell_key for cell_key in _visibility if cell_key[0] == key]:
+        del _visibility[cell_key]
+
+
+class FieldOfView:
+    def __init__(self, maze, radius=FOV_RADIUS):
+        """
+        Initialize the FieldOfView class.
+
+        Follows what one viewer sees as they move. Each move looks up the visibility of the new cell
+        and compares it with the previous one, so only cells that came into or went out of view have
+        to be redrawn.
+
+        :param maze: is a list of strings or any compiled maze.
+        :param radius: is how far the viewer sees, in columns.
+        """
+        self.maze = maze_cache.load(maze)
+        self.radius = radius
+        self.origin = None  # Cell the current visibility was computed from
+        self.visible = frozenset()  # Cells in view, as ``y * width + x`` indices
+
+    def is_visible(self, y, x):
+        return 0 <= x < self.maze.width and y * self.maze.width + x in self.visible
+
+    def update(self, y, x):
+        """
+        Move the viewer to (y, x).
+
+        :return: is the set of cells, as ``y * width + x`` indices, that came into or went out of view.
+        """
+        if (y, x) == self.origin:
+            return frozenset()
+        visible = visibility(self.maze, y, x, self.radius)
+        changed = visible ^ self.visible
+        self.origin, self.visible = (y, x), visible
+        return changed
+
+    def reset(self):
+        """
+        Forget what is in view, so the next update shows everything visible again.
+        """
+        self.origin, self.visible = None, frozenset()
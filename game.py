@@ -1,12 +1,19 @@
+import asyncio
 import curses
 import time
-from pygame import mixer
 
 
 from windows import Menu_Window
 from display_windows import ExitWindow, NameBox, House_Window, Narration_Window, Battle_Window
-from input_handler import InputHandler
-from game_state import GameState
+from input_handler import InputHandler, NO_INPUT
+from game_loop import TickScheduler, DEFAULT_FPS
+from game_state import GameState, SAVE_FILE
+from save_format import SaveError
+from audio import AudioManager
+from autosave import AutoSave, COMPACT_SECONDS
+from scenes import SceneRegistry
+import maze_cache
+import solver
 import utils
 
 
@@ -14,6 +21,9 @@ import utils
 # (Global) flag for pause
 GAME_PAUSED = False
 
+# Screen position of the skull engraving in battle_scene_3, which triggers a narration
+SKULL_POSITION = (32, 75)
+
 
 
 
@@ -25,69 +35,139 @@ def setup_game():
     # This could be expanded to include actual setup logic
     return "Game setup complete"
 
-def save_game_state(game):
+def save_game_state(game, filename=SAVE_FILE):
     """
     Saves the current game state to a file.
     """
     try:
-        with open('game_save.txt', 'w') as file:
-            file.write(f"scene:{game.get_current_scene()}\n")
-            file.write(f"position:{game.get_player_position()}\n")
-            # Write any other relevant game state information here
+        game.state.save(filename)
         return "Game state saved"
-    except Exception as e:
+    except (OSError, SaveError) as e:
         return f"Failed to save game state: {e}"
 
-def load_game_state():
+def load_game_state(filename=SAVE_FILE):
     """
-    Loads the game state from a file and returns a message indicating the result.
+    Loads the game state from a file.
+
+    :return: is the loaded GameState (None if it could not be loaded) and a message indicating the result.
     """
     try:
-        with open('game_save.txt', 'r') as file:
-            lines = file.readlines()
-            scene = lines[0].strip().split(':')[1]
-            position = tuple(map(int, lines[1].strip().split(':')[1].strip().split(',')))
-            # Parse any other relevant game state information here
-
-        # For simplicity, we'll just return the loaded data
-        return f"Game state loaded: scene={scene}, position={position}"
-    except Exception as e:
-        return f"Failed to load game state: {e}"
-    
-
+        state = GameState.load(filename)
+    except (OSError, SaveError) as e:
+        return None, f"Failed to load game state: {e}"
+    if state is None:
+        return None, "Failed to load game state: no saved game"
+    return state, f"Game state loaded: scene={state.get_current_scene()}, position={state.get_player_position()}"
 
 
 class Game:
-    def __init__(self, stdscr):
+    def __init__(self, stdscr, fps=DEFAULT_FPS, audio=True, startup=None, realtime=True, autosave=True, fog=False):
         """
         Initialize the game with windows, an input handler, and a game state.
+
+        :param stdscr: is the main window object from curses.
+        :param fps: is the frame rate of the asyncio game loop.
+        :param audio: is False to play without sound (--no-audio); pygame is then never imported.
+        :param startup: is an optional StartupTimer recording the time to the first menu frame.
+        :param realtime: is False to run the game loop as fast as possible, for headless replays.
+        :param autosave: is False to leave the autosave untouched, for replays.
+        :param fog: is True to only show the parts of the mazes the player can see (--fog).
         """
         self.stdscr = stdscr
+        self.fog = fog
         self.input_handler = InputHandler(stdscr)
+        self.ticks = TickScheduler(fps, realtime)  # Runs the menu, the story and background tasks as coroutines
+        self.ticks.on_tick(self.update_world)  # NPCs and enemies move before the frame is drawn
+        self.ticks.on_tick(self.input_handler.scheduler.flush)  # One frame per tick for whatever was marked
+        self.audio = AudioManager(enabled=audio)  # Silent until started by run, and when there is no audio device
+        self.ticks.on_tick(self.audio.update)  # Starts tracks and effects once they are decoded
+        self.autosave = AutoSave(enabled=autosave)  # Journals moves on its writer thread once started by run
+        self.startup = startup
         self.menu_window = Menu_Window(stdscr, self.input_handler)
         self.exit_window = ExitWindow(stdscr, self.input_handler)
         
-        # Initialize house and battle scenes
-        self.house_window_1 = House_Window(stdscr, self.input_handler)
-        self.house_window_2 = House_Window(stdscr, self.input_handler, x=32, y=16)  
-
-        # Initialize battle scenes
-        self.battle_window_1 = Battle_Window(stdscr, self.input_handler, utils.maze1, 0, 30, 6, 59)
-        self.battle_window_10 = Battle_Window(stdscr, self.input_handler, utils.maze10, 0, 30, 6, 63)
-        self.battle_window_2 = Battle_Window(stdscr, self.input_handler, utils.maze2, 10, 90, 15, 150)
-        self.battle_window_3 = Battle_Window(stdscr, self.input_handler, utils.maze3, 0, 85, 4, 125)
+        # Register house and battle scenes; each one is only built when it is first needed
+        self.scenes = SceneRegistry()
+        self.scenes.register("house_scene_1", lambda: House_Window(stdscr, self.input_handler))
+        self.scenes.register("house_scene_2", lambda: House_Window(stdscr, self.input_handler, x=32, y=16))
+
+        self.register_battle_scene("battle_scene_intro", utils.LEVELS["maze10"])
+        self.register_battle_scene("battle_scene_1", utils.LEVELS["maze1"])
+        self.register_battle_scene("battle_scene_2", utils.LEVELS["maze2"])
+        self.register_battle_scene("battle_scene_3", utils.LEVELS["maze3"], stop_positions=[SKULL_POSITION])
+        if startup is not None:
+            startup.mark("window construction")
         
         self.skull_narration_count = False
         
         # Initial game state
         self.state = GameState(player_position=None, scene="house_scene_1")  # Start in the first house scene
 
+    def register_battle_scene(self, name, level, stop_positions=()):
+        """
+        Register a battle scene whose maze (and hint distance field) can be computed ahead of time on the prefetch thread.
+
+        :param name: is the scene id.
+        :param level: is an entry of utils.LEVELS with the maze, initial viewport, start and exit.
+        :param stop_positions: is the screen positions where a batch of queued moves must stop for a scene event.
+        """
+        maze = level["maze"]
+        view_y, view_x = level["view"]
+        player_y, player_x = level["start"]
+        # A maze_files.MazeFile is only mapped while it is compiled; the scene keeps the compiled maze.
+        # get() waits for the prefetch before building, so the two never use the file at the same time.
+        release = getattr(maze, "close", None)
+
+        def prepare():
+            started = time.perf_counter()
+            compiled = maze_cache.load(maze)
+            solver.distance_field(compiled, level["exit"])
+            if release is not None:
+                release()
+            if self.startup is not None:
+                self.startup.add_background("maze build", time.perf_counter() - started)
+
+        def build():
+            window = Battle_Window(self.stdscr, self.input_handler, maze, view_y, view_x, player_y, player_x, exit_position=level["exit"], fog=self.fog)
+            window.stop_positions.update(stop_positions)
+            if release is not None:
+                release()
+            return window
+
+        self.scenes.register(name, build, prepare=prepare)
+
+    # Scenes are looked up through the registry, so they are built on first use
+    @property
+    def house_window_1(self):
+        return self.scenes.get("house_scene_1")
+
+    @property
+    def house_window_2(self):
+        return self.scenes.get("house_scene_2")
+
+    @property
+    def battle_window_10(self):
+        return self.scenes.get("battle_scene_intro")
+
+    @property
+    def battle_window_1(self):
+        return self.scenes.get("battle_scene_1")
+
+    @property
+    def battle_window_2(self):
+        return self.scenes.get("battle_scene_2")
+
+    @property
+    def battle_window_3(self):
+        return self.scenes.get("battle_scene_3")
+
     # State functions
     def get_current_scene(self):
         return self.state.get_current_scene()
 
     def set_current_scene(self, new_scene):
         self.state.set_current_scene(new_scene)
+        self.autosave.record_scene(new_scene)
 
     def set_player_position(self, new_player_position):
         self.state.set_player_position(new_player_position)
@@ -98,8 +178,13 @@ class Game:
     # Save and load game functions
     def save_game(self):
         """
-        This saves the current state of the game.
+        This saves the current state of the game, with the current scene's window data.
         """
+        scene = self.get_current_scene()
+        if self.scenes.is_built(scene):
+            window = self.scenes.get(scene)
+            self.state.set_window_data(window.get_window_data())
+            self.set_player_position((window.entity.y, window.entity.x))
         save_message = save_game_state(self)
         print(save_message)  # Replace with appropriate logging or messaging
 
@@ -107,93 +192,117 @@ class Game:
         """
         This loads the saved game state and restores the game based on the saved scene and data.
         """
-        load_message = load_game_state()
+        state, load_message = load_game_state()
         print(load_message)  # Replace with appropriate logging or messaging
-        if load_message.startswith("Game state loaded"):
-            scene, position = load_message.split(': ')[1].split(', ')
-            self.set_current_scene(scene)
-            self.set_player_position(tuple(map(int, position.strip()[1:-1].split(','))))
+        if state is not None:
+            self.state = state
             self.restore_game_state()
 
     def restore_game_state(self):
         """
         This restores the game based on the current scene stored in the game state.
         """
-        current_scene = self.get_current_scene()
-        if current_scene == "house_scene_1":
-            self.house_window_1.get_window_data()
-            self.house_window_1.render()
-        elif current_scene == "house_scene_2":
-            self.house_window_2.get_window_data()
-            self.house_window_2.render()
-        elif current_scene == "battle_scene_1":
-            self.battle_window_1.get_window_data()
-            self.battle_window_1.render()
-        elif current_scene == "battle_scene_2":
-            self.battle_window_2.set_window_data(self.state.get_window_data())
-            self.battle_window_2.render()
-        elif current_scene == "battle_scene_3":
-            self.battle_window_3.set_window_data(self.state.get_window_data())
-            self.battle_window_3.render()
+        window = self.scenes.get(self.get_current_scene())
+        window.set_window_data(self.state.get_window_data())
+        window.render()
 
     # Pause and menu handling
     def handle_loop_and_exit_menu(self, window_playing):
         """
-        This handles the game loop and displays the exit menu when the game is paused.
+        This handles one batch of input for the scene, or for the exit menu when the game is paused.
+        Each call reads input once, so it works both blocking and on the asyncio game loop.
         """
         window_playing.window.keypad(True)
         global GAME_PAUSED
 
         if GAME_PAUSED:
-            self.exit_window.render()
-            self.exit_window.handle_input()
-            self.exit_window.clear_and_refresh
+            if self.exit_window.handle_input() is NO_INPUT:
+                return  # Still waiting for an answer
+            self.exit_window.clear_and_refresh()
             window_playing.render()
             GAME_PAUSED = False
         else:
+            # One batch of input per pass; the caller checks for the exit in between
             key = window_playing.handle_input()
             if key == 'q':
                 GAME_PAUSED = True
-            else:
-                window_playing.handle_input()
+                self.exit_window.render()
 
-    def run(self):
+    async def wait_for_input(self, window):
         """
-        This starts the game, initializes the mixer for background music, and handles the menu system.
+        Wait, tick by tick, until the window has read a key, and return what its input handler returned.
         """
-        mixer.init()
-        mixer.music.load("Morning.mp3")
-        mixer.music.play(-1)
+        while True:
+            result = window.handle_input()
+            if result is not NO_INPUT:
+                return result
+            await self.ticks.next_tick()
 
-        self.menu_window.render()
+    def run(self):
+        """
+        This starts the game: the menu, the story and every background task run as coroutines on the tick scheduler.
+        """
+        self.input_handler.blocking = False
+        self.audio.start()  # Imports pygame and opens the device in the background, while the menu is drawn
+        # The first mazes are built on the prefetch thread while the player is in the menu
+        self.scenes.prefetch("battle_scene_intro")
+        self.scenes.prefetch("battle_scene_1")
+        self.autosave.start()
+        try:
+            asyncio.run(self.ticks.run(self.main()))
+        finally:
+            self.input_handler.blocking = True
+            self.audio.shutdown()
+            self.autosave.stop()
+
+    async def main(self):
+        """
+        Start the background tasks, then hand over to the menu.
+        """
+        self.ticks.every(COMPACT_SECONDS, self.autosave.compact)  # Folds the autosave journal into a snapshot
+        await self.main_menu()
 
+    async def main_menu(self):
+        """
+        This plays the background music and handles the menu system.
+        """
         while True:
-            option = self.menu_window.handle_input()
+            self.audio.play_music("Morning.mp3")
 
-            if option == "Quit":
-                self.exit_window.render()
-                self.exit_window.handle_input()
-                self.menu_window.clear_and_refresh()
-                self.menu_window.render_open_scroll()
-                self.menu_window.render_menu()
-                self.stdscr.refresh()
+            await self.menu_window.unroll(self.ticks)
+            if self.startup is not None:
+                self.startup.frame_drawn("menu render")  # Includes the scroll opening animation
+
+            while True:
+                option = await self.wait_for_input(self.menu_window)
 
-            elif option == "Continue":
-                pass  # Continue from saved game
+                if option == "Quit":
+                    self.exit_window.render()
+                    await self.wait_for_input(self.exit_window)
+                    self.menu_window.clear_and_refresh()
+                    self.menu_window.render_open_scroll()
+                    self.menu_window.render_menu()
+                    self.stdscr.refresh()
 
-            elif option == "New Game":
-                self.start_new_game()
-                self.skull_narration_count = False
-                self.run()
+                elif option == "Continue":
+                    # Continue the autosaved game; without one the menu stays as it is
+                    if await self.continue_game():
+                        self.skull_narration_count = False
+                        break  # Back to the menu with its music
 
-            elif option == "Settings":
-                pass  # Handle settings
+                elif option == "New Game":
+                    await self.start_new_game()
+                    self.skull_narration_count = False
+                    break  # Back to the menu with its music
 
-            else:
-                self.menu_window.render()
+                elif option == "Settings":
+                    pass  # Handle settings
+
+                else:
+                    await self.menu_window.unroll(self.ticks)
 
     # The new game start and the main game loop
-    def start_new_game(self):
+    async def start_new_game(self):
         """
         Start a new game from the beginning.
         """
@@ -207,207 +316,268 @@ class Game:
         curses.curs_set(0)
         name_box.clear_and_refresh()
 
-        # Initialize the first scene of the new game
+        self.autosave.new_game(name)
+        await self.play_story(name)
+
+    async def continue_game(self):
+        """
+        Continue the autosaved game from the scene and position it was left at.
+
+        :return: is False if there is no game to continue.
+        """
+        state = self.autosave.restore()
+        if state is None:
+            return False
+        self.menu_window.clear_and_refresh()
+        await self.play_story(state.player_name, resume=state)
+        return True
+
+    async def play_story(self, name, resume=None):
+        """
+        Play the story chapter by chapter, from the first scene or from the scene of a saved state.
+
+        :param name: is the player's name, used by the narration.
+        :param resume: is the GameState to continue from; its scene's chapter skips to the player's position.
+        """
+        self.narration_box = Narration_Window(self.stdscr, self.input_handler, name)
+        self.narration_box2 = Narration_Window(self.stdscr, self.input_handler, name, 5, 70, True)
+        chapters = {
+            "house_scene_1": self.chapter_house_scene_1,
+            "battle_scene_1": self.chapter_battle_scene_1,
+            "battle_scene_2": self.chapter_battle_scene_2,
+            "battle_scene_3": self.chapter_battle_scene_3,
+            "house_scene_2": self.chapter_house_scene_2,
+        }
+        first = list(chapters).index(resume.get_current_scene()) if resume is not None else 0
+        for index, chapter in enumerate(list(chapters.values())[first:]):
+            await chapter(resume if index == 0 else None)
+        self.autosave.finish()
+
+    async def chapter_house_scene_1(self, resume=None):
+        """
+        The first house scene: the opening narration, then walking out of the house.
+        """
+        # Initialize the first scene of the new game, and get the first mazes ready in the background
         self.set_current_scene("house_scene_1")
+        self.scenes.prefetch("battle_scene_intro")
+        self.scenes.prefetch("battle_scene_1")
+        self.audio.preload("Dark.mp3", "Door_Slam.mp3")
+        if resume is not None:
+            self.house_window_1.set_window_data(resume.get_window_data())
         self.house_window_1.stdscr.refresh()
         self.house_window_1.render(Box=True, Walls=True)
 
         # Display initial narrative
-        narration_box = Narration_Window(self.stdscr, self.input_handler, name)
-        narration_box.render_narration("“Time is a fickle thing.”\n\n                                Press 'Enter'")
-        time.sleep(0.5)
-        narration_box.render_narration("What could she have meant by that?")
-        time.sleep(0.5)
-        narration_box.render_narration("It is already 5:00.\n")
-        narration_box.render_narration("(sighs) I am getting way too in my head.\n")
-        narration_box.render_narration("I'll probably take a walk in the forest.\nIt'll help get my mind off things a little.")
+        narration_box = self.narration_box
+        if resume is None:
+            await narration_box.narrate("“Time is a fickle thing.”\n\n                                Press 'Enter'", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box.narrate("What could she have meant by that?", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box.narrate("It is already 5:00.\n", self.ticks)
+            await narration_box.narrate("(sighs) I am getting way too in my head.\n", self.ticks)
+            await narration_box.narrate("I'll probably take a walk in the forest.\nIt'll help get my mind off things a little.", self.ticks)
 
         # This is the main game loop for first scene
-        self.main_game_loop(self.house_window_1)
+        await self.play(self.house_window_1)
         self.house_window_1.entity.y = self.house_window_1.y
         self.house_window_1.entity.x = self.house_window_1.x
         self.house_window_1.clear_and_refresh()
+        self.scenes.finish("house_scene_1")
 
-        time.sleep(2)
+        await self.ticks.sleep(2)
 
-        # Transition to the first battle scene
+    async def chapter_battle_scene_1(self, resume=None):
+        """
+        The first maze: the door slams shut behind the player, who has to find another exit.
+        """
+        narration_box2 = self.narration_box2
         self.set_current_scene("battle_scene_1")
-        self.battle_window_10.render()
-
-        narration_box2 = Narration_Window(self.stdscr, self.input_handler, name, 5, 70, True)
-        narration_box2.render_narration("Huh? What is this place?")
-        time.sleep(0.5)
-        narration_box2.render_narration("I must have taken a wrong turn.")
-        mixer.music.stop()
-        time.sleep(0.5)
-        mixer.music.load("Dark.mp3")
-        mixer.music.play(-1)
-
-        narration_box2.render_narration("It is pretty dark and creepy.")
-        narration_box2.render_narration("I should probably head back.")
-
-        # Play through battle_scene_1
-        self.battle_window_1.render()
-        
-        mixer.music.load("Door_Slam.mp3")
-        mixer.music.play()
+        self.scenes.prefetch("battle_scene_2")
+        self.audio.preload("Jazz.mp3")
 
-        narration_box2.render_narration("AHHH!?")
+        if resume is not None:
+            self.battle_window_1.set_window_data(resume.get_window_data())
+            self.battle_window_1.render()
+            self.audio.play_music("Dark.mp3")
+        else:
+            # Transition to the first battle scene
+            self.battle_window_10.render()
 
-        self.battle_window_1.entity.move("right", self.battle_window_1.walls)
-        self.battle_window_1.window.refresh(self.battle_window_1.view_y, self.battle_window_1.view_x, self.battle_window_1.viewport_start_y, self.battle_window_1.viewport_start_x, self.battle_window_1.view_height - 1, self.battle_window_1.view_width - 1)
+            await narration_box2.narrate("Huh? What is this place?", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box2.narrate("I must have taken a wrong turn.", self.ticks)
+            self.audio.stop_music()
+            await self.ticks.sleep(0.5)
+            self.audio.play_music("Dark.mp3")
 
-        narration_box2.render_narration("HEYYY!!\nOPEN THE DOOR!!!")
+            await narration_box2.narrate("It is pretty dark and creepy.", self.ticks)
+            await narration_box2.narrate("I should probably head back.", self.ticks)
 
-        self.battle_window_1.entity.move("right", self.battle_window_1.walls)
-        self.battle_window_1.window.refresh(self.battle_window_1.view_y, self.battle_window_1.view_x, self.battle_window_1.viewport_start_y, self.battle_window_1.viewport_start_x, self.battle_window_1.view_height - 1, self.battle_window_1.view_width - 1)
+            # Play through battle_scene_1
+            self.battle_window_1.render()
+            self.scenes.finish("battle_scene_intro")
 
-        narration_box2.render_narration("Is someone playing a joke on me?")
-        narration_box2.render_narration("I do not have time for this.\nThis is'nt funny.")
+            self.audio.stop_music()
+            self.audio.play_effect("Door_Slam.mp3")
 
-        mixer.music.load("Dark.mp3")
-        mixer.music.play(-1)
+            await narration_box2.narrate("AHHH!?", self.ticks)
 
-        self.battle_window_1.entity.move("left", self.battle_window_1.walls)
-        self.battle_window_1.window.refresh(self.battle_window_1.view_y, self.battle_window_1.view_x, self.battle_window_1.viewport_start_y, self.battle_window_1.viewport_start_x, self.battle_window_1.view_height - 1, self.battle_window_1.view_width - 1)
+            self.battle_window_1.entity.move("right", self.battle_window_1.walls)
+            self.battle_window_1.refresh_viewport()
 
-        self.battle_window_1.entity.move("left", self.battle_window_1.walls)
-        self.battle_window_1.window.refresh(self.battle_window_1.view_y, self.battle_window_1.view_x, self.battle_window_1.viewport_start_y, self.battle_window_1.viewport_start_x, self.battle_window_1.view_height - 1, self.battle_window_1.view_width - 1)
+            await narration_box2.narrate("HEYYY!!\nOPEN THE DOOR!!!", self.ticks)
 
-        time.sleep(.9)
+            self.battle_window_1.entity.move("right", self.battle_window_1.walls)
+            self.battle_window_1.refresh_viewport()
 
-        narration_box2.render_narration("(sighs) It is alright. There must be another exit.")
-        narration_box2.render_narration("I should just keep calm.")
+            await narration_box2.narrate("Is someone playing a joke on me?", self.ticks)
+            await narration_box2.narrate("I do not have time for this.\nThis is'nt funny.", self.ticks)
 
-        
-        
+            self.audio.play_music("Dark.mp3")
 
-    
-        self.main_game_loop(self.battle_window_1)
-        mixer.music.stop()
-        self.battle_window_1.entity.y=self.battle_window_1.player_y
-        self.battle_window_1.entity.x=self.battle_window_1.player_x
+            self.battle_window_1.entity.move("left", self.battle_window_1.walls)
+            self.battle_window_1.refresh_viewport()
 
+            self.battle_window_1.entity.move("left", self.battle_window_1.walls)
+            self.battle_window_1.refresh_viewport()
 
-        # Play through battle_scene_2
+            await self.ticks.sleep(.9)
 
-        self.set_current_scene("battle_scene_2")
-        self.battle_window_2.render()
-        time.sleep(1)
-        mixer.music.load("Jazz.mp3")
-        mixer.music.play(-1)
+            await narration_box2.narrate("(sighs) It is alright. There must be another exit.", self.ticks)
+            await narration_box2.narrate("I should just keep calm.", self.ticks)
 
-        
-        narration_box2.render_narration("This place just keeps getting weirder.")
-        time.sleep(0.5)
-        narration_box2.render_narration("How do I even get out of here?")
-        time.sleep(0.5)
-        narration_box2.render_narration("There has to be a way out.")
-        time.sleep(0.5)
+        await self.play(self.battle_window_1)
+        self.audio.stop_music()
+        self.battle_window_1.entity.y=self.battle_window_1.player_y
+        self.battle_window_1.entity.x=self.battle_window_1.player_x
+        self.scenes.finish("battle_scene_1")
 
-        
-        self.main_game_loop(self.battle_window_2)
-        mixer.music.stop()
+    async def chapter_battle_scene_2(self, resume=None):
+        """
+        The second maze, to jazz.
+        """
+        narration_box2 = self.narration_box2
+        self.set_current_scene("battle_scene_2")
+        if resume is not None:
+            self.battle_window_2.set_window_data(resume.get_window_data())
+        self.battle_window_2.render()
+        self.scenes.prefetch("battle_scene_3")
+        self.audio.preload("Knock.mp3")
+        await self.ticks.sleep(1)
+        self.audio.play_music("Jazz.mp3")
+
+        if resume is None:
+            await narration_box2.narrate("This place just keeps getting weirder.", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box2.narrate("How do I even get out of here?", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box2.narrate("There has to be a way out.", self.ticks)
+            await self.ticks.sleep(0.5)
+
+        await self.play(self.battle_window_2)
+        self.audio.stop_music()
         self.battle_window_2.entity.y=self.battle_window_2.player_y
         self.battle_window_2.entity.x=self.battle_window_2.player_x
+        self.scenes.finish("battle_scene_2")
 
-    
-
-        # Transition to the third battle scene
-
+    async def chapter_battle_scene_3(self, resume=None):
+        """
+        The third maze, with the skull engraved on its floor.
+        """
+        narration_box2 = self.narration_box2
         self.set_current_scene("battle_scene_3")
+        if resume is not None:
+            self.battle_window_3.set_window_data(resume.get_window_data())
         self.battle_window_3.render()
-        time.sleep(1)
-        mixer.music.load("Knock.mp3")
-        mixer.music.play(-1)
+        await self.ticks.sleep(1)
+        self.audio.play_music("Knock.mp3")
 
         # Play through battle_scene_3
-
-        
-        narration_box2.render_narration("I must be close to the end now.")
-        time.sleep(0.5)
-        narration_box2.render_narration("This place feels different. Is it... colder?")
-        time.sleep(0.5)
-        narration_box2.render_narration("I am not sure how much longer I can go.")
-        time.sleep(0.5)
-
-        
-        while True:
-            self.handle_loop_and_exit_menu(self.battle_window_3)
-            if self.battle_window_3.should_exit():
-                break
-            elif self.battle_window_3 == self.battle_window_3 and not self.skull_narration_count:
-                if self.battle_window_3.entity.position() == (32, 75):
-                    self.skull_narration_count = True
-                    narration_box2.render_narration("???")
-                    time.sleep(.5)
-                    narration_box2.render_narration("Why is there a skull engraved on the floor?")
-                    time.sleep(.9)
-                    narration_box2.render_narration("I am really hoping this was simply a design choice.")
-                    break
-        self.main_game_loop(self.battle_window_3)
-        # Transition to final house scene and loop back
-
+        if resume is None:
+            await narration_box2.narrate("I must be close to the end now.", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box2.narrate("This place feels different. Is it... colder?", self.ticks)
+            await self.ticks.sleep(0.5)
+            await narration_box2.narrate("I am not sure how much longer I can go.", self.ticks)
+            await self.ticks.sleep(0.5)
+
+        await self.play(self.battle_window_3)
+        if not self.battle_window_3.should_exit():
+            # Stopped on the skull engraving
+            await narration_box2.narrate("???", self.ticks)
+            await self.ticks.sleep(.5)
+            await narration_box2.narrate("Why is there a skull engraved on the floor?", self.ticks)
+            await self.ticks.sleep(.9)
+            await narration_box2.narrate("I am really hoping this was simply a design choice.", self.ticks)
+            await self.play(self.battle_window_3)
+        self.scenes.finish("battle_scene_3")
+
+    async def chapter_house_scene_2(self, resume=None):
+        """
+        Back in the house, where the story loops back to the menu.
+        """
+        narration_box2 = self.narration_box2
         self.set_current_scene("house_scene_2")
+        if resume is not None:
+            self.house_window_2.set_window_data(resume.get_window_data())
         self.house_window_2.render()
-        self.house_window_2.animate_scene1st()
+        if resume is None or "player" not in resume.get_window_data():
+            await self.house_window_2.animate_scene1st(self.ticks)
+            self.autosave.record_move(self.house_window_2)  # Continuing from here skips the walk in
 
-        
-        narration_box2.render_narration("How am I back here?")
-        time.sleep(0.5)
-        
-    
-        narration_box2.render_narration("What happened?")
-        
-        mixer.music.stop()
-        narration_box2.render_narration("What is the time?")
-        time.sleep(0.5)
+        await narration_box2.narrate("How am I back here?", self.ticks)
+        await self.ticks.sleep(0.5)
 
+        await narration_box2.narrate("What happened?", self.ticks)
 
+        self.audio.stop_music()
+        await narration_box2.narrate("What is the time?", self.ticks)
+        await self.ticks.sleep(0.5)
 
-    def main_game_loop(self, window_playing):
+    def update_world(self):
         """
-        The core game loop for each scene.
+        Move the NPCs and enemies of the scene being played, and mark what changed for this tick's frame.
         """
-        while True:
-            self.handle_loop_and_exit_menu(window_playing)
-            if window_playing.should_exit():
-                break
-            elif window_playing == self.battle_window_3 and not self.skull_narration_count:
-                if self.battle_window_3.entity.position() == (32, 75):
-                    self.skull_narration_count = True
-                    break
-
-    # This is scene-specific resume functions
-    def resume_game(self):
+        scene = self.get_current_scene()
+        if not self.scenes.is_built(scene):
+            return
+        window = self.scenes.get(scene)
+        world = getattr(window, "world", None)
+        if world:
+            changed = world.update()
+            if changed:
+                self.input_handler.scheduler.mark_pad(window.window, window.viewport(), changed)
+
+    def scene_step(self, window_playing):
         """
-        Resume the game from the saved scene.
+        One pass of the game loop: handle a batch of input.
+
+        :return: is True when the scene is over, or when it stopped for the skull narration.
         """
-        current_scene = self.get_current_scene()
-        if current_scene == "house_scene_1":
-            self.resume_house_scene_1()
-        elif current_scene == "house_scene_2":
-            self.resume_house_scene_2()
-        elif current_scene == "battle_scene_1":
-            self.resume_battle_scene_1()
-        elif current_scene == "battle_scene_2":
-            self.resume_battle_scene_2()
-        elif current_scene == "battle_scene_3":
-            self.resume_battle_scene_3()
+        self.handle_loop_and_exit_menu(window_playing)
+        self.autosave.record_move(window_playing)  # Queued for the writer thread, never written here
+        if window_playing.should_exit():
+            return True
+        elif self.get_current_scene() == "battle_scene_3" and not self.skull_narration_count:
+            if self.battle_window_3.entity.position() == SKULL_POSITION:
+                self.skull_narration_count = True
+                return True
+        return False
 
-    def resume_house_scene_1(self):
+    def main_game_loop(self, window_playing):
         """
-        Resume the first house scene.
+        The core game loop for each scene, blocking on input.
         """
-        self.house_window_1.render()
-        self.main_game_loop(self.house_window_1)
+        while not self.scene_step(window_playing):
+            pass
 
-    def resume_battle_scene_1(self):
+    async def play(self, window_playing):
         """
-        Resume the first battle scene.
+        The core game loop for each scene as a coroutine: one pass per tick, so other coroutines keep running.
         """
-        self.battle_window_1.render()
-        self.main_game_loop(self.battle_window_1)
+        while not self.scene_step(window_playing):
+            await self.ticks.next_tick()
 
 # This initialize curses and runs the game
 if __name__ == "__main__":
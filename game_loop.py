@@ -0,0 +1,134 @@
+import asyncio
+import inspect
+import math
+from input_handler import LatencyMeter
+
+# Frames per second the game loop ticks at, unless the player picks another rate
+DEFAULT_FPS = 30
+
+
+class TickScheduler:
+    def __init__(self, fps=DEFAULT_FPS, realtime=True):
+        """
+        Initialize the TickScheduler class.
+
+        Drives the asyncio game loop at a fixed rate. Coroutines wait for the next tick (input
+        reading, narration, scene loops) or for a number of seconds rounded up to a tick; after they
+        have run, the tick callbacks run (rendering), so each tick is input, update, then one frame.
+
+        Game time is counted in ticks, so the same keys on the same ticks always play out the same way;
+        that is what lets a recorded session be replayed, in real time or as fast as possible.
+
+        :param fps: is the number of ticks per second.
+        :param realtime: is False to tick as fast as possible instead of waiting for each tick's slot.
+        """
+        self.fps = fps
+        self.realtime = realtime
+        self.period = 1 / fps
+        self.ticks = 0
+        self.late_ticks = 0  # Ticks that started more than a whole period late; the missed slots are skipped
+        self.jitter = LatencyMeter()  # How late each tick started compared with its slot
+        self._tick_callbacks = []
+        self._waiters = []  # Futures resolved at the next tick
+        self._tasks = set()
+
+    def on_tick(self, callback):
+        """
+        Call a function at the end of every tick, after the coroutines woken by the tick have run.
+        """
+        self._tick_callbacks.append(callback)
+
+    def spawn(self, coroutine):
+        """
+        Run a coroutine alongside the game, such as an ambient effect. It is cancelled when the loop stops.
+
+        :return: is the asyncio task.
+        """
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def every(self, seconds, callback):
+        """
+        Call a function (or coroutine function) periodically in the background, such as a timer or an autosave.
+
+        :param seconds: is the time between calls, rounded up to whole ticks.
+        :return: is the asyncio task, which can be cancelled.
+        """
+        async def repeat():
+            while True:
+                await self.sleep(seconds)
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+        return self.spawn(repeat())
+
+    def next_tick(self):
+        """
+        Return a future resolved at the next tick, with the tick number.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        return future
+
+    def time(self):
+        """
+        Return the game time in seconds: the number of ticks so far times the tick period.
+        """
+        return self.ticks * self.period
+
+    async def sleep(self, seconds):
+        """
+        Wait the given number of seconds of game time, rounded up to whole ticks. Replaces time.sleep inside coroutines.
+        """
+        target = self.ticks + max(1, math.ceil(seconds * self.fps - 1e-9))
+        while self.ticks < target:
+            await self.next_tick()
+
+    async def run(self, main):
+        """
+        Run a coroutine with the tick loop until it returns; background tasks are then cancelled.
+
+        :param main: is the coroutine to run, usually the game's main menu.
+        :return: is what the coroutine returned.
+        """
+        ticker = asyncio.ensure_future(self._tick_loop())
+        try:
+            return await main
+        finally:
+            ticker.cancel()
+            tasks = [ticker, *self._tasks]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _tick_loop(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        slot = 0
+        while True:
+            if self.realtime:
+                slot += 1
+                target = start + slot * self.period
+                delay = target - loop.time()
+                await asyncio.sleep(max(0, delay))
+
+                lateness = loop.time() - target
+                self.jitter.record(lateness)
+                if lateness > self.period:
+                    # A slow frame or a blocking call: skip the missed slots instead of ticking in a burst
+                    self.late_ticks += 1
+                    slot += int(lateness // self.period)
+            else:
+                await asyncio.sleep(0)  # Fast-forward: let other tasks run, but do not wait for the slot
+            self.ticks += 1
+
+            waiters, self._waiters = self._waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(self.ticks)
+            await asyncio.sleep(0)  # Let the woken coroutines run before the frame is drawn
+
+            for callback in self._tick_callbacks:
+                callback()
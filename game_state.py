@@ -1,11 +1,15 @@
-import pickle
+import save_format
+
+# Default save file, in the binary format of save_format.py
+SAVE_FILE = "game_save.sav"
 
 class GameState:
-    def __init__(self, player_position, scene, window_data=None, inventory=None):
+    def __init__(self, player_position, scene, window_data=None, inventory=None, player_name=""):
         self._player_position = player_position
         self._scene = scene
         self._window_data = window_data if window_data is not None else {}
         self.inventory = inventory if inventory is not None else {}
+        self.player_name = player_name
 
     def get_current_scene(self):
         return self._scene
@@ -25,14 +29,18 @@ class GameState:
     def set_window_data(self, window_data):
         self._window_data = window_data
 
-    def save(self, filename="savefile.pkl"):
-        with open(filename, "wb") as f:
-            pickle.dump(self, f)
+    def save(self, filename=SAVE_FILE):
+        save_format.save(self, filename)
 
     @staticmethod
-    def load(filename="savefile.pkl"):
+    def load(filename=SAVE_FILE):
+        """
+        Load a saved game state.
+
+        :return: is the GameState, or None if there is no save file. A corrupt one raises save_format.SaveError.
+        """
         try:
-            with open(filename, "rb") as f:
-                return pickle.load(f)
+            fields = save_format.load(filename)
         except FileNotFoundError:
             return None
+        return GameState(fields["position"], fields["scene"], fields["window_data"], fields["inventory"], fields["player_name"])
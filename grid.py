@@ -0,0 +1,93 @@
+import sys
+
+
+class WallGrid:
+    __slots__ = ("height", "width", "cells")
+
+    def __init__(self, height: int, width: int, cells: bytearray = None):
+        """
+        Initialize the WallGrid class.
+
+        A compact walkability grid: one byte per cell, indexed ``y * width + x``.
+        A cell holding 1 is a wall, 0 is open floor.
+
+        :param height: is the number of rows in the grid.
+        :param width: is the number of columns in the grid.
+        :param cells: is an optional pre-built bytearray of ``height * width`` cells.
+        """
+        self.height = height
+        self.width = width
+        self.cells = cells if cells is not None else bytearray(height * width)
+
+    @classmethod
+    def from_rows(cls, rows, origin_y=0, origin_x=0, height=None, width=None):
+        """
+        Build a grid from a list of maze strings, marking every non-space character as a wall.
+
+        :param rows: is the list of strings describing the maze.
+        :param origin_y: is the row in the grid where the first string is placed.
+        :param origin_x: is the column in the grid where every string starts.
+        :param height: is the optional grid height (defaults to fit the rows).
+        :param width: is the optional grid width (defaults to the longest row).
+        :return: is the new WallGrid.
+        """
+        if height is None:
+            height = origin_y + len(rows)
+        if width is None:
+            width = origin_x + max((len(row) for row in rows), default=0)
+        grid = cls(height, width)
+        for y, row in enumerate(rows):
+            grid.add_row(origin_y + y, origin_x, row)
+        return grid
+
+    def add_row(self, y, x, row):
+        """
+        Mark every non-space character of a string as a wall, starting at (y, x).
+        """
+        if not 0 <= y < self.height:
+            return
+        base = y * self.width
+        for i, char in enumerate(row):
+            if char != ' ' and 0 <= x + i < self.width:
+                self.cells[base + x + i] = 1
+
+    def add(self, y, x):
+        """
+        Mark a single cell as a wall. Cells outside the grid are ignored.
+        """
+        if 0 <= y < self.height and 0 <= x < self.width:
+            self.cells[y * self.width + x] = 1
+
+    def is_wall(self, y, x):
+        """
+        Check whether (y, x) is a wall. Cells outside the grid are open, like a missing entry in a set.
+        """
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return self.cells[y * self.width + x] == 1
+        return False
+
+    def __contains__(self, position):
+        # Keeps `(y, x) in walls` working for callers written against the old set of tuples
+        y, x = position
+        return self.is_wall(y, x)
+
+    def __len__(self):
+        return self.cells.count(1)
+
+    def memory_footprint(self):
+        """
+        Return the number of bytes held by the grid object and its cell buffer.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.cells)
+
+    @staticmethod
+    def set_memory_footprint(walls):
+        """
+        Return the number of bytes held by a set of (y, x) tuples, for comparison with a WallGrid.
+
+        :param walls: is a set of (y, x) tuples.
+        """
+        size = sys.getsizeof(walls)
+        for position in walls:
+            size += sys.getsizeof(position) + sum(sys.getsizeof(value) for value in position)
+        return size
@@ -0,0 +1,322 @@
+import argparse
+import curses
+import curses.textpad
+import random
+import statistics
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+ARROW_KEYS = (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_LEFT, curses.KEY_RIGHT)
+STEP_KEYS = {(-1, 0): curses.KEY_UP, (1, 0): curses.KEY_DOWN, (0, -1): curses.KEY_LEFT, (0, 1): curses.KEY_RIGHT}
+
+
+class BotExhausted(Exception):
+    """Raised by a KeySource when its bot has no more keys to press."""
+
+
+class KeySource:
+    def __init__(self, keys=(), max_keys=None, burst=1):
+        """
+        Initialize the KeySource class.
+
+        Hands out the keys every FakeWindow.getch returns, in place of a keyboard.
+
+        :param keys: is an iterable of key codes (a list, or a generator for bots).
+        :param max_keys: is the number of keys after which BotExhausted is raised.
+        :param burst: is the number of keys queued at once, like a held key repeating faster than frames are drawn.
+        """
+        self.keys = iter(keys)
+        self.max_keys = max_keys
+        self.burst = burst
+        self.count = 0
+        self._queued = 0  # Keys of the current burst still waiting to be read without blocking
+
+    def set_keys(self, keys):
+        self.keys = iter(keys)
+
+    def getch(self):
+        """
+        Return the next key, as a blocking getch would.
+        """
+        key = self._next()
+        self._queued = self.burst - 1
+        return key
+
+    def poll(self):
+        """
+        Return the next queued key, or -1 when none is waiting, as getch does in nodelay mode.
+        """
+        if self._queued <= 0:
+            return -1
+        self._queued -= 1
+        try:
+            return self._next()
+        except BotExhausted:
+            self._queued = 0
+            return -1
+
+    def _next(self):
+        if self.max_keys is not None and self.count >= self.max_keys:
+            raise BotExhausted()
+        try:
+            key = next(self.keys)
+        except StopIteration:
+            raise BotExhausted() from None
+        self.count += 1
+        return key
+
+
+class FakeWindow:
+    def __init__(self, height, width, begin_y=0, begin_x=0, source=None):
+        """
+        Initialize the FakeWindow class.
+
+        A stand-in for a curses window or pad that accepts every call the game makes without a terminal.
+        Drawing is discarded; input comes from the shared KeySource.
+
+        :param height: is the number of rows of the window.
+        :param width: is the number of columns of the window.
+        :param begin_y: is the screen row of the window's top-left corner.
+        :param begin_x: is the screen column of the window's top-left corner.
+        :param source: is the KeySource getch reads from.
+        """
+        self.height = height
+        self.width = width
+        self.begin_y = begin_y
+        self.begin_x = begin_x
+        self.source = source
+        self.no_delay = False
+        self.draw_calls = 0
+        self.refreshes = 0
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def getbegyx(self):
+        return self.begin_y, self.begin_x
+
+    def getch(self):
+        if self.source is None:
+            return -1
+        return self.source.poll() if self.no_delay else self.source.getch()
+
+    def addch(self, *args):
+        self.draw_calls += 1
+
+    def addstr(self, *args):
+        self.draw_calls += 1
+
+    def refresh(self, *args):
+        self.refreshes += 1
+
+    def noutrefresh(self, *args):
+        self.refreshes += 1
+
+    def mvwin(self, y, x):
+        self.begin_y, self.begin_x = y, x
+
+    def resize(self, height, width):
+        self.height, self.width = height, width
+
+    # Calls whose effect only matters on a real terminal
+    def box(self, *args):
+        pass
+
+    def clear(self):
+        pass
+
+    def erase(self):
+        pass
+
+    def touchwin(self):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        self.no_delay = flag
+
+    def timeout(self, delay):
+        pass
+
+
+class headless_curses:
+    def __init__(self, source, height=24, width=80):
+        """
+        Initialize the headless_curses context manager.
+
+        Swaps the curses functions the game calls directly (newwin, newpad, doupdate, curs_set, Textbox)
+        for fake ones while the block runs, and yields the fake stdscr.
+
+        :param source: is the KeySource every fake window reads keys from.
+        :param height: is the height of the fake terminal.
+        :param width: is the width of the fake terminal.
+        """
+        self.source = source
+        self.stdscr = FakeWindow(height, width, source=source)
+        self._saved = {}
+
+    def __enter__(self):
+        source = self.source
+        replacements = {
+            (curses, "newwin"): lambda height, width, y=0, x=0: FakeWindow(height, width, y, x, source),
+            (curses, "newpad"): lambda height, width: FakeWindow(height, width, source=source),
+            (curses, "doupdate"): lambda: None,
+            (curses, "curs_set"): lambda visibility: None,
+            (curses, "update_lines_cols"): lambda: None,
+            (curses.textpad, "Textbox"): lambda window: _FakeTextbox(),
+        }
+        for (module, name), replacement in replacements.items():
+            self._saved[(module, name)] = getattr(module, name)
+            setattr(module, name, replacement)
+        return self.stdscr
+
+    def __exit__(self, *exc_info):
+        for (module, name), original in self._saved.items():
+            setattr(module, name, original)
+        return False
+
+
+class _FakeTextbox:
+    def edit(self, validate=None):
+        return "Bot"
+
+
+def random_walk(seed):
+    """
+    Yield random arrow keys forever.
+    """
+    rng = random.Random(seed)
+    while True:
+        yield rng.choice(ARROW_KEYS)
+
+
+def path_follower(window, seed=None):
+    """
+    Yield the arrow key that moves a battle window's player one step closer to its exit.
+    Falls back to a random key when the solver has no step to offer, or for scenes without a maze.
+    """
+    import solver
+
+    if not hasattr(window, "maze"):
+        yield from random_walk(seed)
+        return
+
+    rng = random.Random(seed)
+    field = solver.distance_field(window.maze, window.exit_position)
+    while True:
+        entity = window.entity
+        step = field.next_step(entity.y, entity.x)
+        if step is None:
+            yield rng.choice(ARROW_KEYS)
+        else:
+            yield STEP_KEYS[(step[0] - entity.y, step[1] - entity.x)]
+
+
+BOTS = {
+    "random": lambda window, seed: random_walk(seed),
+    "solver": path_follower,
+}
+
+
+def run_session(job):
+    """
+    Play one scene to its exit headlessly through Game.main_game_loop.
+
+    :param job: is a dict with the "scene" id, the "bot" name, the "seed", "max_moves" and optionally "fog".
+    :return: is a result dict with the moves made, the time taken and whether the scene was completed or crashed.
+    """
+    from game import Game
+
+    source = KeySource(max_keys=job["max_moves"])
+    result = {"scene": job["scene"], "bot": job["bot"], "seed": job["seed"], "completed": False, "error": None}
+    started = time.perf_counter()
+    try:
+        with headless_curses(source) as stdscr:
+            game = Game(stdscr, fog=job.get("fog", False))
+            game.set_current_scene(job["scene"])
+            window = game.scenes.get(job["scene"])
+            window.render()
+            source.set_keys(BOTS[job["bot"]](window, job["seed"]))
+
+            started = time.perf_counter()
+            while not window.should_exit():
+                game.main_game_loop(window)  # Returns early once for the skull narration in battle_scene_3
+            result["completed"] = True
+    except BotExhausted:
+        pass
+    except Exception:
+        result["error"] = traceback.format_exc(limit=5)
+
+    result["seconds"] = time.perf_counter() - started
+    result["moves"] = source.count
+    return result
+
+
+def summarize(results):
+    """
+    Aggregate session results into moves per second, completion times per scene and crashes.
+    """
+    total_moves = sum(result["moves"] for result in results)
+    total_seconds = sum(result["seconds"] for result in results)
+    summary = {
+        "sessions": len(results),
+        "completed": sum(result["completed"] for result in results),
+        "crashes": [result for result in results if result["error"]],
+        "moves": total_moves,
+        "moves_per_second": total_moves / total_seconds if total_seconds else 0.0,
+        "scenes": {},
+    }
+    for scene in sorted({result["scene"] for result in results}):
+        times = [result["seconds"] for result in results if result["scene"] == scene and result["completed"]]
+        summary["scenes"][scene] = {
+            "completed": len(times),
+            "min": min(times, default=0.0),
+            "median": statistics.median(times) if times else 0.0,
+            "max": max(times, default=0.0),
+        }
+    return summary
+
+
+def print_summary(summary, wall_seconds, file=sys.stdout):
+    print(f"{summary['sessions']} sessions in {wall_seconds:.2f} s: {summary['completed']} completed, "
+          f"{len(summary['crashes'])} crashed", file=file)
+    print(f"{summary['moves']} moves, {summary['moves_per_second']:.0f} moves/s per worker", file=file)
+    for scene, times in summary["scenes"].items():
+        print(f"  {scene:<20} completed={times['completed']:<6} min={times['min'] * 1000:.1f} ms "
+              f"median={times['median'] * 1000:.1f} ms max={times['max'] * 1000:.1f} ms", file=file)
+    for crash in summary["crashes"][:3]:
+        print(f"  crash in {crash['scene']} (seed {crash['seed']}):\n{crash['error']}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play scenes headlessly with bots and report throughput.")
+    parser.add_argument("--scene", action="append", help="scene id to play (repeatable, default: every battle scene)")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="solver")
+    parser.add_argument("--runs", type=int, default=100, help="sessions per scene")
+    parser.add_argument("--max-moves", type=int, default=20000, help="keys a bot may press before giving up")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first session")
+    parser.add_argument("--fog", action="store_true", help="play with fog of war, to load test the field of view")
+    arguments = parser.parse_args(argv)
+
+    scenes = arguments.scene or ["battle_scene_1", "battle_scene_2", "battle_scene_3"]
+    jobs = [
+        {"scene": scene, "bot": arguments.bot, "seed": arguments.seed + run, "max_moves": arguments.max_moves, "fog": arguments.fog}
+        for scene in scenes
+        for run in range(arguments.runs)
+    ]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=arguments.workers) as pool:
+        results = list(pool.map(run_session, jobs, chunksize=max(1, len(jobs) // 64)))
+    summary = summarize(results)
+    print_summary(summary, time.perf_counter() - started)
+    return 1 if summary["crashes"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,105 @@
 import curses
+import time
+import weakref
+from collections import deque
+from render import RenderScheduler
+
+MIN_HEIGHT, MIN_WIDTH = 24, 80  # Minimum terminal size
+
+# Upper bound on the keys applied in one frame, so a stuck key cannot starve the renderer
+MAX_KEYS_PER_BATCH = 64
+
+# Number of recent input-to-display latencies kept for the metric
+LATENCY_SAMPLES = 256
+
+# Arrow keys, as the direction Entity.move takes and the (dy, dx) step it makes
+MOVE_KEYS = {
+    curses.KEY_UP: ('up', -1, 0),
+    curses.KEY_DOWN: ('down', 1, 0),
+    curses.KEY_LEFT: ('left', 0, -1),
+    curses.KEY_RIGHT: ('right', 0, 1),
+}
+
+# Menu keys and how far they move the selection
+MENU_KEYS = {curses.KEY_UP: -1, curses.KEY_DOWN: 1}
+
+# Exit window answers: True quits the game, False closes the window
+EXIT_KEYS = {ord('y'): True, ord('Y'): True, ord('n'): False, ord('N'): False}
+
+# Returned by handlers when no key was waiting, which only happens when InputHandler.blocking is False
+NO_INPUT = object()
+
+PAUSE_KEY = ord('q')
+HINT_KEY = ord('h')
+ENTER_KEY = ord('\n')
+
+
+def display_resize_warning(stdscr):
+    """Displays a warning if the terminal size is too small."""
+    stdscr.clear()  # Clear the screen for the warning message
+    stdscr.addstr(0, 0, "Terminal size is too small. Kindly press a key.", curses.A_BOLD)  # Display the warning
+    stdscr.refresh()
+
+
+class LatencyMeter:
+    def __init__(self, size=LATENCY_SAMPLES):
+        """
+        Initialize the LatencyMeter class.
+
+        Records, for each batch of keys, the time from reading its first key to the end of the frame
+        that shows it. Keys drained behind the first one waited at most this long as well.
+
+        :param size: is the number of recent samples kept.
+        """
+        self.samples = deque(maxlen=size)
+        self.batches = 0
+        self.keys = 0
+
+    def record(self, seconds, keys=1):
+        self.samples.append(seconds)
+        self.batches += 1
+        self.keys += keys
+
+    def last(self):
+        return self.samples[-1] if self.samples else 0.0
+
+    def percentile(self, fraction):
+        """
+        Return the latency below which the given fraction (0 to 1) of recent samples fall.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {
+            "batches": self.batches,
+            "keys": self.keys,
+            "keys_per_batch": self.keys / self.batches if self.batches else 0.0,
+            "mean_seconds": sum(self.samples) / len(self.samples) if self.samples else 0.0,
+            "p95_seconds": self.percentile(0.95),
+            "max_seconds": max(self.samples, default=0.0),
+        }
+
 
 class InputHandler:
-    
+    # Window class -> unbound handler method, filled by the window modules through InputHandler.register
+    handlers = {}
+
+    @classmethod
+    def register(cls, handler):
+        """
+        Class decorator registering the input handler of a window class, once, when the class is defined.
+        Subclasses without their own registration use their closest registered base class.
+
+        :param handler: is the InputHandler method handling that window's input, e.g. InputHandler.handle_menu_input.
+        """
+        def decorator(window_class):
+            cls.handlers[window_class] = handler
+            return window_class
+        return decorator
+
     def __init__(self, stdscr: curses.window):
         """
         Initialize the InputHandler class.
@@ -9,31 +107,147 @@ class InputHandler:
         :param stdscr: is the main window object from curses.
         """
         self.stdscr = stdscr
+        self.scheduler = RenderScheduler()  # Collects dirty regions and flushes them once per frame
+        self.latency = LatencyMeter()  # Input-to-display latency of each batch of keys
+        self.batch_started = None  # When the first key of the current batch was read
+        self.windows = weakref.WeakSet()  # Every live window, re-laid out when the terminal is resized
+        self.scene = None  # The last full-screen window that took input, repainted under overlays after a resize
+        self.resizes = 0
+        self.blocking = True  # False under the asyncio game loop, where handlers return NO_INPUT instead of waiting
+        self.recorder = None  # replay.ReplayRecorder noting every key read, when the session is recorded
+        self.replay = None  # replay.ReplayPlayer handing out recorded keys in place of the keyboard
+
+    def getch(self, curses_window, blocking=True):
+        """
+        Read one key from the window, or from the replay being played, and note it in the recording.
+
+        :param curses_window: is the curses window to read from; its nodelay mode is set by the caller.
+        :param blocking: is False when a key is only taken if one is already waiting.
+        :return: is the key, or -1.
+        """
+        if self.replay is not None:
+            key = self.replay.getch(blocking)
+        else:
+            key = curses_window.getch()
+        if self.recorder is not None and key != -1 and key != curses.KEY_RESIZE:
+            self.recorder.record_key(key)
+        return key
+
+    def read_key(self, curses_window, window):
+        """
+        Wait for a key, handling any terminal resize that arrives first.
+
+        curses turns SIGWINCH into a KEY_RESIZE key, so resizes are handled here in the main loop
+        and nothing has to poll the terminal size.
+
+        :param curses_window: is the curses window to read from.
+        :param window: is the window object taking the input.
+        :return: is the key, or -1 if none was waiting and blocking is False.
+        """
+        if not self.blocking:
+            curses_window.nodelay(True)
+        try:
+            key = self.getch(curses_window, self.blocking)
+            while key == curses.KEY_RESIZE:
+                self.handle_resize(window, nodelay=not self.blocking and curses_window is self.stdscr)
+                key = self.getch(curses_window, self.blocking)
+        finally:
+            if not self.blocking:
+                curses_window.nodelay(False)
+        return key
+
+    def read_keys(self, curses_window, window):
+        """
+        Wait for one key, then drain every key already queued behind it without blocking.
+
+        :param curses_window: is the curses window to read from.
+        :param window: is the window object taking the input.
+        :return: is the list of keys, oldest first; empty if none was waiting and blocking is False.
+        """
+        key = self.read_key(curses_window, window)
+        if key == -1:
+            return []
+        keys = [key]
+        self.batch_started = time.perf_counter()
+
+        curses_window.nodelay(True)
+        try:
+            while len(keys) < MAX_KEYS_PER_BATCH:
+                key = self.getch(curses_window, blocking=False)
+                if key == -1:
+                    break
+                if key == curses.KEY_RESIZE:
+                    self.handle_resize(window, nodelay=curses_window is self.stdscr)
+                    continue
+                keys.append(key)
+        finally:
+            curses_window.nodelay(False)
+        return keys
+
+    def handle_resize(self, window, nodelay=False):
+        """
+        Re-lay out every window for the new terminal size and repaint what is on screen.
+        Windows and pads are moved, not rebuilt. Below the minimum size a warning is shown until the
+        terminal is large enough again, waiting on a blocking getch so no CPU is used meanwhile.
+
+        :param window: is the window object taking input when the resize arrived.
+        :param nodelay: is True when stdscr is in nodelay mode; it is blocking during the wait, then put back.
+        """
+        curses.update_lines_cols()
+        height, width = self.stdscr.getmaxyx()
+        if height < MIN_HEIGHT or width < MIN_WIDTH:
+            self.stdscr.nodelay(False)
+            try:
+                while height < MIN_HEIGHT or width < MIN_WIDTH:
+                    display_resize_warning(self.stdscr)
+                    self.stdscr.getch()
+                    height, width = self.stdscr.getmaxyx()
+            finally:
+                self.stdscr.nodelay(nodelay)
+
+        self.stdscr.clear()
+        self.scheduler.mark_window(self.stdscr)
+        for tracked in list(self.windows):
+            tracked.relayout(height, width)
+
+        if window.overlay and self.scene is not None:
+            self.scene.repaint()
+        window.repaint()
+        self.scheduler.flush()
+        self.resizes += 1
+
+    def finish_batch(self, keys):
+        """
+        Flush the frame for a batch of keys and record its latency.
+        """
+        self.scheduler.flush()
+        self.latency.record(time.perf_counter() - self.batch_started, len(keys))
 
     def handle_input(self, window):
         """
-        Determine the type of window and handle input accordingly.
+        Dispatch input to the handler registered for the window's class.
 
         :param window: is the window object for which input is being handled.
         :return: is the result of input handling, which can vary based on window type.
         """
-        import windows
-        import display_windows
-
-        if isinstance(window, windows.Menu_Window):
-            return self.handle_menu_input(window)
-        elif isinstance(window, display_windows.NameBox):
-            return self.handle_name_box_input(window)
-        elif isinstance(window, display_windows.ExitWindow):
-            return self.handle_exit_window_input(window)
-        elif isinstance(window, display_windows.House_Window):
-            return self.handle_house_window_input(window)
-        elif isinstance(window, display_windows.Narration_Window):
-            return self.handle_narration_window_input(window)
-        elif isinstance(window, display_windows.Battle_Window):
-            return self.handle_battle_window_input(window)
-        else:
-            raise ValueError("Unknown window type")
+        handler = self.handlers.get(type(window))
+        if handler is None:
+            handler = self._resolve_handler(type(window))
+        if not window.overlay:
+            self.scene = window
+        return handler(self, window)
+
+    @classmethod
+    def _resolve_handler(cls, window_class):
+        """
+        Find the handler of a class registered through one of its bases, and cache it for the class.
+        """
+        for base in window_class.__mro__[1:]:
+            handler = cls.handlers.get(base)
+            if handler is not None:
+                cls.handlers[window_class] = handler
+                return handler
+        raise ValueError("Unknown window type")
 
     def handle_menu_input(self, menu_window):
         """
@@ -42,17 +256,18 @@ class InputHandler:
         :param menu_window: is the menu window object where input is being handled.
         :return: is the selected menu option based on user input.
         """
-        key = self.stdscr.getch()
+        key = self.read_key(self.stdscr, menu_window)
+        if key == -1:
+            return NO_INPUT
 
-        if key == curses.KEY_UP and menu_window.selected_row_index > 0:
-            # Move selection up if possible
-            menu_window.selected_row_index -= 1
-        elif key == curses.KEY_DOWN and menu_window.selected_row_index < len(menu_window.menu) - 1:
-            # Move selection down if possible
-            menu_window.selected_row_index += 1
-        elif key == ord('\n'):
+        if key == ENTER_KEY:
             # Return the selected menu option when Enter is pressed
             return menu_window.menu[menu_window.selected_row_index]
+
+        # Move the selection up or down if possible
+        index = menu_window.selected_row_index + MENU_KEYS.get(key, 0)
+        if 0 <= index < len(menu_window.menu):
+            menu_window.selected_row_index = index
         return None
 
     def handle_name_box_input(self, name_box):
@@ -66,7 +281,12 @@ class InputHandler:
             # Convert carriage return to newline if needed
             return 7 if ch == 10 else ch
 
-        name = name_box.text_box.edit(validate_key).strip()
+        if self.replay is not None:
+            name = self.replay.text()
+        else:
+            name = name_box.text_box.edit(validate_key).strip()
+        if self.recorder is not None:
+            self.recorder.record_text(name)
         name_box.clear_and_refresh()
         return name
 
@@ -76,11 +296,15 @@ class InputHandler:
 
         :param exit_window: is the exit window object where input is being handled.
         """
-        key = exit_window.stdscr.getch()
-        if key in (ord('y'), ord('Y')):
+        key = self.read_key(exit_window.stdscr, exit_window)
+        if key == -1:
+            return NO_INPUT
+
+        answer = EXIT_KEYS.get(key)
+        if answer:
             # Exit the program if 'y' or 'Y' is pressed
             raise SystemExit()
-        elif key in (ord('n'), ord('N')):
+        elif answer is False:
             # Close the exit window if 'n' or 'N' is pressed
             exit_window.clear_and_refresh()
 
@@ -91,26 +315,26 @@ class InputHandler:
         :param house_window: is the house window object where input is being handled.
         :return: is the result of the input action, if applicable.
         """
-        key = house_window.window.getch()
-
-        if key == ord('q'):
-            # Return 'q' if 'q' is pressed
-            return 'q'
-        
-
-        # Move the entity based on arrow key input and refresh the window
-        if key == curses.KEY_UP:
-            house_window.entity.move('up', house_window.walls)
-            house_window.entity.window.refresh()
-        elif key == curses.KEY_DOWN:
-            house_window.entity.move('down', house_window.walls)
-            house_window.entity.window.refresh()
-        elif key == curses.KEY_LEFT:
-            house_window.entity.move('left', house_window.walls)
-            house_window.entity.window.refresh()
-        elif key == curses.KEY_RIGHT:
-            house_window.entity.move('right', house_window.walls)
-            house_window.entity.window.refresh()
+        keys = self.read_keys(house_window.window, house_window)
+        if not keys:
+            return NO_INPUT
+
+        # Apply every queued move, then refresh the window once for the whole batch
+        result = None
+        for key in keys:
+            if key == PAUSE_KEY:
+                # Return 'q' if 'q' is pressed
+                result = 'q'
+                break
+
+            move = MOVE_KEYS.get(key)
+            if move is not None and house_window.entity.move(move[0], house_window.walls):
+                self.scheduler.mark_window(house_window.entity.window)
+                if house_window.should_exit():
+                    break  # Keys queued past the door are dropped
+
+        self.finish_batch(keys)
+        return result
 
     def handle_narration_window_input(self, narration_window):
         """
@@ -119,8 +343,10 @@ class InputHandler:
         :param narration_window: is the narration window object where input is being handled.
         :return: is 's' if Enter is pressed, otherwise None.
         """
-        key = narration_window.window.getch()
-        if key == ord('\n'):
+        key = self.read_key(narration_window.window, narration_window)
+        if key == -1:
+            return NO_INPUT
+        if key == ENTER_KEY:
             return 's'
         return None
 
@@ -128,41 +354,63 @@ class InputHandler:
         """
         Handle user input for the battle window, including player movement and viewport scrolling.
 
+        Every key already queued is applied before anything is drawn, so a held arrow key moves the
+        player as fast as the terminal repeats it, with one frame per batch.
+
+        :param battle_window: is the battle window object where input is being handled.
+        """
+        keys = self.read_keys(battle_window.stdscr, battle_window)
+        if not keys:
+            return NO_INPUT
+
+        changed = []
+        result = None
+        for key in keys:
+            if key == PAUSE_KEY:
+                result = 'q'
+                break
+            self.apply_battle_key(battle_window, key, changed)
+            if battle_window.should_exit() or battle_window.entity.position() in battle_window.stop_positions:
+                break  # Let the game loop react before any more moves; the rest of the batch is dropped
+
+        # Send only what changed: the cells the entity or hint touched, or the whole viewport if it scrolled
+        self.scheduler.mark_pad(battle_window.window, battle_window.viewport(), changed)
+        self.finish_batch(keys)
+        return result
+
+    def apply_battle_key(self, battle_window, key, changed):
+        """
+        Apply one key to the battle window without drawing to the terminal.
+
         :param battle_window: is the battle window object where input is being handled.
+        :param key: is the key code.
+        :param changed: is the list the pad cells touched by the key are appended to.
         """
-        # Draw the entity in the battle window
-        battle_window.entity.draw()
-
-        # Capture user input
-        key = battle_window.stdscr.getch()
-
-        # Move the player based on arrow key input and refresh the viewport
-        if key == curses.KEY_UP and battle_window.entity.y > 0:
-            battle_window.entity.move('up', battle_window.walls)
-            battle_window.window.refresh(battle_window.view_y, battle_window.view_x, battle_window.viewport_start_y, battle_window.viewport_start_x, battle_window.view_height - 1, battle_window.view_width - 1)
-        elif key == curses.KEY_DOWN and battle_window.entity.y < len(battle_window.maze) - 1:
-            battle_window.entity.move('down', battle_window.walls)
-            battle_window.window.refresh(battle_window.view_y, battle_window.view_x, battle_window.viewport_start_y, battle_window.viewport_start_x, battle_window.view_height - 1, battle_window.view_width - 1)
-        elif key == curses.KEY_LEFT and battle_window.entity.x > 0:
-            battle_window.entity.move('left', battle_window.walls)
-            battle_window.window.refresh(battle_window.view_y, battle_window.view_x, battle_window.viewport_start_y, battle_window.viewport_start_x, battle_window.view_height - 1, battle_window.view_width - 1)
-        elif key == curses.KEY_RIGHT and battle_window.entity.x  < len(battle_window.maze[0]) - 1:
-            battle_window.entity.move('right', battle_window.walls)
-            battle_window.window.refresh(battle_window.view_y, battle_window.view_x, battle_window.viewport_start_y, battle_window.viewport_start_x, battle_window.view_height - 1, battle_window.view_width - 1)
-        elif key == ord('q'):
-            return 'q'
-        
+        entity = battle_window.entity
+        old_position = (entity.y, entity.x)
+
+        # Move the player based on arrow key input, staying inside the maze
+        move = MOVE_KEYS.get(key)
+        moved = False
+        if move is not None:
+            direction, dy, dx = move
+            if (0 <= entity.y + dy < battle_window.maze.height and 0 <= entity.x + dx < battle_window.maze.width
+                    and battle_window.world.entity_at(entity.y + dy, entity.x + dx) is None):
+                moved = entity.move(direction, battle_window.walls)
+
+        if moved:
+            changed += [old_position, (entity.y, entity.x)]
+            changed += battle_window.clear_hint()
+            changed += battle_window.update_fog()
+        elif key == HINT_KEY:
+            changed += battle_window.show_hint()
 
         # Scroll the viewport when the player reaches the edges
         if battle_window.entity.y - battle_window.view_y < 5 and battle_window.view_y > 0:
             battle_window.view_y -= 1
-        elif battle_window.entity.y + battle_window.viewport_start_y - battle_window.view_y > battle_window.view_height - 5 and battle_window.view_y < len(battle_window.maze)*2 - battle_window.view_height:
+        elif battle_window.entity.y + battle_window.viewport_start_y - battle_window.view_y > battle_window.view_height - 5 and battle_window.view_y < battle_window.maze.height*2 - battle_window.view_height:
             battle_window.view_y += 1
         if battle_window.entity.x - battle_window.view_x < 25 and battle_window.view_x > 0:
             battle_window.view_x -= 1
-        elif battle_window.entity.x + battle_window.viewport_start_x - battle_window.view_x > battle_window.view_width - 25 and battle_window.view_x < len(battle_window.maze[0])*2 - battle_window.view_width:
+        elif battle_window.entity.x + battle_window.viewport_start_x - battle_window.view_x > battle_window.view_width - 25 and battle_window.view_x < battle_window.maze.width*2 - battle_window.view_width:
             battle_window.view_x += 1
-
-        # Redraw the entity and refresh the viewport
-        battle_window.entity.draw()
-        battle_window.window.refresh(battle_window.view_y, battle_window.view_x, battle_window.viewport_start_y, battle_window.viewport_start_x, battle_window.view_height - 1, battle_window.view_width - 1)
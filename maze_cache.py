@@ -0,0 +1,188 @@
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from grid import WallGrid
+
+# Binary artifact layout:
+#   header   -> magic, format version, height, width, size of the encoded rows block
+#   walls    -> height * width bytes, the WallGrid cells as-is
+#   offsets  -> (height + 1) little-endian uint32, start of each row inside the rows block
+#   rows     -> every maze row encoded as UTF-8, back to back
+MAGIC = b"LABM"
+VERSION = 1
+HEADER = struct.Struct("<4sHIII")
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".maze_cache")
+
+# Number of compiled mazes kept in memory, most recently used last. Scenes hold on to their own maze,
+# so this only decides how many of the others are loaded again from the disk cache instead of kept
+LOADED_CACHE_SIZE = 8
+
+_loaded = OrderedDict()  # Content hash -> CompiledMaze
+_lock = threading.Lock()  # Scenes are prefetched on a worker thread while the main thread loads mazes too
+
+
+class CompiledMaze:
+    def __init__(self, key, height, width, walls, offsets, rows):
+        """
+        Initialize the CompiledMaze class.
+
+        Behaves like the original list of strings (len, indexing, iteration), decoding rows on demand.
+
+        :param key: is the content hash the maze was stored under.
+        :param height: is the number of rows in the maze.
+        :param width: is the length of the longest row.
+        :param walls: is the WallGrid built from the maze.
+        :param offsets: is a sequence of height + 1 offsets into the rows buffer.
+        :param rows: is the buffer of UTF-8 encoded rows.
+        """
+        self.key = key
+        self.height = height
+        self.width = width
+        self.walls = walls
+        self._offsets = offsets
+        self._rows = rows
+
+    def encoded_row(self, y):
+        """
+        Return row y as UTF-8 bytes, without decoding it.
+        """
+        return bytes(self._rows[self._offsets[y]:self._offsets[y + 1]])
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self.height))]
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("maze row out of range")
+        return self.encoded_row(y).decode("utf-8")
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self[y]
+
+
+def maze_key(maze):
+    """
+    Return the content hash used to key a maze in the cache.
+
+    :param maze: is the list of strings describing the maze, or a maze_files.MazeFile, hashed without decoding it.
+    """
+    digest = hashlib.sha256(VERSION.to_bytes(2, "little"))
+    rows_data = getattr(maze, "rows_data", None)
+    digest.update(rows_data() if rows_data is not None else "\n".join(maze).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(maze):
+    """
+    Return the key caches of compiled mazes (solver, field of view) store a maze under: its own content
+    key when it has one, as CompiledMaze and GeneratedMaze do, or else the hash of its rows. Never its id,
+    which a later maze can reuse once this one is freed.
+
+    :param maze: is a compiled maze, as returned by load.
+    """
+    key = getattr(maze, "key", None)
+    return key if key is not None else maze_key(maze)
+
+
+def compile_maze(maze):
+    """
+    Turn a maze into its binary artifact.
+
+    :param maze: is the list of strings describing the maze.
+    :return: is the artifact as bytes.
+    """
+    height = len(maze)
+    width = max((len(row) for row in maze), default=0)
+    walls = WallGrid.from_rows(maze, height=height, width=width)
+
+    encoded = [row.encode("utf-8") for row in maze]
+    offsets = [0]
+    for row in encoded:
+        offsets.append(offsets[-1] + len(row))
+    rows = b"".join(encoded)
+
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, height, width, len(rows)),
+        bytes(walls.cells),
+        struct.pack(f"<{height + 1}I", *offsets),
+        rows,
+    ))
+
+
+def parse_artifact(key, data):
+    """
+    Wrap a binary artifact in a CompiledMaze. Only the header is parsed; nothing walks the maze.
+
+    :param key: is the content hash of the maze.
+    :param data: is the artifact as bytes.
+    :return: is the CompiledMaze, or None if the artifact is not valid.
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, height, width, rows_size = HEADER.unpack_from(data)
+    walls_start = HEADER.size
+    offsets_start = walls_start + height * width
+    rows_start = offsets_start + (height + 1) * 4
+    if magic != MAGIC or version != VERSION or len(data) != rows_start + rows_size:
+        return None
+
+    view = memoryview(data)
+    walls = WallGrid(height, width, bytearray(view[walls_start:offsets_start]))
+    offsets = view[offsets_start:rows_start].cast("I")
+    return CompiledMaze(key, height, width, walls, offsets, view[rows_start:])
+
+
+def load(maze, cache_dir=None):
+    """
+    Return the compiled form of a maze, compiling it and storing it in the on-disk cache if needed.
+
+    :param maze: is the list of strings describing the maze, or an already compiled maze.
+    :param cache_dir: is the directory holding the artifacts (defaults to CACHE_DIR).
+    :return: is the CompiledMaze, or the maze itself if it already carries its walls (e.g. a GeneratedMaze).
+    """
+    if getattr(maze, "walls", None) is not None:
+        return maze
+
+    key = maze_key(maze)
+    with _lock:
+        compiled = _loaded.get(key)
+        if compiled is not None:
+            _loaded.move_to_end(key)
+            return compiled
+
+    cache_dir = cache_dir or CACHE_DIR
+    path = os.path.join(cache_dir, key + ".bin")
+
+    compiled = None
+    try:
+        with open(path, "rb") as f:
+            compiled = parse_artifact(key, f.read())
+    except OSError:
+        pass
+
+    if compiled is None:
+        data = compile_maze(maze)
+        compiled = parse_artifact(key, data)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)  # Never leave a half-written artifact behind
+        except OSError:
+            pass  # The cache is only an optimisation, the compiled maze is still usable
+
+    with _lock:
+        compiled = _loaded.setdefault(key, compiled)  # Another thread may have loaded it meanwhile
+        _loaded.move_to_end(key)
+        while len(_loaded) > LOADED_CACHE_SIZE:
+            _loaded.popitem(last=False)
+    return compiled
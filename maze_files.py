@@ -0,0 +1,202 @@
+import mmap
+import os
+from array import array
+from collections.abc import Mapping
+
+# A maze file is one header line followed by the glyph rows, one per line, in UTF-8:
+#   LABYRINTH 1 size=22x65 start=6,59 exit=12,1 view=0,30
+# Positions are (y, x) pad coordinates; view is the top left corner of the initial viewport.
+# Unknown header fields are skipped, so files written by a newer version still load in an older one.
+MAGIC = "LABYRINTH"
+FORMAT_VERSION = 1
+EXTENSION = ".maze"
+
+# The built-in levels are kept here, one file per level, named after the level
+MAZE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mazes")
+
+# A header line is never longer than this; scanning a directory reads no more of each file
+MAX_HEADER_BYTES = 256
+
+
+class MazeFileError(Exception):
+    """Raised when a maze file has no valid header, or fewer rows than its header says."""
+
+
+def format_header(height, width, start, exit_position, view):
+    return (f"{MAGIC} {FORMAT_VERSION} size={height}x{width} start={start[0]},{start[1]} "
+            f"exit={exit_position[0]},{exit_position[1]} view={view[0]},{view[1]}\n")
+
+
+def parse_header(line, path="maze file"):
+    """
+    Parse the header line of a maze file.
+
+    :param line: is the first line of the file, as bytes.
+    :param path: is the name shown in errors.
+    :return: is a dict with the "height", "width", "start", "exit" and "view" of the maze.
+    """
+    fields = line.decode("utf-8", "replace").split()
+    if len(fields) < 2 or fields[0] != MAGIC:
+        raise MazeFileError(f"{path} is not a maze file")
+    if not fields[1].isdigit() or int(fields[1]) > FORMAT_VERSION:
+        raise MazeFileError(f"{path}: maze format {fields[1]} is newer than this game supports ({FORMAT_VERSION})")
+
+    values = dict(field.split("=", 1) for field in fields[2:] if "=" in field)
+    try:
+        height, width = (int(number) for number in values["size"].split("x"))
+        start, exit_position, view = (tuple(int(number) for number in values[key].split(","))
+                                      for key in ("start", "exit", "view"))
+    except (KeyError, ValueError) as error:
+        raise MazeFileError(f"{path}: bad header ({error})") from None
+    return {"height": height, "width": width, "start": start, "exit": exit_position, "view": view}
+
+
+def read_header(path):
+    """
+    Read the header of a maze file without touching its rows.
+    """
+    with open(path, "rb") as f:
+        line = f.readline(MAX_HEADER_BYTES)
+    if not line.endswith(b"\n"):
+        raise MazeFileError(f"{path} is not a maze file")
+    return parse_header(line, path)
+
+
+def write(path, rows, start, exit_position, view=(0, 0)):
+    """
+    Write a maze file.
+
+    :param rows: is the list of strings describing the maze, or any maze that iterates over its rows.
+    :param start: is the (y, x) cell the player starts on.
+    :param exit_position: is the (y, x) cell that finishes the maze.
+    :param view: is the (y, x) top left corner of the initial viewport.
+    """
+    rows = list(rows)
+    width = max((len(row) for row in rows), default=0)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(format_header(len(rows), width, start, exit_position, view))
+        for row in rows:
+            f.write(row + "\n")
+
+
+class MazeFile:
+    def __init__(self, path, header=None):
+        """
+        Initialize the MazeFile class.
+
+        Behaves like the list of strings in the file (len, indexing, iteration). The file is only mapped
+        into memory when a row is first read, and each row is decoded when it is asked for; the offsets of
+        the rows are found by searching the mapping for line breaks, without decoding anything.
+
+        :param path: is the path of the maze file.
+        :param header: is the already parsed header, as returned by read_header, to skip reading it again.
+        """
+        self.path = path
+        header = header or read_header(path)
+        self.height = header["height"]
+        self.width = header["width"]
+        self.start = header["start"]
+        self.exit = header["exit"]
+        self.view = header["view"]
+        self._map = None
+        self._offsets = None  # Start of each row in the mapping, then the end of the last one
+
+    def _rows(self):
+        if self._map is None:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = array("I", [self._map.find(b"\n") + 1])
+            for _ in range(self.height):
+                end = self._map.find(b"\n", offsets[-1])
+                if end < 0:
+                    self.close()
+                    raise MazeFileError(f"{self.path}: the header says {self.height} rows, the file has {len(offsets) - 1}")
+                offsets.append(end + 1)
+            self._offsets = offsets
+        return self._map
+
+    def encoded_row(self, y):
+        """
+        Return row y as UTF-8 bytes, without decoding it.
+        """
+        return self._rows()[self._offsets[y]:self._offsets[y + 1] - 1]
+
+    def rows_data(self):
+        """
+        Return every row as UTF-8, joined by line breaks, the way maze_cache hashes a maze.
+        """
+        return self._rows()[self._offsets[0]:self._offsets[-1] - 1]
+
+    def close(self):
+        """
+        Unmap the file. Safe at any time: the next row read maps it again.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = self._offsets = None
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self.height))]
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("maze row out of range")
+        return self.encoded_row(y).decode("utf-8")
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self[y]
+
+
+class LevelIndex(Mapping):
+    def __init__(self, directory=MAZE_DIR):
+        """
+        Initialize the LevelIndex class.
+
+        Maps level names to the maze files in a directory. Listing the levels only reads the header
+        line of each file, so hundreds of mazes can be enumerated without loading any of them. Each
+        level is a dict with the "maze" (a MazeFile), its initial "view", "start" and "exit".
+
+        :param directory: is the folder holding the maze files; a level is named after its file.
+        """
+        self.directory = directory
+        self._headers = None  # Level name -> (path, header), in name order
+        self._levels = {}  # Level name -> level dict, made the first time the level is asked for
+
+    def _index(self):
+        if self._headers is None:
+            headers = {}
+            for file_name in sorted(os.listdir(self.directory)):
+                name, extension = os.path.splitext(file_name)
+                if extension == EXTENSION:
+                    path = os.path.join(self.directory, file_name)
+                    headers[name] = (path, read_header(path))
+            self._headers = headers
+        return self._headers
+
+    def header(self, name):
+        """
+        Return the header of a level (its size, start, exit and initial viewport) without opening its maze.
+        """
+        return self._index()[name][1]
+
+    def __getitem__(self, name):
+        level = self._levels.get(name)
+        if level is None:
+            path, header = self._index()[name]
+            maze = MazeFile(path, header)
+            level = self._levels[name] = {"maze": maze, "view": maze.view, "start": maze.start, "exit": maze.exit}
+        return level
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self):
+        return len(self._index())
+
+    def __contains__(self, name):
+        return name in self._index()
@@ -0,0 +1,371 @@
+import hashlib
+import random
+import sys
+from array import array
+from grid import WallGrid
+
+# Each cell only stores its own east and south walls; north and west come from the neighbouring cell
+EAST = 1
+SOUTH = 2
+
+# Every cell is drawn 3 columns wide and 2 rows tall, in the same "+--+" / "|" style as the mazes/ files:
+#
+#   +--+--+
+#   |     |
+#   +  +--+
+#
+CELL_WIDTH = 3
+CELL_HEIGHT = 2
+
+
+class GeneratedMaze:
+    def __init__(self, cell_rows, cell_cols, cells, entrance_row, exit_row, seed=None, algorithm=None):
+        """
+        Initialize the GeneratedMaze class.
+
+        Only the wall bits of each cell are kept (one byte per cell). The glyph rows are built on
+        demand, so the maze can be indexed and iterated like a list of strings or a maze file
+        without ever holding all of them at once.
+
+        :param cell_rows: is the number of cells vertically.
+        :param cell_cols: is the number of cells horizontally.
+        :param cells: is a bytearray of EAST/SOUTH wall bits, indexed ``row * cell_cols + col``.
+        :param entrance_row: is the cell row opened on the east border, where the player starts.
+        :param exit_row: is the cell row opened on the west border, where the player leaves.
+        :param seed: is the seed the maze was generated with.
+        :param algorithm: is the name of the algorithm that generated the maze.
+        """
+        self.cell_rows = cell_rows
+        self.cell_cols = cell_cols
+        self.cells = cells
+        self.entrance_row = entrance_row
+        self.exit_row = exit_row
+        self.seed = seed
+        self.algorithm = algorithm
+
+        self.height = cell_rows * CELL_HEIGHT + 1  # Glyph rows
+        self.width = cell_cols * CELL_WIDTH + 1  # Glyph columns
+
+        # Glyph positions, in the same (y, x) form Battle_Window uses for the player and the exit
+        self.start = (entrance_row * CELL_HEIGHT + 1, self.width - 2)
+        self.exit = (exit_row * CELL_HEIGHT + 1, 1)
+        self._key = None
+
+    @property
+    def key(self):
+        """
+        The content hash the solver and field of view caches key this maze by, computed on first use:
+        two mazes with the same cells share it, and a different maze never does.
+        """
+        if self._key is None:
+            digest = hashlib.sha256(repr((self.algorithm, self.seed, self.cell_rows, self.cell_cols,
+                                          self.entrance_row, self.exit_row)).encode("utf-8"))
+            digest.update(bytes(self.cells))
+            self._key = "generated-" + digest.hexdigest()
+        return self._key
+
+    def _row_chars(self, y, first, last):
+        """
+        Build the glyphs of row y that belong to cell columns first..last-1, plus the wall to their left.
+        The result covers glyph columns ``first * CELL_WIDTH`` to ``last * CELL_WIDTH`` inclusive.
+        """
+        cols = self.cell_cols
+        cells = self.cells
+        if y % CELL_HEIGHT == 0:
+            # A "+--+" row: the south walls of the cell row above (or the outer border)
+            cell_row = y // CELL_HEIGHT - 1
+            if cell_row < 0 or cell_row == self.cell_rows - 1:
+                return "+" + "--+" * (last - first)
+            base = cell_row * cols
+            return "+" + "".join("--+" if cells[base + col] & SOUTH else "  +" for col in range(first, last))
+
+        # A "|  |" row: the east walls of this cell row
+        cell_row = y // CELL_HEIGHT
+        base = cell_row * cols
+        if first == 0:
+            west = " " if cell_row == self.exit_row else "|"
+        elif first == cols:
+            west = " " if cell_row == self.entrance_row else "|"
+        else:
+            west = "|" if cells[base + first - 1] & EAST else " "
+        parts = ["  |" if cells[base + col] & EAST else "   " for col in range(first, min(last, cols - 1))]
+        if last == cols:
+            parts.append("   " if cell_row == self.entrance_row else "  |")
+        return west + "".join(parts)
+
+    def row(self, y):
+        """
+        Build glyph row y.
+        """
+        return self._row_chars(y, 0, self.cell_cols)
+
+    def row_segment(self, y, start, stop):
+        """
+        Build glyph columns start..stop-1 of row y, touching only the cells they cover.
+        """
+        start, stop = max(0, start), min(stop, self.width)
+        if start >= stop:
+            return ""
+        first = start // CELL_WIDTH
+        last = min(self.cell_cols, -(-(stop - 1) // CELL_WIDTH))
+        offset = first * CELL_WIDTH
+        return self._row_chars(y, first, max(first, last))[start - offset:stop - offset]
+
+    def is_wall(self, y, x):
+        """
+        Check whether glyph (y, x) is a wall, straight from the cell bits.
+        """
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            return False
+
+        if y % CELL_HEIGHT == 0:
+            if x % CELL_WIDTH == 0:
+                return True  # Every "+" corner
+            cell_row = y // CELL_HEIGHT - 1
+            if cell_row < 0 or cell_row == self.cell_rows - 1:
+                return True
+            return bool(self.cells[cell_row * self.cell_cols + x // CELL_WIDTH] & SOUTH)
+
+        if x % CELL_WIDTH:
+            return False  # Inside a cell
+        cell_row = y // CELL_HEIGHT
+        if x == 0:
+            return cell_row != self.exit_row
+        col = x // CELL_WIDTH - 1
+        if col == self.cell_cols - 1:
+            return cell_row != self.entrance_row
+        return bool(self.cells[cell_row * self.cell_cols + col] & EAST)
+
+    def iter_rows(self):
+        """
+        Yield the glyph rows one at a time.
+        """
+        for y in range(self.height):
+            yield self.row(y)
+
+    def write(self, file):
+        """
+        Stream the maze to a text file, one glyph row per line.
+
+        :param file: is an open text file.
+        """
+        for row in self.iter_rows():
+            file.write(row)
+            file.write("\n")
+
+    @property
+    def walls(self):
+        """
+        The maze itself answers wall checks from its cell bits, so no glyph-sized grid is ever built.
+        """
+        return self
+
+    def __contains__(self, position):
+        y, x = position
+        return self.is_wall(y, x)
+
+    def memory_footprint(self):
+        """
+        Return the number of bytes held by the maze object and its cell bits.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.cells)
+
+    def to_wall_grid(self):
+        """
+        Build a WallGrid of the glyph rows by streaming them, for code that wants the flat bytearray.
+        """
+        walls = WallGrid(self.height, self.width)
+        for y, row in enumerate(self.iter_rows()):
+            walls.add_row(y, 0, row)
+        return walls
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self.row(i) for i in range(*y.indices(self.height))]
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("maze row out of range")
+        return self.row(y)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+
+def _neighbours(index, cols, count):
+    """
+    Return the indices of the cells next to a cell, as (neighbour, cell owning the wall, wall bit).
+    """
+    result = []
+    row, col = divmod(index, cols)
+    if col + 1 < cols:
+        result.append((index + 1, index, EAST))
+    if col > 0:
+        result.append((index - 1, index - 1, EAST))
+    if index + cols < count:
+        result.append((index + cols, index, SOUTH))
+    if row > 0:
+        result.append((index - cols, index - cols, SOUTH))
+    return result
+
+
+def recursive_backtracker(rows, cols, rng):
+    """
+    Carve a maze with a depth-first search, using an explicit stack instead of recursion.
+    """
+    count = rows * cols
+    cells = bytearray([EAST | SOUTH]) * count
+    visited = bytearray(count)
+    stack = array("I", [rng.randrange(count)])
+    visited[stack[0]] = 1
+
+    while stack:
+        index = stack[-1]
+        options = [n for n in _neighbours(index, cols, count) if not visited[n[0]]]
+        if not options:
+            stack.pop()
+            continue
+        neighbour, owner, wall = options[rng.randrange(len(options))]
+        cells[owner] &= ~wall
+        visited[neighbour] = 1
+        stack.append(neighbour)
+
+    return cells
+
+
+def kruskal(rows, cols, rng):
+    """
+    Carve a maze by removing walls in random order whenever they separate two unconnected regions.
+    """
+    count = rows * cols
+    cells = bytearray([EAST | SOUTH]) * count
+    parent = array("I", range(count))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]  # Path halving keeps the trees flat
+            index = parent[index]
+        return index
+
+    # Every interior wall, encoded as cell * 2 + (0 for east, 1 for south)
+    edges = array("I")
+    for index in range(count):
+        if (index + 1) % cols:
+            edges.append(index * 2)
+        if index + cols < count:
+            edges.append(index * 2 + 1)
+    rng.shuffle(edges)
+
+    remaining = count - 1
+    for edge in edges:
+        index, south = divmod(edge, 2)
+        neighbour = index + cols if south else index + 1
+        root_a, root_b = find(index), find(neighbour)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            cells[index] &= ~(SOUTH if south else EAST)
+            remaining -= 1
+            if remaining == 0:
+                break
+
+    return cells
+
+
+def wilson(rows, cols, rng):
+    """
+    Carve a uniform spanning tree with loop-erased random walks.
+
+    The walk remembers only the last direction taken out of each cell, which erases loops for free.
+    """
+    count = rows * cols
+    cells = bytearray([EAST | SOUTH]) * count
+    in_maze = bytearray(count)
+    in_maze[rng.randrange(count)] = 1
+    exit_direction = bytearray(count)  # Direction the walk last left each cell in: 0 east, 1 west, 2 south, 3 north
+    steps = (1, -1, cols, -cols)
+    rand = rng.random
+
+    remaining = count - 1
+    for start in range(count):
+        if in_maze[start]:
+            continue
+
+        # Random walk until the maze is hit, retrying directions that would leave the grid. Directions are
+        # checked by row and column rather than by index step, since on one-column grids east and south
+        # are the same step.
+        index = start
+        while not in_maze[index]:
+            row, col = divmod(index, cols)
+            while True:
+                direction = int(rand() * 4)
+                if (direction == 0 and col + 1 < cols or direction == 1 and col > 0
+                        or direction == 2 and row + 1 < rows or direction == 3 and row > 0):
+                    break
+            exit_direction[index] = direction
+            index += steps[direction]
+
+        # Carve the loop-erased path into the maze
+        index = start
+        while not in_maze[index]:
+            direction = exit_direction[index]
+            neighbour = index + steps[direction]
+            if direction == 0:
+                cells[index] &= ~EAST
+            elif direction == 1:
+                cells[neighbour] &= ~EAST
+            elif direction == 2:
+                cells[index] &= ~SOUTH
+            else:
+                cells[neighbour] &= ~SOUTH
+            in_maze[index] = 1
+            remaining -= 1
+            index = neighbour
+
+        if remaining == 0:
+            break
+
+    return cells
+
+
+ALGORITHMS = {
+    "backtracker": recursive_backtracker,
+    "kruskal": kruskal,
+    "wilson": wilson,
+}
+
+
+def generate(rows, cols, algorithm="backtracker", seed=None):
+    """
+    Generate a maze with an entrance on the east border and an exit on the west border.
+
+    :param rows: is the number of cells vertically.
+    :param cols: is the number of cells horizontally.
+    :param algorithm: is one of "backtracker", "kruskal" or "wilson".
+    :param seed: is the seed for the random generator; the same seed always gives the same maze.
+    :return: is the GeneratedMaze, usable directly as the maze of a Battle_Window.
+    """
+    if rows < 1 or cols < 1:
+        raise ValueError("A maze needs at least one cell")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown maze algorithm: {algorithm}")
+
+    rng = random.Random(seed)
+    cells = ALGORITHMS[algorithm](rows, cols, rng)
+    entrance_row = rng.randrange(rows)
+    exit_row = rng.randrange(rows)
+    return GeneratedMaze(rows, cols, cells, entrance_row, exit_row, seed=seed, algorithm=algorithm)
+
+
+if __name__ == "__main__":
+    # Usage: python maze_gen.py ROWS COLS [ALGORITHM] [SEED] > maze.txt
+    arguments = sys.argv[1:]
+    maze = generate(
+        int(arguments[0]),
+        int(arguments[1]),
+        arguments[2] if len(arguments) > 2 else "backtracker",
+        int(arguments[3]) if len(arguments) > 3 else None,
+    )
+    maze.write(sys.stdout)
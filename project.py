@@ -1,52 +1,38 @@
+from startup import StartupTimer  # First, so the import time below includes every other module
+import argparse
 import curses
-import threading
+import os
 import time
 import sys
 from game import Game
+from game_loop import DEFAULT_FPS
+import replay
 
-MIN_HEIGHT, MIN_WIDTH = 24, 80  # Minimum terminal size
-
-def check_terminal_size(stdscr, exit_event):
-    """Continuously monitors the terminal size for resizing."""
-    previous_size = stdscr.getmaxyx()  # Get the initial terminal size
-
-    while not exit_event.is_set():  # Continue looping until exit_event is set
-        current_size = stdscr.getmaxyx()  # Check the current terminal size
-        if current_size != previous_size:  # If the size has changed
-            previous_size = current_size  # Update the previous size
-            # Check if the current size is below minimum dimensions
-            if current_size[0] < MIN_HEIGHT or current_size[1] < MIN_WIDTH:
-                
-                display_resize_warning(stdscr) 
-                exit_event.set()
-                sys.exit()
-                  # Signal to exit the main thread
-
-        time.sleep(2)  # Sleep for a second to avoid busy waiting
-
-def display_resize_warning(stdscr):
-    """Displays a warning if the terminal size is too small."""
-    stdscr.clear()  # Clear the screen for the warning message
-    stdscr.addstr(0, 0, "Terminal size is too small. Kindly press a key.", curses.A_BOLD)  # Display the warning
-    stdscr.refresh()
-    
-     # Refresh the screen to show the message
-      # Wait for a few seconds before returning
-
-def main(stdscr):
+# Setting this environment variable (to anything but "" or "0") prints the startup report, like --startup-report
+STARTUP_REPORT_ENV = "LABYRINTHS_STARTUP_REPORT"
+
+STARTUP = StartupTimer()
+STARTUP.mark("import")
+
+def main(stdscr, fps=DEFAULT_FPS, audio=True, startup=None, record=None, recording=None, fog=False):
     """Entry point to run the curses-based game."""
     curses.curs_set(0)  # Hide the cursor for a cleaner interface
-    exit_event = threading.Event()  # Initialize the exit event to control thread termination
-    # Start the thread that monitors the terminal size
-    resize_thread = threading.Thread(target=check_terminal_size, args=(stdscr, exit_event))
-    resize_thread.daemon = True  # Set the thread as a daemon to allow program exit
-    resize_thread.start()  # Start the monitoring thread
 
+    recorder = None
     try:
-        game = Game(stdscr)  # Initialize the game
+        game = Game(stdscr, fps, audio, startup, autosave=recording is None, fog=fog)  # Initialize the game
+        if record:
+            recorder = game.input_handler.recorder = replay.ReplayRecorder(game)  # Note every key, saved on exit
+        if recording is not None:
+            game.input_handler.replay = replay.ReplayPlayer(recording, game)  # Play the recorded keys in real time
         game.run()  # Run the game's main loop
     except curses.error as e:
         handle_initialization_error(stdscr, e)  # Handle any curses-related errors
+    except replay.ReplayFinished:
+        pass  # The recorded session is over
+    finally:
+        if recorder is not None:
+            recorder.save(record)
 
      # Exit the program cleanly
 
@@ -58,5 +44,24 @@ def handle_initialization_error(stdscr, error):
     time.sleep(2)  # Wait for a moment before exiting
     sys.exit()  # Exit the program
 
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Labyrinths, a text-based adventure in the terminal.")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS, help=f"frame rate of the game loop (default: {DEFAULT_FPS})")
+    parser.add_argument("--no-audio", action="store_true", help="play without sound and without loading pygame")
+    parser.add_argument("--startup-report", action="store_true",
+                        default=os.environ.get(STARTUP_REPORT_ENV, "") not in ("", "0"),
+                        help="print the time to the first menu frame, by phase, when the game exits")
+    parser.add_argument("--fog", action="store_true", help="fog of war: only show the parts of the mazes the player can see")
+    parser.add_argument("--record", metavar="FILE", help="record every key pressed to a replay file")
+    parser.add_argument("--replay", metavar="FILE", help="play a recorded session back in real time (python replay.py FILE replays it headlessly)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    curses.wrapper(main)  # Start the curses application
+    arguments = parse_arguments()
+    recording = replay.load(arguments.replay) if arguments.replay else None
+    fps = recording.fps if recording is not None else arguments.fps  # A replay ticks at the recorded rate
+    try:
+        curses.wrapper(main, fps, not arguments.no_audio, STARTUP, arguments.record, recording, arguments.fog)  # Start the curses application
+    finally:
+        if arguments.startup_report:
+            STARTUP.print_report()
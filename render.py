@@ -0,0 +1,177 @@
+import curses
+from collections import Counter
+
+
+class CallCounter:
+    def __init__(self, window):
+        """
+        Initialize the CallCounter class.
+
+        Wraps a curses window and counts every method call made through it, so the number of
+        curses calls a scene issues can be compared before and after a change.
+
+        :param window: is the curses window (or pad) to wrap.
+        """
+        self._window = window
+        self.counts = Counter()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._window, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self.counts[name] += 1
+            return attribute(*args, **kwargs)
+        return counted
+
+    def total(self):
+        """
+        Return the total number of calls made through the wrapper.
+        """
+        return sum(self.counts.values())
+
+
+def draw_rows(window, rows, start_y=0, start_x=0, center_width=None):
+    """
+    Draw a list of strings with one addstr call per row instead of one per character.
+
+    :param window: is the curses window or pad to draw in.
+    :param rows: is the list of strings to draw.
+    :param start_y: is the row where the first string is drawn.
+    :param start_x: is the column where every string starts.
+    :param center_width: is an optional width to center each row in, starting from start_x.
+    :return: is the number of curses calls issued.
+    """
+    calls = 0
+    for y, row in enumerate(rows):
+        if row:
+            x = start_x if center_width is None else start_x + (center_width - len(row)) // 2
+            window.addstr(start_y + y, x, row)
+            calls += 1
+    return calls
+
+
+def fill(window, char, height, width, start_y=0, start_x=0):
+    """
+    Fill a rectangle with a single glyph.
+
+    When the rectangle spans the full width of the window the rows are written as one run,
+    letting curses wrap them, so the whole fill costs a single addstr call.
+
+    :param window: is the curses window or pad to fill.
+    :param char: is the glyph to fill with.
+    :param height: is the number of rows to fill.
+    :param width: is the number of columns to fill.
+    :param start_y: is the top row of the rectangle.
+    :param start_x: is the left column of the rectangle.
+    :return: is the number of curses calls issued.
+    """
+    if height <= 0 or width <= 0:
+        return 0
+
+    window_height, window_width = window.getmaxyx()
+    ends_in_corner = start_y + height >= window_height
+    if start_x == 0 and width == window_width and not ends_in_corner:
+        # curses refuses to leave the cursor past the bottom-right cell, so only wrap when it stays inside
+        window.addstr(start_y, 0, char * (width * height))
+        return 1
+
+    line = char * width
+    for y in range(start_y, start_y + height):
+        window.addstr(y, start_x, line)
+    return height
+
+
+class RenderScheduler:
+    def __init__(self):
+        """
+        Initialize the RenderScheduler class.
+
+        Collects what changed during a frame and pushes it to the terminal in one go: every dirty
+        window or pad region is copied with noutrefresh, then a single curses.doupdate writes it out.
+        """
+        self._windows = {}  # id(window) -> window that needs a full noutrefresh
+        self._pads = {}  # id(pad) -> [pad, viewport, dirty rect or None for the whole viewport]
+        self._viewports = {}  # id(pad) -> viewport used on the last flush
+        self.frames = 0  # Number of doupdate calls issued
+
+    def mark_window(self, window):
+        """
+        Mark a whole window as dirty.
+        """
+        self._windows[id(window)] = window
+
+    def mark_pad(self, pad, viewport, cells=None):
+        """
+        Mark cells of a pad as dirty.
+
+        :param pad: is the curses pad that changed.
+        :param viewport: is the (pad_y, pad_x, top, left, bottom, right) tuple the pad is shown with.
+        :param cells: is a list of (y, x) pad cells that changed, or None when the whole viewport must be sent.
+        """
+        entry = self._pads.get(id(pad))
+        if entry is None:
+            entry = self._pads[id(pad)] = [pad, viewport, ()]
+        entry[1] = viewport
+
+        if cells is None or entry[2] is None:
+            entry[2] = None
+            return
+
+        for y, x in cells:
+            if not entry[2]:
+                entry[2] = (y, x, y, x)
+            else:
+                top, left, bottom, right = entry[2]
+                entry[2] = (min(top, y), min(left, x), max(bottom, y), max(right, x))
+
+    def flush(self):
+        """
+        Copy every dirty region to the virtual screen and update the terminal once.
+
+        :return: is True if anything was written.
+        """
+        if not self._windows and not self._pads:
+            return False
+
+        for window in self._windows.values():
+            window.noutrefresh()
+
+        for key, (pad, viewport, rect) in self._pads.items():
+            if self._viewports.get(key) != viewport:
+                rect = None  # The viewport scrolled, so everything on screen moved
+            self._viewports[key] = viewport
+            if rect == ():
+                continue  # Marked, but no cell actually changed
+            region = self._visible_region(viewport, rect)
+            if region is not None:
+                pad.noutrefresh(*region)
+
+        self._windows.clear()
+        self._pads.clear()
+        curses.doupdate()
+        self.frames += 1
+        return True
+
+    @staticmethod
+    def _visible_region(viewport, rect):
+        """
+        Clip a dirty rect to the viewport and return the matching noutrefresh arguments.
+        """
+        pad_y, pad_x, top, left, bottom, right = viewport
+        if rect is None:
+            return viewport
+
+        dirty_top = max(rect[0], pad_y)
+        dirty_left = max(rect[1], pad_x)
+        dirty_bottom = min(rect[2], pad_y + bottom - top)
+        dirty_right = min(rect[3], pad_x + right - left)
+        if dirty_top > dirty_bottom or dirty_left > dirty_right:
+            return None
+
+        return (
+            dirty_top, dirty_left,
+            top + dirty_top - pad_y, left + dirty_left - pad_x,
+            top + dirty_bottom - pad_y, left + dirty_right - pad_x,
+        )
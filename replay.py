@@ -0,0 +1,284 @@
+import argparse
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+# A replay file is this header (magic, format version, frame rate, terminal size) followed by the
+# zlib-compressed events. Events are a kind byte, then varints: ticks since the previous event,
+# microseconds since the previous event (monotonic clock), and the payload.
+MAGIC = b"LBRP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHHH")
+KEY, SCENE, TEXT = 1, 2, 3
+
+# Headless replays run in a fake terminal of the recorded size, or this one for recordings without it
+DEFAULT_SIZE = (40, 140)
+
+
+class ReplayError(Exception):
+    """Raised when a replay file is not a replay or is cut short."""
+
+
+class ReplayFinished(Exception):
+    """Raised by a ReplayPlayer when the game asks for a key after the last recorded one."""
+
+
+class Recording:
+    def __init__(self, fps, height, width, events=None):
+        """
+        Initialize the Recording class.
+
+        :param fps: is the frame rate of the recorded session; a replay must tick at the same rate.
+        :param height: is the height of the recorded terminal.
+        :param width: is the width of the recorded terminal.
+        :param events: is the list of (kind, tick, seconds, value, scene) tuples, in order.
+        """
+        self.fps = fps
+        self.height = height
+        self.width = width
+        self.events = events if events is not None else []
+
+    def keys(self):
+        return sum(1 for event in self.events if event[0] == KEY)
+
+    def seconds(self):
+        return self.events[-1][2] if self.events else 0.0
+
+
+def _write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode(recording):
+    """
+    Encode a recording into the bytes of a replay file.
+    """
+    body = bytearray()
+    last_tick, last_micros = 0, 0
+    for kind, tick, seconds, value, _scene in recording.events:
+        micros = int(seconds * 1_000_000)
+        body.append(kind)
+        _write_varint(body, tick - last_tick)
+        _write_varint(body, micros - last_micros)
+        if kind == KEY:
+            _write_varint(body, value)
+        else:
+            encoded = value.encode("utf-8")
+            _write_varint(body, len(encoded))
+            body += encoded
+        last_tick, last_micros = tick, micros
+    return HEADER.pack(MAGIC, FORMAT_VERSION, recording.fps, recording.height, recording.width) + zlib.compress(bytes(body))
+
+
+def decode(data):
+    """
+    Decode the bytes of a replay file. Each event gets the scene id of the last SCENE event before it.
+    """
+    if len(data) < HEADER.size:
+        raise ReplayError("replay file is truncated")
+    magic, version, fps, height, width = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ReplayError("not a replay file")
+    if version > FORMAT_VERSION:
+        raise ReplayError(f"replay format {version} is newer than this game supports ({FORMAT_VERSION})")
+    try:
+        body = zlib.decompress(data[HEADER.size:])
+    except zlib.error as error:
+        raise ReplayError(f"replay file is corrupt ({error})") from None
+
+    recording = Recording(fps, height, width)
+    offset, tick, micros, scene = 0, 0, 0, None
+    try:
+        while offset < len(body):
+            kind = body[offset]
+            delta_ticks, offset = _read_varint(body, offset + 1)
+            delta_micros, offset = _read_varint(body, offset)
+            tick, micros = tick + delta_ticks, micros + delta_micros
+            if kind == KEY:
+                value, offset = _read_varint(body, offset)
+            else:
+                length, offset = _read_varint(body, offset)
+                value = body[offset:offset + length].decode("utf-8")
+                offset += length
+                if kind == SCENE:
+                    scene = value
+            recording.events.append((kind, tick, micros / 1_000_000, value, scene))
+    except (IndexError, UnicodeDecodeError) as error:
+        raise ReplayError(f"replay file is corrupt ({error})") from None
+    return recording
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+class ReplayRecorder:
+    def __init__(self, game):
+        """
+        Initialize the ReplayRecorder class.
+
+        Notes every key the game's InputHandler reads, and every name typed, with the tick it was read
+        on, the monotonic time and the scene it was read in. Events are kept in memory and written
+        once by save, so recording never touches the disk during play.
+
+        :param game: is the Game being recorded.
+        """
+        self.game = game
+        height, width = game.stdscr.getmaxyx()
+        self.recording = Recording(game.ticks.fps, height, width)
+        self.started = time.monotonic()
+        self._scene = None
+
+    def record_key(self, key):
+        self._record(KEY, key)
+
+    def record_text(self, text):
+        self._record(TEXT, text)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(encode(self.recording))
+
+    def _record(self, kind, value):
+        tick, seconds = self.game.ticks.ticks, time.monotonic() - self.started
+        scene = self.game.get_current_scene()
+        if scene != self._scene:
+            self._scene = scene
+            self.recording.events.append((SCENE, tick, seconds, scene, scene))
+        self.recording.events.append((kind, tick, seconds, value, scene))
+
+
+class ReplayPlayer:
+    def __init__(self, recording, game):
+        """
+        Initialize the ReplayPlayer class.
+
+        Hands the recorded keys to the game's InputHandler in place of the keyboard, each one on the
+        tick it was read on in the recorded session, so the game plays out the same way. A key read
+        in a different scene than it was recorded in counts as a divergence.
+
+        :param recording: is the Recording to play.
+        :param game: is the Game to drive.
+        """
+        self.game = game
+        self.events = deque(event for event in recording.events if event[0] != SCENE)
+        self.keys = 0
+        self.last_tick = 0  # Tick the last key was read on
+        self.divergences = []  # (tick, recorded scene, replayed scene) of keys read in the wrong scene
+
+    def getch(self, blocking=True):
+        """
+        Return the next recorded key once its tick has come, or -1 while not blocking.
+        The replay finishes on the tick after the last key, so the batch holding it is still applied.
+        """
+        if not self.events:
+            if not blocking and self.game.ticks.ticks <= self.last_tick:
+                return -1
+            raise ReplayFinished()
+        kind, tick, _seconds, value, scene = self.events[0]
+        if kind != KEY:
+            raise ReplayError(f"the game read a key where a name was typed (tick {tick})")
+        if not blocking and tick > self.game.ticks.ticks:
+            return -1
+        self.events.popleft()
+        self.keys += 1
+        self.last_tick = self.game.ticks.ticks
+        current = self.game.get_current_scene()
+        if scene != current:
+            self.divergences.append((tick, scene, current))
+        return value
+
+    def text(self):
+        """
+        Return the next recorded name.
+        """
+        if not self.events:
+            raise ReplayFinished()
+        kind, tick, _seconds, value, _scene = self.events.popleft()
+        if kind != TEXT:
+            raise ReplayError(f"the game asked for a name where a key was pressed (tick {tick})")
+        return value
+
+
+def run_replay(path):
+    """
+    Replay a recorded session headlessly, as fast as the game can run.
+
+    :return: is a result dict with the keys replayed, the ticks and time taken, the divergences and where the game ended.
+    """
+    import headless
+    from game import Game
+
+    recording = load(path)
+    height, width = (recording.height, recording.width) if recording.height else DEFAULT_SIZE
+    result = {"keys": recording.keys(), "recorded_seconds": recording.seconds(), "error": None}
+    with headless.headless_curses(headless.KeySource(), height, width) as stdscr:
+        game = Game(stdscr, recording.fps, audio=False, realtime=False, autosave=False)
+        player = ReplayPlayer(recording, game)
+        game.input_handler.replay = player
+
+        started = time.perf_counter()
+        try:
+            game.run()
+        except (ReplayFinished, SystemExit):
+            pass
+        except ReplayError as error:
+            result["error"] = str(error)
+        result["seconds"] = time.perf_counter() - started
+
+        scene = game.get_current_scene()
+        window = game.scenes.get(scene) if game.scenes.is_built(scene) else None
+        result.update({
+            "replayed": player.keys,
+            "ticks": game.ticks.ticks,
+            "divergences": player.divergences,
+            "scene": scene,
+            "position": (window.entity.y, window.entity.x) if window is not None else None,
+            "latency": game.input_handler.latency.summary(),
+        })
+    return result
+
+
+def print_result(result, file=sys.stdout):
+    speedup = result["recorded_seconds"] / result["seconds"] if result["seconds"] else 0.0
+    print(f"{result['replayed']}/{result['keys']} keys over {result['ticks']} ticks in {result['seconds']:.2f} s "
+          f"(recorded {result['recorded_seconds']:.1f} s, {speedup:.0f}x)", file=file)
+    print(f"ended in {result['scene']} at {result['position']}", file=file)
+    latency = result["latency"]
+    print(f"input latency: mean={latency['mean_seconds'] * 1e6:.1f} us p95={latency['p95_seconds'] * 1e6:.1f} us "
+          f"max={latency['max_seconds'] * 1e6:.1f} us over {latency['batches']} batches", file=file)
+    for tick, recorded, replayed in result["divergences"][:5]:
+        print(f"DIVERGED at tick {tick}: key recorded in {recorded} was read in {replayed}", file=file)
+    if result["error"]:
+        print(f"ERROR {result['error']}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session headlessly, as fast as possible.")
+    parser.add_argument("replay", help="replay file written by project.py --record")
+    arguments = parser.parse_args(argv)
+
+    result = run_replay(arguments.replay)
+    print_result(result)
+    return 1 if result["divergences"] or result["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
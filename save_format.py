@@ -0,0 +1,204 @@
+import mmap
+import os
+import struct
+import zlib
+
+# Every save file starts with this header: magic, format version, flags, then the length and CRC-32
+# of the compressed body and the length of the body once decompressed
+MAGIC = b"LBSV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+
+# The body is a sequence of sections: a one-byte id and a length, then the section's bytes. Readers skip
+# the sections they do not know, so saves written by a newer version still load in an older one.
+SECTION = struct.Struct("<BI")
+SCENE, POSITION, INVENTORY, WINDOW_DATA, PLAYER_NAME = 1, 2, 3, 4, 5
+
+# Inventory and window data are dicts of plain values, written with a one-byte type tag
+_INT, _FLOAT, _STR, _NONE, _TRUE, _FALSE, _LIST, _TUPLE, _DICT = b"ifsNTFltd"
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_U32 = struct.Struct("<I")
+_POSITION = struct.Struct("<ii")
+
+# Small saves compress fastest at a low level; the difference in size is a few bytes
+COMPRESSION_LEVEL = 1
+
+
+class SaveError(Exception):
+    """Raised when a save file is truncated, corrupt, or written by an unknown format."""
+
+
+def encode(state):
+    """
+    Encode a game state into the bytes of a save file.
+
+    :param state: is a GameState.
+    :return: is the header followed by the compressed sections.
+    """
+    sections = [
+        (SCENE, state.get_current_scene().encode("utf-8")),
+        (INVENTORY, encode_value(state.inventory)),
+        (WINDOW_DATA, encode_value(state.get_window_data())),
+        (PLAYER_NAME, state.player_name.encode("utf-8")),
+    ]
+    position = state.get_player_position()
+    if position is not None:
+        sections.append((POSITION, _POSITION.pack(*position)))
+
+    body = b"".join(SECTION.pack(section, len(data)) + data for section, data in sections)
+    compressed = zlib.compress(body, COMPRESSION_LEVEL)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(compressed), zlib.crc32(compressed), len(body)) + compressed
+
+
+def decode(data):
+    """
+    Decode the bytes of a save file, checking its header and checksum.
+
+    :param data: is a bytes-like object, such as an mmap of the file.
+    :return: is a dict with the "scene", "position", "inventory", "window_data" and "player_name" of the save.
+    """
+    if len(data) < HEADER.size:
+        raise SaveError("save file is truncated")
+    magic, version, _flags, compressed_size, crc, body_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveError("not a save file")
+    if version > FORMAT_VERSION:
+        raise SaveError(f"save format {version} is newer than this game supports ({FORMAT_VERSION})")
+
+    # The views are released on the way out, even on errors, so an mmap can always be closed afterwards
+    with memoryview(data) as view, view[HEADER.size:HEADER.size + compressed_size] as compressed:
+        if len(compressed) != compressed_size or zlib.crc32(compressed) != crc:
+            raise SaveError("save file is corrupt (checksum mismatch)")
+        try:
+            body = zlib.decompress(compressed)
+        except zlib.error as error:
+            raise SaveError(f"save file is corrupt ({error})") from None
+    if len(body) != body_size:
+        raise SaveError("save file is corrupt (wrong size)")
+
+    fields = {"scene": None, "position": None, "inventory": {}, "window_data": {}, "player_name": ""}
+    offset = 0
+    try:
+        while offset < len(body):
+            section, length = SECTION.unpack_from(body, offset)
+            offset += SECTION.size
+            chunk = body[offset:offset + length]
+            offset += length
+            if section == SCENE:
+                fields["scene"] = chunk.decode("utf-8")
+            elif section == POSITION:
+                fields["position"] = _POSITION.unpack(chunk)
+            elif section == INVENTORY:
+                fields["inventory"] = _decode_value(chunk, 0)[0]
+            elif section == WINDOW_DATA:
+                fields["window_data"] = _decode_value(chunk, 0)[0]
+            elif section == PLAYER_NAME:
+                fields["player_name"] = chunk.decode("utf-8")
+    except (struct.error, IndexError, UnicodeDecodeError) as error:
+        raise SaveError(f"save file is corrupt ({error})") from None
+    if fields["scene"] is None:
+        raise SaveError("save file has no scene")
+    return fields
+
+
+def save(state, filename):
+    """
+    Write a game state to a save file. The file is replaced atomically, so a crash never leaves half a save.
+    """
+    temporary = f"{filename}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(encode(state))
+    os.replace(temporary, filename)
+
+
+def load(filename):
+    """
+    Read a save file through mmap, so only the header and the compressed body are ever touched.
+
+    :return: is the decoded fields, see decode.
+    """
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise SaveError("save file is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return decode(data)
+
+
+def encode_value(value):
+    """
+    Encode a plain value (None, bool, int, float, str, or lists, tuples and dicts of them) as tagged bytes.
+    """
+    parts = []
+    _write_value(value, parts)
+    return b"".join(parts)
+
+
+def decode_value(data):
+    """
+    Decode a value written by encode_value.
+    """
+    try:
+        return _decode_value(data, 0)[0]
+    except (struct.error, IndexError, UnicodeDecodeError) as error:
+        raise SaveError(f"value is corrupt ({error})") from None
+
+
+def _write_value(value, parts):
+    if value is None:
+        parts.append(bytes((_NONE,)))
+    elif value is True or value is False:
+        parts.append(bytes((_TRUE if value else _FALSE,)))
+    elif isinstance(value, int):
+        parts.append(bytes((_INT,)) + _I64.pack(value))
+    elif isinstance(value, float):
+        parts.append(bytes((_FLOAT,)) + _F64.pack(value))
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        parts.append(bytes((_STR,)) + _U32.pack(len(encoded)) + encoded)
+    elif isinstance(value, (list, tuple)):
+        parts.append(bytes((_TUPLE if isinstance(value, tuple) else _LIST,)) + _U32.pack(len(value)))
+        for item in value:
+            _write_value(item, parts)
+    elif isinstance(value, dict):
+        parts.append(bytes((_DICT,)) + _U32.pack(len(value)))
+        for key, item in value.items():
+            _write_value(key, parts)
+            _write_value(item, parts)
+    else:
+        raise SaveError(f"cannot save a value of type {type(value).__name__}")
+
+
+def _decode_value(data, offset):
+    """
+    Decode one value starting at offset.
+
+    :return: is the value and the offset just past it.
+    """
+    tag = data[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag in (_TRUE, _FALSE):
+        return tag == _TRUE, offset
+    if tag == _INT:
+        return _I64.unpack_from(data, offset)[0], offset + _I64.size
+    if tag == _FLOAT:
+        return _F64.unpack_from(data, offset)[0], offset + _F64.size
+    count = _U32.unpack_from(data, offset)[0]
+    offset += _U32.size
+    if tag == _STR:
+        return bytes(data[offset:offset + count]).decode("utf-8"), offset + count
+    if tag in (_LIST, _TUPLE):
+        items = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return (tuple(items) if tag == _TUPLE else items), offset
+    if tag == _DICT:
+        result = {}
+        for _ in range(count):
+            key, offset = _decode_value(data, offset)
+            result[key], offset = _decode_value(data, offset)
+        return result, offset
+    raise SaveError(f"unknown value tag {tag!r} in save file")
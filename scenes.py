@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tiles import TiledPad
+
+# Rough size of one curses cell (cchar_t in ncursesw), used to estimate what a pad holds
+CELL_BYTES = 28
+
+# Finished scenes are kept around until the live scenes go over this many bytes
+DEFAULT_MEMORY_BUDGET = 1024 * 1024
+
+
+def scene_footprint(scene):
+    """
+    Estimate the memory held by a scene: its curses window or pad plus its wall grid.
+
+    :param scene: is a built window object with a `window` attribute.
+    :return: is the estimated size in bytes.
+    """
+    if isinstance(scene.window, TiledPad):
+        size = scene.window.memory_footprint(CELL_BYTES)  # A TiledPad only holds the tiles it loaded
+    else:
+        height, width = scene.window.getmaxyx()
+        size = height * width * CELL_BYTES
+    walls = getattr(scene, "walls", None)
+    if walls is not None:
+        size += walls.memory_footprint()
+    return size
+
+
+class SceneRegistry:
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """
+        Initialize the SceneRegistry class.
+
+        Scenes are registered as factories and only built the first time they are requested.
+        The non-curses part of building a scene (parsing, wall masks) can be prefetched on a
+        worker thread, and finished scenes are evicted once the memory budget is exceeded.
+
+        :param memory_budget: is the number of bytes the built scenes may hold before finished ones are evicted.
+        """
+        self.memory_budget = memory_budget
+        self._factories = {}  # name -> (factory, prepare)
+        self._scenes = OrderedDict()  # name -> built scene, oldest first
+        self._sizes = {}  # name -> estimated footprint of the built scene
+        self._prefetched = {}  # name -> Future of the prepare step
+        self._finished = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scene-prefetch")
+
+    def register(self, name, factory, prepare=None):
+        """
+        Register a scene.
+
+        :param name: is the scene id, e.g. "battle_scene_1".
+        :param factory: is a callable returning the built scene; it runs on the main thread and may use curses.
+        :param prepare: is an optional callable doing the curses-free work, safe to run on a worker thread.
+        """
+        self._factories[name] = (factory, prepare)
+
+    def get(self, name):
+        """
+        Return the scene, building it on first use (or again after it was evicted).
+        """
+        scene = self._scenes.get(name)
+        if scene is not None:
+            return scene
+
+        factory, prepare = self._factories[name]
+        with self._lock:
+            future = self._prefetched.pop(name, None)
+        if future is not None:
+            future.result()  # Usually already done; re-raises anything the worker hit
+        elif prepare is not None:
+            prepare()
+
+        scene = factory()
+        self._scenes[name] = scene
+        self._sizes[name] = scene_footprint(scene)
+        self._finished.discard(name)
+        self._evict()
+        return scene
+
+    def prefetch(self, name):
+        """
+        Run the scene's prepare step on the worker thread, so a later get() only does the curses work.
+        """
+        if name in self._scenes:
+            return
+        prepare = self._factories[name][1]
+        if prepare is None:
+            return
+        with self._lock:
+            if name not in self._prefetched:
+                self._prefetched[name] = self._executor.submit(prepare)
+
+    def finish(self, name):
+        """
+        Mark a scene as finished, making its pad eligible for eviction.
+        """
+        if name in self._scenes:
+            self._finished.add(name)
+            self._evict()
+
+    def is_built(self, name):
+        return name in self._scenes
+
+    def memory_footprint(self):
+        """
+        Return the estimated number of bytes held by all built scenes.
+        """
+        return sum(self._sizes.values())
+
+    def _evict(self):
+        """
+        Drop finished scenes, oldest first, until the built scenes fit in the memory budget.
+        """
+        for name in list(self._scenes):
+            if self.memory_footprint() <= self.memory_budget:
+                break
+            if name in self._finished:
+                del self._scenes[name]
+                del self._sizes[name]
+                self._finished.discard(name)
@@ -0,0 +1,276 @@
+import heapq
+import threading
+from array import array
+from collections import OrderedDict
+import maze_cache
+from grid import WallGrid
+
+# Number of distance fields kept in memory, most recently used last
+FIELD_CACHE_SIZE = 8
+
+# ' ' is open floor; every other byte is a wall (multi-byte UTF-8 glyphs never encode to a space)
+_OPEN_FLOOR = bytes(1 if byte == ord(' ') else 0 for byte in range(256))
+_FREE_CELL = bytes((1, 0)) + bytes(254)  # WallGrid cell 0 -> passable, 1 -> blocked
+
+_fields = OrderedDict()  # (maze key, goal) -> DistanceField
+_grids = OrderedDict()  # maze key -> PassableGrid
+_lock = threading.Lock()  # Scenes are prefetched on a worker thread while the main thread reads the caches
+
+
+class PassableGrid:
+    def __init__(self, height, width, cells):
+        """
+        Initialize the PassableGrid class.
+
+        A flat bytearray of the cells the player can stand on, indexed ``y * width + x``, with one
+        extra blocked row at the end so neighbour lookups never need bounds checks.
+        Row 0 and column 0 are blocked, matching the limits Entity.move and the input handler enforce.
+
+        :param height: is the number of rows in the maze.
+        :param width: is the number of columns in the maze.
+        :param cells: is the bytearray of (height + 1) * width cells, 1 for passable.
+        """
+        self.height = height
+        self.width = width
+        self.cells = cells
+        self.steps = (1, -1, width, -width)
+
+    @classmethod
+    def from_maze(cls, maze):
+        """
+        Build the grid from a compiled maze, using the WallGrid bytes directly when they exist.
+        """
+        height, width = maze.height, maze.width
+        if isinstance(maze.walls, WallGrid):
+            cells = bytearray(maze.walls.cells.translate(_FREE_CELL))
+        else:
+            # Mazes that compute walls on the fly (GeneratedMaze) are ASCII, one byte per glyph
+            cells = bytearray()
+            for row in maze:
+                encoded = row.encode("utf-8")[:width].translate(_OPEN_FLOOR)
+                cells += encoded + b"\x01" * (width - len(encoded))  # Past the end of a row is open floor
+        cells += bytes(width)
+
+        cells[0:width] = bytes(width)
+        cells[0::width] = bytes(len(range(0, len(cells), width)))
+        return cls(height, width, cells)
+
+    def is_passable(self, y, x):
+        return 0 <= y < self.height and 0 <= x < self.width and self.cells[y * self.width + x] == 1
+
+
+class DistanceField:
+    def __init__(self, grid, goal, distances):
+        """
+        Initialize the DistanceField class.
+
+        :param grid: is the PassableGrid the field was computed on.
+        :param goal: is the (y, x) cell every distance is measured to.
+        :param distances: is an array of distances per cell, -1 where the goal cannot be reached.
+        """
+        self.grid = grid
+        self.goal = goal
+        self.distances = distances
+
+    def distance(self, y, x):
+        """
+        Return the number of moves from (y, x) to the goal, or -1 if it cannot be reached.
+        """
+        if not (0 <= y < self.grid.height and 0 <= x < self.grid.width):
+            return -1
+        return self.distances[y * self.grid.width + x]
+
+    def next_step(self, y, x):
+        """
+        Return the neighbouring cell one move closer to the goal, in O(1), or None if there is none.
+
+        The player can spawn on a glyph (maze2 starts on a wall), so from a cell outside the field
+        the closest reachable neighbour is returned instead.
+        """
+        distance = self.distance(y, x)
+        if distance == 0 or not (0 < y < self.grid.height and 0 < x < self.grid.width):
+            return None
+        width = self.grid.width
+        index = y * width + x
+        best = None
+        for step in self.grid.steps:
+            neighbour_distance = self.distances[index + step]
+            if neighbour_distance < 0:
+                continue
+            if neighbour_distance == distance - 1:
+                return divmod(index + step, width)
+            if distance < 0 and (best is None or neighbour_distance < best[0]):
+                best = (neighbour_distance, index + step)
+        return divmod(best[1], width) if best is not None else None
+
+
+def passable_grid(maze):
+    """
+    Return the PassableGrid of a maze, building it once per maze content.
+
+    :param maze: is a list of strings or any compiled maze (CompiledMaze, GeneratedMaze).
+    """
+    maze = maze_cache.load(maze)
+    return _cached(_grids, maze_cache.cache_key(maze), lambda: PassableGrid.from_maze(maze))
+
+
+def _cached(cache, key, build):
+    """
+    Return the value cached under key, building and caching it if needed, least recently used out first.
+    It is built outside the lock, so the main thread never waits for a search running on the prefetch thread.
+    """
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+    value = build()
+    with _lock:
+        value = cache.setdefault(key, value)  # Another thread may have built it meanwhile
+        cache.move_to_end(key)
+        while len(cache) > FIELD_CACHE_SIZE:
+            cache.popitem(last=False)
+    return value
+
+
+def compute_distance_field(grid, goal):
+    """
+    Compute the distance from every cell to the goal with a frontier-batched BFS.
+
+    Each pass expands the whole frontier at once, so the inner loop only touches flat arrays.
+
+    :param grid: is the PassableGrid to search.
+    :param goal: is the (y, x) goal cell.
+    :return: is the DistanceField.
+    """
+    cells = grid.cells
+    steps = grid.steps
+    distances = array("i", [-1]) * len(cells)
+
+    goal_y, goal_x = goal
+    if grid.is_passable(goal_y, goal_x):
+        start = goal_y * grid.width + goal_x
+        distances[start] = 0
+        frontier = [start]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            append = next_frontier.append
+            for index in frontier:
+                for step in steps:
+                    neighbour = index + step
+                    if cells[neighbour] and distances[neighbour] < 0:
+                        distances[neighbour] = distance
+                        append(neighbour)
+            frontier = next_frontier
+
+    return DistanceField(grid, goal, distances)
+
+
+def distance_field(maze, goal):
+    """
+    Return the distance field to a goal, cached per maze content and goal.
+
+    A changed maze hashes to a new key, so stale fields are never reused; they simply age out of the cache.
+
+    :param maze: is a list of strings or any compiled maze.
+    :param goal: is the (y, x) goal cell, usually the exit.
+    """
+    maze = maze_cache.load(maze)
+    key = (maze_cache.cache_key(maze), tuple(goal))
+    return _cached(_fields, key, lambda: compute_distance_field(passable_grid(maze), goal))
+
+
+def invalidate(maze=None):
+    """
+    Drop the cached grids and fields of one maze, or of every maze.
+    """
+    key = None if maze is None else maze_cache.cache_key(maze_cache.load(maze))
+    with _lock:
+        if key is None:
+            _fields.clear()
+            _grids.clear()
+            return
+        _grids.pop(key, None)
+        for field_key in [field_key for field_key in _fields if field_key[0] == key]:
+            del _fields[field_key]
+
+
+def _walk_back(parents, index, width):
+    path = []
+    while index >= 0:
+        path.append(divmod(index, width))
+        index = parents[index]
+    path.reverse()
+    return path
+
+
+def bfs(maze, start, goal):
+    """
+    Find a shortest path with breadth-first search.
+
+    :param maze: is a list of strings or any compiled maze.
+    :param start: is the (y, x) start cell.
+    :param goal: is the (y, x) goal cell.
+    :return: is the list of (y, x) cells from start to goal, or None if the goal cannot be reached.
+    """
+    grid = passable_grid(maze)
+    if not grid.is_passable(*goal) or not (0 < start[0] < grid.height and 0 < start[1] < grid.width):
+        return None  # The start itself may be a glyph the player spawned on
+
+    width, cells = grid.width, grid.cells
+    source, target = start[0] * width + start[1], goal[0] * width + goal[1]
+    parents = array("i", [-2]) * len(cells)
+    parents[source] = -1
+    frontier = [source]
+    while frontier and parents[target] == -2:
+        next_frontier = []
+        for index in frontier:
+            for step in grid.steps:
+                neighbour = index + step
+                if cells[neighbour] and parents[neighbour] == -2:
+                    parents[neighbour] = index
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+
+    if parents[target] == -2:
+        return None
+    return _walk_back(parents, target, width)
+
+
+def astar(maze, start, goal):
+    """
+    Find a shortest path with A*, using the Manhattan distance as heuristic.
+
+    :param maze: is a list of strings or any compiled maze.
+    :param start: is the (y, x) start cell.
+    :param goal: is the (y, x) goal cell.
+    :return: is the list of (y, x) cells from start to goal, or None if the goal cannot be reached.
+    """
+    grid = passable_grid(maze)
+    if not grid.is_passable(*goal) or not (0 < start[0] < grid.height and 0 < start[1] < grid.width):
+        return None  # The start itself may be a glyph the player spawned on
+
+    width, cells = grid.width, grid.cells
+    goal_y, goal_x = goal
+    source, target = start[0] * width + start[1], goal_y * width + goal_x
+    costs = {source: 0}
+    parents = {source: -1}
+    queue = [(abs(start[0] - goal_y) + abs(start[1] - goal_x), 0, source)]
+
+    while queue:
+        _, cost, index = heapq.heappop(queue)
+        if index == target:
+            return _walk_back(parents, index, width)
+        if cost > costs[index]:
+            continue  # A shorter route to this cell was already expanded
+        for step in grid.steps:
+            neighbour = index + step
+            if cells[neighbour] and cost + 1 < costs.get(neighbour, cost + 2):
+                costs[neighbour] = cost + 1
+                parents[neighbour] = index
+                y, x = divmod(neighbour, width)
+                heapq.heappush(queue, (cost + 1 + abs(y - goal_y) + abs(x - goal_x), cost + 1, neighbour))
+
+    return None
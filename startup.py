@@ -0,0 +1,62 @@
+import sys
+import time
+
+# Imported first by project.py, so this is as close to the process start as Python code can measure
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, started=PROCESS_START):
+        """
+        Initialize the StartupTimer class.
+
+        Splits the time from process start to the first menu frame into phases: each mark closes the
+        phase that ran since the previous mark. Work done off the main thread, such as the maze build on
+        the prefetch thread, is added separately and reported as background time.
+
+        :param started: is the perf_counter time the measurement starts from.
+        """
+        self.started = started
+        self.phases = {}  # Phase name -> seconds on the main thread
+        self.background = {}  # Phase name -> seconds on worker threads
+        self.first_frame = None  # Seconds from the start to the first menu frame
+        self._last = started
+
+    def mark(self, phase):
+        """
+        Record the time since the previous mark as the given phase.
+        """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def add_background(self, phase, seconds):
+        """
+        Record work done on a worker thread, which does not delay the first frame.
+        """
+        self.background[phase] = self.background.get(phase, 0.0) + seconds
+
+    def frame_drawn(self, phase="first frame"):
+        """
+        Record the first menu frame, closing the given phase; later calls are ignored. Called by the game once
+        the menu is on screen, since the frames drawn before it (the closed scroll) are not the menu yet.
+        """
+        if self.first_frame is None:
+            self.mark(phase)
+            self.first_frame = self._last - self.started
+
+    def format(self):
+        """
+        Return the report as readable lines.
+        """
+        lines = ["Startup time to the first menu frame:"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"  {phase:<24} {seconds * 1000:8.1f} ms")
+        if self.first_frame is not None:
+            lines.append(f"  {'total':<24} {self.first_frame * 1000:8.1f} ms")
+        for phase, seconds in self.background.items():
+            lines.append(f"  {phase + ' (background)':<24} {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def print_report(self, file=sys.stderr):
+        print(self.format(), file=file)
@@ -1,30 +1,92 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import zlib
 import pytest # type: ignore
 import curses
-import threading
 from unittest.mock import MagicMock
-from project import check_terminal_size, display_resize_warning, handle_initialization_error  # Adjust the import as needed
+from project import handle_initialization_error  # Adjust the import as needed
+from grid import WallGrid
+import maze_cache
+import render
+from scenes import SceneRegistry
+import maze_gen
+from tiles import TiledPad
+import solver
+from validate_mazes import validate_maze
+import headless
+import benchmarks
+import utils
+from input_handler import InputHandler, display_resize_warning
+from display_windows import Battle_Window, Narration_Window, House_Window
+from game_loop import TickScheduler
+from windows import Windows, Typewriter
+from game import Game
+from audio import AudioManager, NO_AUDIO_ENV
+from startup import StartupTimer
+import save_format
+from game_state import GameState
+import replay
+import fov
+from world import World, STEPS, pursuer
+from flow import FlowField
+import maze_files
+from autosave import AutoSave
 
-def test_check_terminal_size(mocker):
-    """Test check_terminal_size for terminal resizing."""
-    stdscr = mocker.MagicMock()
-    mocker.patch('time.sleep', return_value=None)
-    exit_event = threading.Event()  # Use a real threading event
+def test_resize_relayouts_windows_in_place(mocker):
+    """Test a KEY_RESIZE re-centers the battle viewport without rebuilding its pad, and waits out a too-small terminal."""
+    warning = mocker.patch("input_handler.display_resize_warning")
+    level = utils.LEVELS["maze1"]
+    source = headless.KeySource()
+    with headless.headless_curses(source, 40, 140) as stdscr:
+        input_handler = InputHandler(stdscr)
+        window = Battle_Window(stdscr, input_handler, level["maze"], *level["view"], *level["start"], exit_position=level["exit"])
+        pad = window.window
 
-    # Simulate initial terminal size
-    stdscr.getmaxyx.side_effect = [(24, 80), (13, 50)]  # Initial size and resized below minimum
+        def keys():
+            stdscr.resize(13, 50)  # Shrunk below the minimum...
+            yield curses.KEY_RESIZE
+            stdscr.resize(30, 100)  # ...then grown back while the warning is shown
+            yield curses.KEY_RESIZE
+            yield ord('x')
 
-    # Start the terminal size check in a thread
-    check_thread = threading.Thread(target=check_terminal_size, args=(stdscr, exit_event))
-    check_thread.start()
+        source.set_keys(keys())
+        input_handler.handle_battle_window_input(window)
 
-    # Wait for the exit_event to be set (indicating the warning was shown)
-    exit_event.wait(timeout=2)  # Wait up to 2 seconds
+        assert warning.call_count == 1
+        assert input_handler.resizes == 1
+        assert (window.viewport_start_y, window.viewport_start_x) == (15 - 9, 50 - 32)
+        assert window.box.getbegyx() == (window.viewport_start_y - 2, window.viewport_start_x - 5)
+        assert window.window is pad
 
-      # Ensure exit_event is set due to small size
-    stdscr.addstr.assert_called_once_with(
-        0, 0, "Terminal size is too small. Kindly press a key.", curses.A_BOLD
-    )
-    assert exit_event.is_set()
+
+def test_resize_wait_blocks_even_in_nodelay_mode(mocker):
+    """Test a too-small terminal is waited out on a blocking getch, not by spinning on -1, and nodelay is put back."""
+    mocker.patch("input_handler.display_resize_warning")
+    mocker.patch("curses.update_lines_cols")
+    mocker.patch("curses.doupdate")
+    terminal = {"size": (13, 50), "nodelay": True, "polls": 0}
+
+    def getch():
+        if terminal["nodelay"]:
+            terminal["polls"] += 1
+            if terminal["polls"] > 100:
+                terminal["size"] = (30, 100)  # Let a spinning loop end so the test fails instead of hanging
+            return -1
+        terminal["size"] = (30, 100)  # Blocks until the terminal is resized
+        return curses.KEY_RESIZE
+
+    stdscr = MagicMock()
+    stdscr.getmaxyx.side_effect = lambda: terminal["size"]
+    stdscr.getch.side_effect = getch
+    stdscr.nodelay.side_effect = lambda flag: terminal.update(nodelay=flag)
+    InputHandler(stdscr).handle_resize(MagicMock(overlay=False), nodelay=True)
+
+    assert terminal["polls"] == 0 and stdscr.getch.call_count == 1
+    assert terminal["nodelay"] is True
 
 
 def test_display_resize_warning():
@@ -56,4 +118,738 @@ def test_handle_initialization_error():
         f"Initialization error: {error_message}. Kindly resize the terminal and rerun.",
         curses.A_BOLD  # Use this directly as a constant
     )
-    stdscr.refresh.assert_called_once()
\ No newline at end of file
+    stdscr.refresh.assert_called_once()
+
+
+def test_wall_grid_matches_wall_set():
+    """Test WallGrid marks the same cells as the old set of (y, x) tuples."""
+    walls = {(y, x) for y, row in enumerate(utils.maze10) for x, char in enumerate(row) if char != ' '}
+    grid = WallGrid.from_rows(utils.maze10)
+
+    assert len(grid) == len(walls)
+    for y in range(grid.height):
+        for x in range(grid.width):
+            assert grid.is_wall(y, x) == ((y, x) in walls)
+    assert not grid.is_wall(-1, 0)
+    assert (0, 0) in grid
+
+
+def test_wall_grid_is_smaller_than_wall_set():
+    """Test WallGrid reports a smaller memory footprint than the set on maze3."""
+    walls = {(y, x) for y, row in enumerate(utils.maze3) for x, char in enumerate(row) if char != ' '}
+    grid = WallGrid.from_rows(utils.maze3)
+
+    assert grid.memory_footprint() < WallGrid.set_memory_footprint(walls)
+
+
+def test_maze_cache_round_trip(tmp_path, mocker):
+    """Test a compiled maze is written once and then loaded back from the on-disk cache."""
+    mocker.patch.dict(maze_cache._loaded, clear=True)
+    compiled = maze_cache.load(utils.maze10, cache_dir=tmp_path)
+
+    assert list(compiled) == utils.maze10
+    assert (compiled.height, compiled.width) == (len(utils.maze10), max(len(row) for row in utils.maze10))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    maze_cache._loaded.clear()
+    compile_maze = mocker.spy(maze_cache, "compile_maze")
+    reloaded = maze_cache.load(utils.maze10, cache_dir=tmp_path)
+
+    compile_maze.assert_not_called()
+    assert reloaded[6] == utils.maze10[6]
+    assert reloaded.walls.cells == compiled.walls.cells
+
+    for number in range(maze_cache.LOADED_CACHE_SIZE + 3):  # Memory stays bounded, least recently used out first
+        maze_cache.load(["+--+", f"|{number:2}|"], cache_dir=tmp_path)
+    assert len(maze_cache._loaded) == maze_cache.LOADED_CACHE_SIZE and reloaded.key not in maze_cache._loaded
+
+
+def test_batched_draw_call_counts():
+    """Test the batched draw path issues one call per row, and one call for a full-width fill."""
+    curses_window = MagicMock()
+    curses_window.getmaxyx.return_value = (18, 64)
+    window = render.CallCounter(curses_window)
+
+    assert render.draw_rows(window, utils.maze1) == len(utils.maze1)
+    assert render.fill(window, ';', 17, 64) == 1
+    assert render.fill(window, ';', 18, 64) == 18  # Writing into the bottom-right corner goes row by row
+
+    curses_window.addstr.assert_any_call(0, 0, ';' * 17 * 64)
+    assert window.counts["addstr"] == len(utils.maze1) + 1 + 18
+
+
+def test_render_scheduler_flushes_dirty_cells_once(mocker):
+    """Test RenderScheduler sends only the dirty cells, and the whole viewport after a scroll, with one doupdate per frame."""
+    doupdate = mocker.patch('curses.doupdate')
+    scheduler = render.RenderScheduler()
+    pad, box = MagicMock(), MagicMock()
+    viewport = (0, 30, 3, 8, 20, 71)
+
+    scheduler.mark_window(box)
+    scheduler.mark_pad(pad, viewport)
+    scheduler.flush()
+    pad.noutrefresh.assert_called_once_with(*viewport)
+    box.noutrefresh.assert_called_once()
+
+    pad.reset_mock()
+    scheduler.mark_pad(pad, viewport, [(6, 59), (6, 58)])
+    scheduler.flush()
+    pad.noutrefresh.assert_called_once_with(6, 58, 9, 36, 9, 37)
+
+    pad.reset_mock()
+    scrolled = (0, 29, 3, 8, 20, 71)
+    scheduler.mark_pad(pad, scrolled, [(6, 58), (6, 57)])
+    scheduler.flush()
+    pad.noutrefresh.assert_called_once_with(*scrolled)
+
+    assert doupdate.call_count == scheduler.frames == 3
+    assert scheduler.flush() is False
+
+
+def test_scene_registry_builds_lazily_and_evicts_finished_scenes():
+    """Test SceneRegistry builds scenes on first use, prefetches off-thread and evicts finished pads over budget."""
+    def make_scene():
+        scene = MagicMock(walls=None)
+        scene.window.getmaxyx.return_value = (10, 10)  # 100 cells, 2800 bytes
+        return scene
+
+    prepare = MagicMock()
+    factory = MagicMock(side_effect=make_scene)
+    registry = SceneRegistry(memory_budget=5000)
+    registry.register("first", factory, prepare=prepare)
+    registry.register("second", factory)
+
+    factory.assert_not_called()
+    registry.prefetch("first")
+    first = registry.get("first")
+    assert registry.get("first") is first
+    prepare.assert_called_once()
+
+    registry.finish("first")
+    assert registry.is_built("first")  # Still under budget
+
+    registry.get("second")
+    assert not registry.is_built("first")
+    assert registry.memory_footprint() == 2800
+
+
+@pytest.mark.parametrize("algorithm", sorted(maze_gen.ALGORITHMS))
+def test_generated_maze_is_solvable_and_seeded(algorithm):
+    """Test generated mazes keep the glyph layout, are reproducible from a seed and connect the entrance to the exit."""
+    maze = maze_gen.generate(12, 20, algorithm, seed=7)
+    rows = list(maze)
+
+    assert rows == list(maze_gen.generate(12, 20, algorithm, seed=7))
+    assert all(len(row) == maze.width for row in rows) and len(rows) == maze.height
+    assert rows[0] == "+" + "--+" * 20
+
+    # Walk the open cells from the start; a perfect maze reaches the exit
+    seen, frontier = {maze.start}, [maze.start]
+    while frontier:
+        y, x = frontier.pop()
+        for position in ((y + 1, x), (y - 1, x), (y, x + 1), (y, x - 1)):
+            if position not in seen and 0 < position[1] < maze.width and not maze.walls.is_wall(*position):
+                seen.add(position)
+                frontier.append(position)
+    assert maze.exit in seen
+
+
+
+@pytest.mark.parametrize("algorithm", sorted(maze_gen.ALGORITHMS))
+@pytest.mark.parametrize("rows, cols", [(1, 1), (1, 7), (7, 1)])
+def test_generated_maze_handles_one_row_and_one_column_grids(algorithm, rows, cols):
+    """Test every algorithm carves a corridor through grids one cell wide, where east and south steps coincide."""
+    maze = maze_gen.generate(rows, cols, algorithm, seed=3)
+
+    # A spanning tree of a corridor opens every interior wall and no border
+    assert len(maze.cells) == rows * cols
+    for index, cell in enumerate(maze.cells):
+        row, col = divmod(index, cols)
+        assert bool(cell & maze_gen.EAST) == (col == cols - 1)
+        assert bool(cell & maze_gen.SOUTH) == (row == rows - 1)
+
+
+def test_tiled_pad_pages_tiles_around_the_viewport(mocker):
+    """Test TiledPad only materializes the tiles under the viewport and evicts the ones it scrolled away from."""
+    newpad = mocker.patch('curses.newpad', side_effect=lambda height, width: MagicMock())
+    maze = maze_gen.generate(200, 200, seed=1)
+    pad = TiledPad(maze, maze.height * 2, maze.width * 2, tile_height=20, tile_width=40, margin=0)
+
+    pad.addch(5, 5, '@')
+    pad.noutrefresh(0, 0, 3, 8, 20, 71)  # An 18 x 64 viewport at the top-left corner
+    assert sorted(pad.loaded_tiles()) == [(0, 0), (0, 1)]
+    pad._tiles[(0, 0)].addstr.assert_any_call(5, 5, '@')  # Writes made before loading are replayed
+
+    pad.noutrefresh(300, 500, 3, 8, 20, 71)
+    assert sorted(pad.loaded_tiles()) == [(15, 12), (15, 13), (15, 14)]
+    assert newpad.call_count == pad.tiles_loaded == 5
+
+
+
+def test_tiled_pad_under_fog_remembers_revealed_cells_without_overlays(mocker):
+    """Test a blank TiledPad keeps revealed maze glyphs as seen cells, redrawn from the maze when their tile pages back in."""
+    mocker.patch('curses.newpad', side_effect=lambda height, width: MagicMock())
+    maze = maze_gen.generate(200, 200, seed=1)
+    pad = TiledPad(maze, maze.height * 2, maze.width * 2, tile_height=20, tile_width=40, margin=0, blank=True)
+
+    pad.noutrefresh(0, 0, 3, 8, 20, 71)
+    pad.addstr(0, 0, maze[0][:10])  # Revealed by the field of view
+    pad.addstr(2, 3, maze[2][3:6])
+    pad.addstr(2, 4, " ")  # Gone dark again
+    pad.addch(5, 5, '@')
+    assert pad._overlay == {(0, 0): {(5, 5): '@'}}
+
+    pad.noutrefresh(300, 500, 3, 8, 20, 71)
+    pad.noutrefresh(0, 0, 3, 8, 20, 71)
+    tile = pad._tiles[(0, 0)]
+    tile.addstr.assert_any_call(0, 0, maze[0][:10] + " " * 30)
+    tile.addstr.assert_any_call(2, 0, "   " + maze[2][3] + " " + maze[2][5] + " " * 34)
+    tile.addstr.assert_any_call(5, 5, '@')
+    assert all(call.args[0] in (0, 2, 5) for call in tile.addstr.call_args_list)  # Unseen rows stay dark
+
+def test_solver_paths_agree_with_distance_field():
+    """Test BFS, A* and the cached distance field agree, and following next_step reaches the exit."""
+    start, goal = (6, 59), (12, 1)
+    field = solver.distance_field(utils.maze1, goal)
+
+    assert solver.distance_field(utils.maze1, goal) is field
+    assert len(solver.bfs(utils.maze1, start, goal)) - 1 == len(solver.astar(utils.maze1, start, goal)) - 1 == field.distance(*start)
+
+    position, steps = start, 0
+    while position != goal:
+        position = field.next_step(*position)
+        steps += 1
+    assert steps == field.distance(*start)
+
+    solver.invalidate(utils.maze1)
+    assert solver.distance_field(utils.maze1, goal) is not field
+
+
+def test_solver_caches_are_safe_to_share_with_the_prefetch_thread(tmp_path):
+    """Test the main thread and a worker filling and evicting the same caches never trip over each other."""
+    from concurrent.futures import ThreadPoolExecutor
+    mazes = [maze_gen.generate(6, 6, seed=seed) for seed in range(solver.FIELD_CACHE_SIZE * 2)]
+
+    def churn():
+        for _ in range(20):
+            for maze in mazes:
+                assert solver.distance_field(maze, maze.exit).distance(*maze.exit) == 0
+                maze_cache.load(["+--+", f"|{maze.seed:2}|"], cache_dir=tmp_path)
+
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        future = worker.submit(churn)
+        churn()
+        future.result()
+
+
+def test_generated_mazes_are_cached_by_content_not_identity():
+    """Test a freed generated maze's cached field is never handed to a new maze that reuses its address."""
+    assert maze_gen.generate(8, 8, seed=1).key == maze_gen.generate(8, 8, seed=1).key != maze_gen.generate(8, 8, seed=2).key
+    for seed in range(30):
+        maze = maze_gen.generate(8, 8, seed=seed)
+        expected = solver.compute_distance_field(solver.PassableGrid.from_maze(maze), maze.exit)
+        assert list(solver.distance_field(maze, maze.exit).distances) == list(expected.distances)
+        del maze
+
+
+def test_validate_maze_reports_uneven_rows_and_unreachable_exits(mocker):
+    """Test the validator warns about uneven rows and fails a maze whose exit is walled off, without touching the maze cache."""
+    load = mocker.spy(maze_cache, "load")
+    report = validate_maze({"name": "maze10", "rows": utils.maze10, "start": (6, 63), "exit": (12, 1)})
+    assert report["status"] == "WARN"
+    assert report["moves"] == 94
+    assert "uneven rows" in report["issues"][0]
+
+    walled = ["+-----+", "|  |  |", "   |   ", "+-----+"]
+    report = validate_maze({"name": "walled", "rows": walled, "start": (2, 5), "exit": (2, 1)})
+    assert report["status"] == "FAIL"
+    assert "cannot be reached" in report["issues"][0]
+    load.assert_not_called()
+
+
+def test_headless_session_plays_a_scene_to_its_exit():
+    """Test a solver bot finishes battle_scene_1 through main_game_loop without a terminal, and curses is restored."""
+    newwin = curses.newwin
+    result = headless.run_session({"scene": "battle_scene_1", "bot": "solver", "seed": 1, "max_moves": 2000})
+
+    assert result["error"] is None
+    assert result["completed"]
+    assert result["moves"] >= 90  # The shortest path out of maze1
+    assert curses.newwin is newwin
+
+    summary = headless.summarize([result])
+    assert summary["completed"] == 1 and not summary["crashes"]
+
+
+def test_benchmark_compare_flags_regressions():
+    """Test timings only regress beyond the threshold and noise floor, call counts on any growth, and type_text matches the stored baseline."""
+    baseline = {"house_render": {"render_seconds": 0.001, "draw_calls": 18}}
+
+    assert benchmarks.compare({"house_render": {"render_seconds": 0.0014, "draw_calls": 18}}, baseline, threshold=0.5) == []
+    regressions = benchmarks.compare({"house_render": {"render_seconds": 0.002, "draw_calls": 19}, "new": {"x_seconds": 1}}, baseline, threshold=0.5)
+    assert len(regressions) == 2
+
+    # Growth under the noise floor, and any timing of a run not timed like the baseline, is not a regression
+    small = {"entity_move": {"move_seconds": 5e-7}}
+    assert benchmarks.compare({"entity_move": {"move_seconds": 1e-6}}, small) == []
+    assert benchmarks.compare({"house_render": {"render_seconds": 1, "draw_calls": 19}}, baseline, timings=False) == ["house_render draw_calls: 19, baseline 18"]
+
+    runs = [{"house_render": {"render_seconds": 0.003, "draw_calls": 18}}, {"house_render": {"render_seconds": 0.002, "draw_calls": 18}}]
+    assert benchmarks.fastest(runs) == {"house_render": {"render_seconds": 0.002, "draw_calls": 18}}
+
+    with open(benchmarks.BASELINE_FILE) as f:
+        stored = json.load(f)["results"]
+    assert benchmarks.compare(benchmarks.bench_type_text(), stored) == []
+
+
+def test_battle_input_drains_queued_keys_into_one_frame():
+    """Test every queued key is applied before a single flush, the latency is recorded, and keys after the exit are dropped."""
+    level = utils.LEVELS["maze1"]
+    path = solver.bfs(level["maze"], level["start"], level["exit"])
+    source = headless.KeySource([headless.STEP_KEYS[(b[0] - a[0], b[1] - a[1])] for a, b in zip(path, path[1:7])], burst=3)
+    with headless.headless_curses(source, 40, 140) as stdscr:
+        input_handler = InputHandler(stdscr)
+        window = Battle_Window(stdscr, input_handler, level["maze"], *level["view"], *level["start"], exit_position=level["exit"])
+        frames = input_handler.scheduler.frames
+
+        assert input_handler.handle_battle_window_input(window) is None
+        assert (window.entity.y, window.entity.x) == path[3]
+        assert input_handler.scheduler.frames == frames + 1
+        assert input_handler.latency.batches == 1 and input_handler.latency.keys == 3
+
+        # A batch stops at a stop position, dropping the rest of its keys
+        window.stop_positions.add((path[4][0] + window.entity.begin_y, path[4][1] + window.entity.begin_x))
+        input_handler.handle_battle_window_input(window)
+        assert (window.entity.y, window.entity.x) == path[4]
+        assert source.count == 6
+
+
+def test_input_dispatch_uses_registered_handlers():
+    """Test windows dispatch through the registry, subclasses inherit their base's handler, and unknown windows raise."""
+    class Whisper_Window(Narration_Window):
+        pass
+
+    window = object.__new__(Whisper_Window)  # The handler only needs the curses window
+    window.window = MagicMock()
+    window.window.getch.return_value = ord('\n')
+    input_handler = InputHandler(MagicMock())
+
+    assert input_handler.handle_input(window) == 's'
+    assert InputHandler.handlers[Whisper_Window] is InputHandler.handle_narration_window_input
+    with pytest.raises(ValueError):
+        input_handler.handle_input(object())
+
+
+def test_tick_scheduler_runs_coroutines_and_background_tasks():
+    """Test sleeps wake on ticks, periodic tasks run alongside and are cancelled at the end, and jitter is measured."""
+    ticks = TickScheduler(fps=200)
+    frames, saves = [], []
+    ticks.on_tick(lambda: frames.append(ticks.ticks))
+    task = None
+
+    async def main():
+        nonlocal task
+        task = ticks.every(0.01, lambda: saves.append(ticks.ticks))
+        await ticks.sleep(0.06)
+        return "done"
+
+    assert asyncio.run(ticks.run(main())) == "done"
+    assert ticks.ticks >= 10
+    assert frames[:3] == [1, 2, 3]
+    assert len(saves) >= 3
+    assert task.cancelled()
+    assert ticks.jitter.batches == ticks.ticks
+
+
+def test_house_animation_waits_on_game_ticks(mocker):
+    """Test the house walk-in animation waits in game time, never blocking the loop with time.sleep."""
+    sleep = mocker.patch("time.sleep")
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        house = House_Window(stdscr, InputHandler(stdscr), x=32, y=16)
+        start = house.entity.position()
+        ticks = TickScheduler(fps=30, realtime=False)
+        asyncio.run(ticks.run(house.animate_scene1st(ticks)))
+    assert ticks.ticks == 5 * 3  # 0.08 s rounds up to 3 ticks at 30 fps
+    assert house.entity.position()[0] < start[0]
+    sleep.assert_not_called()
+
+
+def test_typewriter_reveals_by_time_and_refreshes_per_frame(mocker):
+    """Test characters are revealed by elapsed time in row runs, and type_text refreshes once per frame whatever the text length."""
+    window = headless.FakeWindow(5, 70)
+    typewriter = Typewriter(window, "Hi there\nfriend", 1, 1, delay=0.1)
+
+    assert typewriter.reveal(now=10.0) == 1
+    assert typewriter.reveal(now=10.45) == 4
+    assert window.draw_calls == 2
+    assert typewriter.finish() == 9 and typewriter.finished
+    assert window.draw_calls == 4  # The rest of "Hi there", then "friend"
+
+    sleep = mocker.patch("time.sleep")
+    for text in ("short", "a much longer line of narration\nwith a second row " * 5):
+        window = headless.FakeWindow(5, 70)
+        ticks = TickScheduler(realtime=False)
+        asyncio.run(ticks.run(Windows.type_text(window, text, 1, 1, ticks, delay=0)))
+        assert window.refreshes == 1
+
+    # Enter completes the line at once
+    window = headless.FakeWindow(5, 70)
+    ticks = TickScheduler(realtime=False)
+    asyncio.run(ticks.run(Windows.type_text(window, "a long line the player skips", 1, 1, ticks, delay=10, skip=lambda: True)))
+    assert window.refreshes == 2 and ticks.ticks == 1
+    sleep.assert_not_called()
+
+
+def test_audio_manager_preloads_crossfades_and_degrades_gracefully(monkeypatch, mocker):
+    """Test tracks decode in the background and crossfade, while missing files and devices leave the game silent."""
+    import pygame
+    mocker.patch("pygame.mixer.init", side_effect=pygame.error("dsp: No such audio device"))
+    audio = AudioManager()
+    assert not audio.start(wait=True)
+    audio.preload("Morning.mp3")
+    audio.play_music("Morning.mp3")
+    audio.play_effect("Door_Slam.mp3")
+    assert "mixer" in audio.errors
+    mocker.stopall()
+
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    audio = AudioManager(fade_ms=50)
+    assert audio.start(wait=True)
+    try:
+        audio.preload("Door_Slam.mp3", "Dark.mp3")
+        for future in list(audio._sounds.values()):
+            future.exception(timeout=10)
+        assert audio.is_loaded("Door_Slam.mp3") and not audio.is_loaded("Dark.mp3")
+
+        audio.play_music("Dark.mp3")  # Missing from the game folder: silence instead of an error
+        assert "Dark.mp3" in audio.errors and not audio._channels[1].get_busy()
+
+        audio.play_music("Door_Slam.mp3")
+        first = audio._current
+        assert audio._channels[first].get_busy()
+        audio.play_music("Door_Slam.mp3")  # Already playing: left alone
+        assert audio._current == first
+
+        audio.cache_bytes = 0
+        audio.preload("Door_Slam.mp3")
+        audio.update()
+        assert audio.is_loaded("Door_Slam.mp3")  # The music playing is never evicted
+    finally:
+        audio.shutdown()
+
+
+def test_startup_loads_no_audio_until_needed(monkeypatch):
+    """Test importing the game does not import pygame, --no-audio never loads it, and startup phases are timed."""
+    check = "import sys, game; assert 'pygame' not in sys.modules, 'pygame imported by game'"
+    subprocess.run([sys.executable, "-c", check], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    monkeypatch.setenv(NO_AUDIO_ENV, "1")
+    audio = AudioManager()
+    assert not audio.start(wait=True)
+    audio.play_music("Morning.mp3")
+    assert audio.music is None and audio._executor is None
+
+    startup = StartupTimer()
+    startup.mark("import")
+    startup.add_background("maze build", 0.002)
+    startup.frame_drawn()
+    startup.frame_drawn()
+    assert list(startup.phases) == ["import", "first frame"]
+    assert startup.first_frame == pytest.approx(sum(startup.phases.values()))
+    assert "maze build (background)" in startup.format()
+
+
+
+def test_startup_report_ends_with_the_menu_render(monkeypatch):
+    """Test the first frame is recorded once the menu is up, not when the closed scroll is drawn, and the report has the menu phase."""
+    class MenuShown(Exception):
+        pass
+
+    async def menu_shown(window):
+        raise MenuShown()
+
+    startup = StartupTimer()
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        game = Game(stdscr, audio=False, autosave=False, startup=startup, realtime=False)
+        monkeypatch.setattr(game, "wait_for_input", menu_shown)
+        with pytest.raises(MenuShown):
+            asyncio.run(game.ticks.run(game.main_menu()))
+
+    assert game.ticks.time() >= 0.2  # The closed scroll was on screen for several frames first
+    assert list(startup.phases) == ["window construction", "menu render"]
+    assert startup.first_frame == pytest.approx(sum(startup.phases.values()))
+    assert "menu render" in startup.format()
+
+def test_binary_save_round_trips_and_rejects_corruption(tmp_path, monkeypatch):
+    """Test saves keep scene, position, inventory and window data, skip unknown sections, and detect corruption."""
+    path = tmp_path / "game.sav"
+    state = GameState((4, 150), "battle_scene_1", {"player": (4, 149), "view": (0, 85)}, {"lantern": 1, "notes": ["a"]})
+    state.save(path)
+    loaded = GameState.load(path)
+    assert (loaded.get_player_position(), loaded.get_current_scene()) == ((4, 150), "battle_scene_1")
+    assert loaded.get_window_data() == {"player": (4, 149), "view": (0, 85)}
+    assert loaded.inventory == {"lantern": 1, "notes": ["a"]}
+    assert GameState.load(tmp_path / "missing.sav") is None
+
+    # A section added by a later version is skipped
+    data = save_format.encode(state)
+    body = zlib.decompress(data[save_format.HEADER.size:]) + save_format.SECTION.pack(99, 3) + b"new"
+    compressed = zlib.compress(body)
+    header = save_format.HEADER.pack(save_format.MAGIC, 1, 0, len(compressed), zlib.crc32(compressed), len(body))
+    assert save_format.decode(header + compressed)["scene"] == "battle_scene_1"
+
+    corrupt = bytearray(path.read_bytes())
+    corrupt[-1] ^= 0xFF
+    path.write_bytes(corrupt)
+    with pytest.raises(save_format.SaveError):
+        GameState.load(path)
+
+    # The game saves the current scene's player and loads it back into the scene
+    monkeypatch.chdir(tmp_path)
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        game = Game(stdscr)
+        game.set_current_scene("battle_scene_1")
+        game.battle_window_1.render()
+        game.battle_window_1.entity.move("right", game.battle_window_1.walls)
+        saved = (game.battle_window_1.entity.y, game.battle_window_1.entity.x)
+        game.save_game()
+
+        game = Game(stdscr)
+        game.load_game()
+        assert game.get_current_scene() == "battle_scene_1"
+        assert (game.battle_window_1.entity.y, game.battle_window_1.entity.x) == saved
+
+
+def test_autosave_journals_moves_and_continues_from_snapshot_and_tail(tmp_path):
+    """Test moves are journaled by the writer thread, compacted into a snapshot, and replayed on top of it, ignoring a torn record."""
+    autosave = AutoSave(tmp_path)
+    autosave.start()
+    window = MagicMock()
+    autosave.new_game("ana")
+    autosave.record_scene("battle_scene_2")
+    for x in (150, 149, 149, 148):
+        window.get_window_data.return_value = {"player": (4, x), "view": (0, 85)}
+        autosave.record_move(window)
+    assert autosave.flush(timeout=5)
+    assert autosave.records == 5  # The repeated position was not queued
+
+    autosave.compact()
+    window.get_window_data.return_value = {"player": (5, 148), "view": (0, 85)}
+    autosave.record_move(window)
+    assert autosave.flush(timeout=5)
+    assert autosave.compactions == 1
+    assert (tmp_path / "autosave.journal").stat().st_size > 0  # Only the move made after the snapshot
+
+    state = autosave.restore()
+    assert (state.get_current_scene(), state.get_player_position(), state.player_name) == ("battle_scene_2", (5, 148), "ana")
+    assert state.get_window_data()["view"] == (0, 85)
+    autosave.stop()
+
+    with open(tmp_path / "autosave.journal", "ab") as f:
+        f.write(b"\x03\x40\x00torn")  # A record cut short by a crash
+    autosave = AutoSave(tmp_path)
+    assert autosave.restore().get_player_position() == (5, 148)
+    autosave.start()
+    autosave.finish()
+    autosave.stop()
+    assert autosave.restore() is None
+
+    # Continuing never waits on the writer: what was queued counts while the writer is stuck on the disk
+    autosave = AutoSave(tmp_path)
+    autosave.start()
+    stuck = threading.Event()
+    autosave._write = lambda *record: stuck.wait()
+    autosave.new_game("ana")
+    autosave.record_scene("house_scene_2")
+    assert autosave.restore().get_current_scene() == "house_scene_2"
+    stuck.set()
+    autosave.stop()
+
+
+def test_continuing_in_the_house_keeps_the_saved_position():
+    """Test the last house scene puts the player back where the autosave left them instead of replaying the walk in."""
+    with headless.headless_curses(headless.KeySource([10] * 20), 40, 140) as stdscr:
+        game = Game(stdscr, audio=False, autosave=False, realtime=False)
+        entity = game.house_window_2.entity
+        saved = (entity.y - 2, entity.x)  # Part of the way in; the walk in would take the player 5 rows up
+        resume = GameState(None, "house_scene_2", {"player": saved}, player_name="ana")
+        asyncio.run(game.ticks.run(game.play_story("ana", resume=resume)))
+
+    assert game.get_current_scene() == "house_scene_2"
+    assert (entity.y, entity.x) == saved
+
+
+def test_replay_round_trips_and_hands_keys_back_on_their_ticks():
+    """Test a recording survives encoding, and the player gives each key on its tick and finishes after the last batch."""
+    game = MagicMock()
+    game.stdscr.getmaxyx.return_value = (40, 140)
+    game.ticks.fps, game.ticks.ticks = 30, 0
+    game.get_current_scene.return_value = None
+    recorder = replay.ReplayRecorder(game)
+    recorder.record_text("ana")
+    game.get_current_scene.return_value = "house_scene_1"
+    for tick, key in ((3, curses.KEY_DOWN), (3, curses.KEY_DOWN), (700, curses.KEY_RIGHT)):
+        game.ticks.ticks = tick
+        recorder.record_key(key)
+
+    recording = replay.decode(replay.encode(recorder.recording))
+    assert (recording.fps, recording.height, recording.width, recording.keys()) == (30, 40, 140, 3)
+    assert [event[:2] for event in recording.events] == [(3, 0), (2, 3), (1, 3), (1, 3), (1, 700)]
+
+    game.ticks.ticks = 0
+    player = replay.ReplayPlayer(recording, game)
+    assert player.text() == "ana"
+    assert player.getch(blocking=False) == -1  # Not its tick yet
+    game.ticks.ticks = 3
+    assert [player.getch(blocking=False) for _ in range(3)] == [curses.KEY_DOWN, curses.KEY_DOWN, -1]
+    game.get_current_scene.return_value = "battle_scene_1"
+    assert player.getch() == curses.KEY_RIGHT  # A blocking read does not wait for the tick
+    assert player.divergences == [(700, "house_scene_1", "battle_scene_1")]
+    assert player.getch(blocking=False) == -1  # The rest of the last batch is still drained
+    game.ticks.ticks = 4
+    with pytest.raises(replay.ReplayFinished):
+        player.getch(blocking=False)
+
+    with pytest.raises(replay.ReplayError):
+        replay.decode(b"LBSV" + bytes(20))
+    with pytest.raises(replay.ReplayError):
+        replay.decode(replay.encode(recording)[:-4])
+
+
+def test_fog_of_war_shows_only_what_the_player_sees(tmp_path):
+    """Test shadowcasting stops at walls, visibility is cached per cell, and a step only redraws the cells that changed."""
+    maze = maze_cache.load([
+        "+----------------+",
+        "|      |         |",
+        "|      |         |",
+        "|                |",
+        "+----------------+",
+    ], cache_dir=tmp_path)
+    visible = fov.visibility(maze, 1, 2)
+    assert 1 * maze.width + 7 in visible  # The wall itself is seen
+    assert 1 * maze.width + 9 not in visible  # What is behind it is not
+    assert 3 * maze.width + 9 in visible  # Through the gap below it
+    assert fov.visibility(maze, 1, 2) is visible
+
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        input_handler = InputHandler(stdscr)
+        window = Battle_Window(stdscr, input_handler, maze, 0, 0, 1, 2, exit_position=(3, 16), fog=True)
+        assert window.draw_calls == 0  # The maze starts dark
+        pad = window.window = window.entity.window = MagicMock()
+        pad.getmaxyx.return_value = (maze.height * 2, maze.width * 2)
+        window.render()
+        assert window.fov.visible == visible
+        pad.addstr.assert_any_call(1, 0, "|      |")
+
+        pad.reset_mock()
+        changed = []
+        input_handler.apply_battle_key(window, curses.KEY_DOWN, changed)
+        shown_and_hidden = fov.visibility(maze, 2, 2) ^ visible
+        drawn = {(y, x + i) for (y, x, text), _ in pad.addstr.call_args_list for i in range(len(text))}
+        assert drawn == {divmod(index, maze.width) for index in shown_and_hidden}
+        assert len(pad.addstr.call_args_list) < len(shown_and_hidden)  # Neighbouring cells share a call
+
+
+def test_world_hashes_entities_and_updates_a_batch_per_tick():
+    """Test occupancy and neighbour queries, batched updates that reach every entity in turn, and drawing only the viewport."""
+    maze = maze_gen.generate(40, 40, seed=2)
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        input_handler = InputHandler(stdscr)
+        window = Battle_Window.for_maze(stdscr, input_handler, maze)
+        world = World(window, dormant_batch=5)
+        window.world = world
+        open_cells = [(y, x) for y in range(1, maze.height) for x in range(1, maze.width)
+                      if world.is_free(y, x) and not window.view_y <= y < window.view_y + 40]  # Away from the viewport
+        far = [world.spawn(y, x, "&") for y, x in open_cells[:20]]
+        with pytest.raises(ValueError):
+            world.spawn(*open_cells[0])
+        assert world.entity_at(*open_cells[0]) is far[0]
+        assert far[1] in world.neighbours(*open_cells[0], radius=3) and far[0] not in world.neighbours(*open_cells[0])
+
+        y, x = window.entity.y, window.entity.x
+        step = next((dy, dx) for dy, dx in ((0, -1), (0, 1), (1, 0), (-1, 0)) if world.is_free(y + dy, x + dx))
+        near = world.spawn(y + step[0], x + step[1], "&", behaviour=lambda entity, world: None)
+        changed = []
+        input_handler.apply_battle_key(window, headless.STEP_KEYS[step], changed)
+        assert (window.entity.y, window.entity.x) == (y, x)  # The player cannot walk into an entity
+
+        turns = {}
+        for entity in far:
+            world.behaviours[entity] = lambda entity, world: turns.__setitem__(entity, turns.get(entity, 0) + 1)
+        window.window = near.window = MagicMock()
+        assert world.update() == [(near.y, near.x)]
+        assert world.updated == 1 + 5  # The entity in view, and a batch of the far ones
+        near.window.addch.assert_called_once_with(near.y, near.x, "&")
+        for _ in range(3):
+            world.update()
+        assert len(turns) == 20 and set(turns.values()) == {1}
+
+        free = next((dy, dx) for dy, dx in STEPS if world.is_free(near.y + dy, near.x + dx))
+        old = (near.y, near.x)
+        world.behaviours[near] = lambda entity, world: free
+        assert sorted(world.update()) == sorted([old, (old[0] + free[0], old[1] + free[1])])
+        assert world.entity_at(*old) is None and world.entity_at(old[0] + free[0], old[1] + free[1]) is near
+
+
+def test_flow_field_follows_the_player_and_leads_pursuers_to_them():
+    """Test the incremental flow field against a full BFS as the player walks, and a pursuer closing in on the player."""
+    maze = maze_gen.generate(30, 30, seed=4)
+    field = FlowField(maze, radius=12)
+    path = solver.bfs(maze, maze.start, maze.exit)
+    for y, x in path[:40]:
+        field.update(y, x)
+        expected = solver.compute_distance_field(field.grid, (y, x)).distances
+        assert all(field.distance(cell // field.grid.width, cell % field.grid.width) == (d if d <= 12 else -1)
+                   for cell, d in enumerate(expected))
+    assert field.rebuilds == 1 and field.updates == 39  # Only the first cell was searched from scratch
+    for seed in range(20):  # Each new maze gets its own grid, even at a freed maze's address
+        other = maze_gen.generate(10, 10, seed=seed)
+        assert FlowField(other).grid.cells == solver.PassableGrid.from_maze(other).cells
+        del other
+
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        window = Battle_Window.for_maze(stdscr, InputHandler(stdscr), maze)
+        world = window.world
+        y, x = path[10]
+        hunter = world.spawn(y, x, "&", behaviour=pursuer())
+        distance = world.flow.distance(y, x)
+        assert distance == 10
+        for _ in range(distance - 1):
+            world.update()
+        assert world.flow.distance(hunter.y, hunter.x) == 1
+        world.update()  # Next to the player, and never onto them
+        assert abs(hunter.y - path[0][0]) + abs(hunter.x - path[0][1]) == 1 and world.timings["flow_seconds"] >= 0
+
+
+def test_maze_files_index_levels_and_decode_rows_on_demand(tmp_path):
+    """Test the maze file header, the level index reading only headers, rows read through mmap, and the built-in levels."""
+    maze = maze_gen.generate(6, 9, seed=3)
+    maze_files.write(tmp_path / "b.maze", maze, maze.start, maze.exit, view=(1, 2))
+    (tmp_path / "a.maze").write_text(maze_files.format_header(3, 4, (1, 2), (1, 1), (0, 0)) + "+--+\n|  |\n")
+    (tmp_path / "notes.txt").write_text("not a level")
+
+    levels = maze_files.LevelIndex(str(tmp_path))
+    assert list(levels) == ["a", "b"]
+    assert levels.header("b") == {"height": maze.height, "width": maze.width, "start": maze.start, "exit": maze.exit, "view": (1, 2)}
+    level = levels["b"]
+    assert level["maze"]._map is None  # Nothing past the header is read until a row is
+    assert level["maze"][3] == maze[3] and list(level["maze"]) == list(maze) and level["maze"][-1] == maze[-1]
+    assert maze_cache.maze_key(level["maze"]) == maze_cache.maze_key(list(maze))
+    with pytest.raises(maze_files.MazeFileError):
+        levels["a"]["maze"][0]  # The header says 3 rows, the file has 2
+    (tmp_path / "c.maze").write_text("+--+\n")
+    with pytest.raises(maze_files.MazeFileError):
+        list(maze_files.LevelIndex(str(tmp_path)))
+
+    with headless.headless_curses(headless.KeySource(), 40, 140) as stdscr:
+        game = Game(stdscr, audio=False, autosave=False)
+        game.scenes.prefetch("battle_scene_2")
+        window = game.scenes.get("battle_scene_2")
+        assert utils.LEVELS["maze2"]["maze"]._map is None  # Built from the compiled maze; the file is not kept mapped
+        assert window.maze[15] == utils.LEVELS["maze2"]["maze"][15]
+
+    assert isinstance(utils.LEVELS["maze3"]["maze"], maze_files.MazeFile)
+    assert utils.maze3 == list(utils.LEVELS["maze3"]["maze"]) and len(utils.maze3) == utils.LEVELS.header("maze3")["height"]
+    with pytest.raises(AttributeError):
+        utils.maze4
+
@@ -0,0 +1,173 @@
+import curses
+from collections import OrderedDict
+
+# Size of one tile in pad cells. The viewport (18 x 64 by default) spans at most 2 x 2 tiles.
+TILE_HEIGHT = 32
+TILE_WIDTH = 128
+
+# Tiles further than this many tiles away from the viewport are evicted
+TILE_MARGIN = 1
+
+# Mazes with more glyphs than this get a TiledPad instead of one pad for the whole maze
+TILED_MAZE_CELLS = 250_000
+
+
+class TiledPad:
+    def __init__(self, maze, height, width, tile_height=TILE_HEIGHT, tile_width=TILE_WIDTH, margin=TILE_MARGIN, blank=False):
+        """
+        Initialize the TiledPad class.
+
+        Stands in for a curses pad covering a whole maze, but only keeps small pads (tiles) for the
+        area around the viewport. Tiles are filled from the maze rows when the viewport reaches them
+        and evicted once it moves away, so memory depends on the viewport size, not the maze size.
+
+        :param maze: is the maze to show (list of strings, CompiledMaze or GeneratedMaze).
+        :param height: is the height of the pad this replaces.
+        :param width: is the width of the pad this replaces.
+        :param tile_height: is the number of rows in each tile.
+        :param tile_width: is the number of columns in each tile.
+        :param margin: is the number of tiles kept around the viewport before evicting.
+        :param blank: is True to start every tile empty and only show what is written, as under fog of war.
+                      Maze glyphs written to the pad are then remembered as one byte per maze cell, not as
+                      overlays, so a tile paged back in shows what was revealed on it.
+        """
+        self.maze = maze
+        self.height = height
+        self.width = width
+        self.tile_height = tile_height
+        self.tile_width = tile_width
+        self.margin = margin
+        self.blank = blank
+        self._tiles = OrderedDict()  # (tile_y, tile_x) -> curses pad
+        self._overlay = {}  # (tile_y, tile_x) -> {(y, x): character written over the maze glyph (the player, hints...)}
+        self.maze_height = len(maze)
+        self.maze_width = getattr(maze, "width", None) or max((len(row) for row in maze), default=0)
+        # Under fog, 1 for every maze cell currently showing its glyph, indexed y * maze_width + x like a WallGrid
+        self._seen = bytearray(self.maze_height * self.maze_width) if blank else None
+        self.tiles_loaded = 0  # Number of times a tile was materialized
+
+    # The parts of the curses pad interface the game uses
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def getbegyx(self):
+        return 0, 0
+
+    def addch(self, y, x, char):
+        self.addstr(y, x, char if isinstance(char, str) else chr(char))
+
+    def addstr(self, y, x, text):
+        seen, in_maze = self._seen, 0 <= y < self.maze_height
+        # Under fog a run of darkness needs no glyphs to compare with
+        glyphs = self._row_segment(y, x, x + len(text)) if in_maze and x >= 0 and (seen is None or text.strip()) else ""
+        tile_y, tile_row = divmod(y, self.tile_height)
+        for i, char in enumerate(text):
+            key = (tile_y, (x + i) // self.tile_width)
+            if char == (glyphs[i] if i < len(glyphs) else " ") or seen is not None and char == " ":
+                # The plain maze (or darkness, under fog): only the seen bit has to be remembered
+                overlay = self._overlay.get(key)
+                if overlay and overlay.pop((y, x + i), None) and not overlay:
+                    del self._overlay[key]
+                if seen is not None and in_maze and x + i < self.maze_width:
+                    seen[y * self.maze_width + x + i] = char != " "
+            else:
+                self._overlay.setdefault(key, {})[(y, x + i)] = char
+
+        # Copy the text to the loaded tiles it crosses, one call per tile
+        start = 0
+        while start < len(text):
+            tile_x, column = divmod(x + start, self.tile_width)
+            stop = min(len(text), start + self.tile_width - column)
+            tile = self._tiles.get((tile_y, tile_x))
+            if tile is not None:
+                tile.addstr(tile_row, column, text[start:stop])
+            start = stop
+
+    def noutrefresh(self, pad_y, pad_x, top, left, bottom, right):
+        """
+        Copy the visible part of the tiles to the virtual screen, paging tiles in and out as needed.
+        """
+        last_y = min(pad_y + bottom - top, self.height - 1)
+        last_x = min(pad_x + right - left, self.width - 1)
+        first_tile_y, last_tile_y = pad_y // self.tile_height, last_y // self.tile_height
+        first_tile_x, last_tile_x = pad_x // self.tile_width, last_x // self.tile_width
+
+        for tile_y in range(first_tile_y, last_tile_y + 1):
+            for tile_x in range(first_tile_x, last_tile_x + 1):
+                tile = self._tile(tile_y, tile_x)
+                tile_top, tile_left = tile_y * self.tile_height, tile_x * self.tile_width
+                from_y, from_x = max(pad_y, tile_top), max(pad_x, tile_left)
+                to_y = min(last_y, tile_top + self.tile_height - 1)
+                to_x = min(last_x, tile_left + self.tile_width - 1)
+                tile.noutrefresh(
+                    from_y - tile_top, from_x - tile_left,
+                    top + from_y - pad_y, left + from_x - pad_x,
+                    top + to_y - pad_y, left + to_x - pad_x,
+                )
+
+        self._evict(first_tile_y, last_tile_y, first_tile_x, last_tile_x)
+
+    def touchwin(self):
+        for tile in self._tiles.values():
+            tile.touchwin()
+
+    def refresh(self, pad_y, pad_x, top, left, bottom, right):
+        self.noutrefresh(pad_y, pad_x, top, left, bottom, right)
+        curses.doupdate()
+
+    def memory_footprint(self, cell_bytes=28):
+        """
+        Return the estimated number of bytes held by the materialized tiles.
+        """
+        return len(self._tiles) * self.tile_height * (self.tile_width + 1) * cell_bytes
+
+    def loaded_tiles(self):
+        return list(self._tiles)
+
+    def _row_segment(self, y, start, stop):
+        if hasattr(self.maze, "row_segment"):
+            return self.maze.row_segment(y, start, stop)
+        return self.maze[y][start:stop]
+
+    def _tile(self, tile_y, tile_x):
+        """
+        Return a tile, filling a new pad from the maze rows if it is not loaded.
+        """
+        key = (tile_y, tile_x)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+
+        # One spare column so full-width rows can be written without hitting the bottom-right corner
+        tile = curses.newpad(self.tile_height, self.tile_width + 1)
+        top, left = tile_y * self.tile_height, tile_x * self.tile_width
+        stop = min(left + self.tile_width, self.maze_width)
+        for y in range(top, min(top + self.tile_height, self.maze_height)):
+            if self.blank:
+                # Only the cells revealed so far; the rest of the row stays dark
+                seen = self._seen[y * self.maze_width + left:y * self.maze_width + stop]
+                if 1 not in seen:
+                    continue
+                segment = "".join(char if shown else " " for char, shown in zip(self._row_segment(y, left, stop), seen))
+            else:
+                segment = self._row_segment(y, left, left + self.tile_width)
+            if segment:
+                tile.addstr(y - top, 0, segment)
+
+        for (y, x), char in self._overlay.get(key, {}).items():
+            tile.addstr(y - top, x - left, char)
+
+        self._tiles[key] = tile
+        self.tiles_loaded += 1
+        return tile
+
+    def _evict(self, first_tile_y, last_tile_y, first_tile_x, last_tile_x):
+        """
+        Drop every tile that is more than `margin` tiles away from the visible ones.
+        """
+        for tile_y, tile_x in list(self._tiles):
+            if (first_tile_y - self.margin <= tile_y <= last_tile_y + self.margin
+                    and first_tile_x - self.margin <= tile_x <= last_tile_x + self.margin):
+                continue
+            del self._tiles[(tile_y, tile_x)]
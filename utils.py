@@ -1,160 +1,20 @@
+import maze_files
 
-
-maze1 = [
-    "+---------------------------------------------------------------+",#Size = (22, 63)
-    "|     +-----+       +---+   +-----+     +-----+                 |",
-    "|     |     |  +----+   |   |     |  +--+     |--+--+           |",
-    "|__+--+  +--+  |   +---+   +--+   |  |  |  +--+  |  |  +---+    |",
-    "|  |           |   |              |  |  |  |     |  |  |   |    |",
-    "|  |  +-----+  |   |  +--+     +--+  |  |  +--+  |  |++|   +---+|",
-    "|  |  |     |  |   |  |  |     |  |  |     |  |  |  |  |        |",#Entrance = (6,63)
-    "|  +--+  +--+  |   +--+  +--+  |  +--+     |  |     |  |    +--+|",
-    "|     |     |  |                                            |   |",
-    "|     |  +--+  +--+  +-----+  +--+  +-----+  +--+  |  |  +--+   |",
-    "|     |  |     |        |        |  |     |        |  |  |      |",
-    "|  +--+  |  +--+  +--+  +--+     |  +--+  +--+  +--+  |  |  |   |",
-    "   |        |     |     |  |  +--+  |     |        |  |  |  |   |",
-    "|  |  +--+  +--+  |  +--+  +--+     |     +--+  +--+  +--+  |   |",
-    "|  |     |  |        |     |     +--+  |        |     |  +--+   |",
-    "|  |  +--+  +--+  +--+  +--+  +--+  |  +--+  +--+  +--+  +--+   |",
-    "|  |     |     |     |     |     |  |  |  |     |     |     |   |",
-    "|  +--+  +--+  +--+  |  +--+  +--+  |  +--+  |  +--+  +--+  +--+|",
-    "|     |  |     |     |  |     |     |  |     |     |  |     |   |",
-    "|     |  +--+  +--+  |  |  +--+  +--+  +--+  |  +--+  |  +--+   |",
-    "|     |     |  |     |  |  |        |     |  |     |  |  |      |",
-    "|  +--+--+--+  +--+  +--+  |  +--+  +--+  +--+  +--+  +--+  +--+|",
-    "|  |  |     |     |  |  +--+  |  |     |     |  |  |            |",
-    "|                    |  +--+  +--+  +--+  +--+  +--+            |",
-    "----------------------------------------------------------------"
-]
-
-maze10 = [
-    "+---------------------------------------------------------------+",#Size = (22, 63)
-    "|     +-----+       +---+   +-----+     +-----+                 |",
-    "|     |     |  +----+   |   |     |  +--+     |--+--+           |",
-    "|__+--+  +--+  |   +---+   +--+   |  |  |  +--+  |  |  +---+    |",
-    "|  |           |   |              |  |  |  |     |  |  |   |    |",
-    "|  |  +-----+  |   |  +--+     +--+  |  |  +--+  |  |++|   +---+|",
-    "|  |  |     |  |   |  |  |     |  |  |     |  |  |  |  |         ", #Entrance = (6,63)
-    "|  +--+  +--+  |   +--+  +--+  |  +--+     |  |     |  |    +--+|",
-    "|     |     |  |                                            |   |",
-    "|     |  +--+  +--+  +-----+  +--+  +-----+  +--+  |  |  +--+   |",
-    "|     |  |     |        |        |  |     |        |  |  |      |",
-    "|  +--+  |  +--+  +--+  +--+     |  +--+  +--+  +--+  |  |  |   |",
-    "   |        |     |     |  |  +--+  |     |        |  |  |  |   |",
-    "|  |  +--+  +--+  |  +--+  +--+     |     +--+  +--+  +--+  |   |",
-    "|  |     |  |        |     |     +--+  |        |     |  +--+   |",
-    "|  |  +--+  +--+  +--+  +--+  +--+  |  +--+  +--+  +--+  +--+   |",
-    "|  |     |     |     |     |     |  |  |  |     |     |     |   |",
-    "|  +--+  +--+  +--+  |  +--+  +--+  |  +--+  |  +--+  +--+  +--+|",
-    "|     |  |     |     |  |     |     |  |     |     |  |     |   |",
-    "|     |  +--+  +--+  |  |  +--+  +--+  +--+  |  +--+  |  +--+   |",
-    "|     |     |  |     |  |  |        |     |  |     |  |  |      |",
-    "|  +--+--+--+  +--+  +--+  |  +--+  +--+  +--+  +--+  +--+  +--+|",
-    "|  |  |     |     |  |  +--+  |  |     |     |  |  |            |",
-    "|                    |  +--+  +--+  +--+  +--+  +--+            |",
-    "----------------------------------------------------------------"
-]
-
-maze2 = [
-    "+-----------------------------------------------------------------------------------------------------------------------------------------------------+",#Size = (21,150)
-    "|     +-----+       +---+   +-----+     +-----+                 +---+        +-----+         +-----+                +---+        +---+                |",
-    "|     |     |  +----+   |   |     |  +--+     |--+--+           |   |        |     |     +---+     |                |   |     +---+   |  +-----+      |",
-    "|__+--+  +--+  |   +---+   +--+   |  |  |  +--+  |  |  +---+    +---+  +--+  +--+   |  +--+  |  +--+  +--+      +--+ +---+  +--+   |   |        +--+  |",
-    "|  |           |   |              |  |  |  |     |  |  |   |           |  |        |  |     |  |              +--+      |        |   |        |  |    |", 
-    "|  |  +-----+  |   |  +--+     +--+  |  |  +--+  |  |++|   +---+     +--+  +--+     |  +-----+  |  +--+  +--+  +--+  +---+  +--+  +---+  +--+   |  +-+|",
-    "|  |  |     |  |   |  |  |     |  |  |     |  |  |  |  |         |    |     |      |           |  |  |     |     |     |     |           |        |   |",
-    "|  +--+  +--+  |   +--+  +--+  |  +--+     |  |     |  |    +--+ |     |  +--+  +--+|  +-----+  +--+  +--+  |  +--+     +--+  +--+  +-----+     +--+  |",
-    "|     |     |  |                     |                      |    |        |     |     |           |           |              |                    |   |",
-    "|     |  +--+  +--+  +-----+  +--+  +-----+  +--+  |  |  +--+    +---+  +--+  +--+  +--+  +-----+ +--+  +--+  +---+  +--+  +--+  +--+  +-----+  +---+ |",
-    "|     |  |     |        |        |  |     |        |  |  |            |  |              |           |     |           |           |           |   |   |",
-    "|  +--+  |  +--+  +--+  +--+     |  +--+  +--+  +--+  |  |  +---+  +--+  |  +-----+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +---+  +-----+  +--+  |",
-    "   |        |     |     |  |  +--+  |     |        |  |  |  |     |        |     |        |        |        |              |           |              |", 
-    "|  |  +--+  +--+  |  +--+  +--+     |     +--+  +--+  +--+  +--+  |  +--+  +--+   +--+  +--+  +--+  +--+  +--+  +-----+  +--+  +--+  +---+  +--+  +--+|",
-    "|  |     |  |        |     |     +--+  |        |     |  +--+  +--+     |     |        |           |     |              |     |        |     |         ",#Entrance = (15,150)
-    "|  |  +--+  +--+  +--+  +--+  +--+  |  +--+  +--+  +--+  +--+  +--+     +--+  +--+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +--+  +--+ |",
-    "|  |     |     |     |     |     |  |  |  |     |     |     |     |        |     |        |     |           |     |           |           |           |",
-    "|  +--+  +--+  +--+  |  +--+  +--+  |  +--+  |  +--+  +--+  +--+  +--+  +--+  +--+  +--+  |  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +---+   |",
-    "|     |  |     |     |  |     |     |  |     |     |  |     |     |        |        |     |     |     |        |     |           |           |    |   |",
-    "|     |  +--+  +--+  |  |  +--+  +--+  +--+  |  +--+  |  +--+  |  +--+     |  +--+  |  +--+  +--+  +--+  +---+  +--+  +---+  +--+  +--+  +---+  +---+ |",
-    "|     |     |  |     |  |  |        |     |  |     |  |  |     |     |     |     |        |           |        |     |        |        |           |  |",
-    "|  +--+--+--+  +--+  +--+  |  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +--+ |",
-    "|  |  |     |     |  |  +--+  |  |     |     |  |  |            |     |           |  |              |     |        |     |     |     |     |          |",
-    "|                    |  +--+  +--+  +--+  +--+  +--+            +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +--+   |",
-    "|     +---+  +--+                    |  +--+              |     |     |           |     |              |           |        |        |                |",
-    "|  +--+   |  +--+  +--+  +--+  +--+     +--+  +-----+  +--+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +--+  +--|",
-    "|        |              |     |     |           |     |     |        |        |           |     |           |     |              |           |        |",
-    "|__+--+  +--+  +--+  +--+  +--+  +--+  +--+     +--+  |  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +---+  +--+  +--+  +---+ |",
-    "|     |        |              |     |     |              |     |     |  |        |     |              |        |     |     |     |     |              |",
-    "|  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +---+  +--+  +--+  +--+  +--+  +--+  +---+  |",
-    "+-----------------------------------------------------------------------------------------------------------------------------------------------------+",
-]
-
-maze3=[
-"     ##      ##          ##  ##  ##      ##  ##  ##      ##          ##  ##      ##  ##      ##  ##                           ||",#Size = (63,123)
-"  ##  ##  ######  ######  ##  ##  ##  ######  ######  ##  ##########  ##  ##  ######  ##########  ##                    ‡‡====‡‡",
-"  ##  ##          ##  ##  ##  ##          ##          ##      ##  ##  ##  ##      ##          ##      ||                      ||",
-"  ##  ##############  ##  ##  ##############  ##############  ##  ##  ##########  ##########  ####‡‡  ||  ‡‡  ‡‡==‡‡  ‡‡==‡‡  ||",
-"  ##          ##      ##      ##          ##  ##              ##      ##      ##      ##      ##      ||      ||      ||        ",#Entrance = (5,123)
-"####  ######  ##  ##  ##  ######  ######  ##  ##########################  ##  ######  ##  ########‡‡  ‡‡==‡‡==‡‡  ##‡‡‡‡  ##‡‡‡‡",
-"  ##  ######      ##  ##          ######  ##      ##                      ##          ##      ##          ||####      ##  ##    ",
-"  ##  ##############  ##################  ######  ##  ##################  ##################  ##  ‡‡  ‡‡  ||########  ##  ##  ##",
-"      ##          ##  ##          ##              ##  ##      ##      ##      ##          ##  ##      ||  ||      ##  ##      ##",
-"########  ##########  ######  ##  ##  ##############  ##  ######  ##########  ##  ######  ##  ####‡‡  ||  ||  ######  ##########",
-"          ##      ##  ##      ##  ##      ##      ##      ##      ##      ##  ##      ##  ‡‡  ‡‡      ||  ||          ##      ##",
-"########  ##  ##  ##  ##  ##  ##  ######  ##  ##  ######  ##  ######  ##  ##  ######‡‡‡‡  ‡‡  ||  ‡‡==‡‡  ||####  ######  ##  ##",
-"   #      ##  ##      ##  ##  ##  ##  ##  ##  ##      ##      ##      ##      ##              ||      ##  ||####          ##    ",
-"#  #  ##  ##  ##############  ##  ##  ##  ##  ######  ##########  ####‡‡======‡‡  ‡‡==‡‡======‡‡==‡‡####  ||####################",
-"#  #  ##  ##      ######      ##      ##  ‡‡      ##          ##      ||          ||  ||          ||      ||      ##            ",
-"#  #####  ######  ######  ####‡‡======‡‡  ‡‡==‡‡  ##  ######  ####‡‡  ‡‡      ‡‡==‡‡  ‡‡  ‡‡==‡‡  ‡‡  ‡‡==‡‡  ##  ##############",
-"#     ##  ##      ##      ##                  ||  ##      ‡‡      ||                      ||              ||  ##          ##    ",
-"####  ##  ##  ######  ######  ‡‡              ‡‡==‡‡####  ||######‡‡==‡‡        ‡‡‡‡======‡‡  ##‡‡========‡‡  ##########  ##  ##",
-"|     ##              ##      ||                  ||      ||                      ||      ||  ##  ##          ##      ##      ##",
-"|   ################  ##  ####‡‡==========‡‡  ‡‡  ‡‡  ‡‡==‡‡  ########‡‡      ‡‡==‡‡  ‡‡  ||  ##  ##  ##############  ##  ######",
-"|   ########      ##      ##      ##      ##  ||      ||####  ##                      ||  ||      ##                  ##  ##    ",
-"|   ##        ##  ##########  ##  ##  ##  ##  ‡‡======‡‡####  ##  ####‡‡##‡‡==‡‡======‡‡  ‡‡  ##########################  ##  ##",
-"|   ########  ##      ##      ##  ##  ##      ||          ##  ##  ##          ||          ##              ##          ##  ##    ",
-"|   ########  ######  ##  ##  ##  ##########‡‡‡‡  ######  ##  ######  ‡‡==‡‡  ||  ######  ##############  ##  ######  ##  ######",
-"#  #####      ##      ##  ##  ##  ##      ######      ‡‡      ++      ||  ||  ||  ######      ##      ##  ##  ##      ##      ##",
-"#  #####  ######  ######  ##  ######  ##  ########‡‡##‡‡======‡‡==‡‡==‡‡  ||  ||  ##########  ######  ##  ##  ##  ##########  ##",
-"#     ##  ##      ######  ##          ##                                  ||  ||  ##      ##      ##  ##      ##              ##",
-"####  ##  ##  ##########  ##  ##########  ########‡‡                      ||  ||  ##  ##########  ##  ##########  ##########  ##",
-"####      ##              ##      ######      ##            _____         ||  ||  ‡‡              ##          ##          ##  ##",
-"################################  ##############  ‡‡       /     \        ||  ‡‡  ||  ##################  ##  ##############  ##",
-"      ##          ##      ##  ##          ##      ||      | x   x |       ||      ||          ##          ##              ##    ",
-"########  ######  ##  ##  ##  ##  ######  ##  ####||       \ |_| /        ‡‡  ‡‡==‡‡########  ##  ##  ####‡‡==========‡‡  ######",
-"          ‡‡      ##  ##      ##      ##  ##      ||        |   |             ||              ##  ##  ##  ||          ||        ",
-"####‡‡‡‡  ||  ######  ##############  ##  ######  ||        |||||         ‡‡  ||########  ######  ##  ##  ||          ||####‡‡‡‡",
-"          ||  ######      ##########  ##      ##  ||                      ||  ||          ##  ‡‡  ##      ||      ‡‡  ||      ||",
-"  ‡‡======‡‡  ##########  ##########  ##########  ||                      ||  ||  ‡‡======‡‡  ||  ########||      ||  ‡‡  ‡‡  ‡‡",
-"  ||      ##          ##      ######      ##      ||                      ||  ||  ||          ||  ‡‡      ||      ||      ||    ",
-"  ||  ##############  ##  ##  ######  ##  ##  ####‡‡======‡‡  ‡‡======‡‡==‡‡  ||  ‡‡      ‡‡==‡‡  ||  ##  ||      ‡‡======‡‡    ",
-"  ||  ‡‡              ##  ##          ##  ##      ##      ##  ||      ||      ||          ||      ||  ##  ||                    ",
-"  ‡‡  ||  ######################################  ######  ##  ‡‡==‡‡  ||  ##‡‡‡‡##‡‡    ‡‡‡‡  ‡‡==‡‡####  ‡‡==============‡‡    ",
-"      ||          ‡‡      ‡‡              ##      ##      ##          ||  ##          ‡‡      ||####      ||                    ",
-"==‡‡  ‡‡======‡‡  ‡‡==‡‡  ||  ##########  ##  ######  ##  ##‡‡========‡‡####  ##  ‡‡==‡‡  ‡‡==‡‡####  ‡‡==‡‡  ##########  ‡‡====",
-"  ##                      ||  ##########      ######  ##  ##                  ##      ##      ||      ||      ##          ##    ",
-"####  ‡‡======‡‡==========‡‡  ######################  ##  ##  ######################  ##‡‡‡‡  ‡‡  ‡‡==‡‡########  ##  ######  ##",
-"  ##          ||  ##                          ######  ##  ##  ######              ##  ######      ||              ##      ##    ",
-"  ##‡‡====‡‡  ||  ##  ######################  ######  ######  ######  ##  ######  ##  ######‡‡‡‡  ||  ##########  ##############",
-"      ##      ||          ##              ##  ##      ##      ##      ##      ##  ##  ##          ||  ##      ##      ##      ##",
-"####  ##  ##‡‡‡‡############  ##########  ##  ##  ######  ######  ##############  ######  ##  ##‡‡‡‡  ##  ##  ##########  ##  ##",
-"      ##      ##              ##      ##  ##          ##          ##          ##  ##      ##      ##  ##  ##              ##  ##",
-"  ##  ######  ##  ##########  ##  ##  ##############  ##########  ##  ######  ##  ##  ##########  ##  ##  ##################  ##",
-"  ##  ##          ######          ##              ##  ##      ##  ##      ##  ##  ##      ##      ##  ##  ##  ##              ##",
-"  ##  ##  ##############  ######################  ##  ##  ######  ######  ##  ##  ######  ##########  ##  ##  ##  ##############",
-"  ##      ##      ##      ##########      ##      ##  ##          ##      ##  ##      ##      ##      ##      ##              ##",
-"  ##########  ######  ##############  ##  ##########  ##############  ##  ##########  ######  ##  ##########  ##############  ##",
-"  ##      ##          ##          ##  ##      ######  ##              ##  ##          ##      ##          ##      ##      ##  ##",
-"  ##  ##  ##########  ##  ######  ##  ######  ######  ##  ##  ##########  ##  ##########  ##############  ######  ##  ######  ##",
-"  ##  ##          ##  ##  ##  ##  ##  ##      ##      ##  ##  ##      ##      ##      ##  ##          ##  ##      ##      ##  ##",
-"  ##  ##########  ##  ##  ##  ##  ######  ######  ######  ######  ##  ##########  ######  ######  ##  ##  ##############  ##  ##",
-"  ##  ##      ##  ##  ##      ##      ##          ##  ##          ##          ##          ##      ##  ##                  ##  ##",
-"####  ##  ##  ##  ##  ##  ##########  ##############  ##############  ##############  ######  ######  ######################  ##",
-"  ##  ##  ##      ##  ##  ##          ##          ##  ##          ##      ##      ##      ##  ##      ######              ##    ",
-"  ##  ##  ##########  ##  ######  ##########  ##  ##  ##  ######  ##  ######  ##  ##########  ##############  ##########  ######",
-"      ##              ##      ##          ##  ##  ##  ##      ##      ##      ##  ##      ##  ##                      ##      ‡‡",
-"############  ##############  ##########  ##  ##  ##  ######  ##########  ######  ##  ##  ##  ##  ####‡‡==================‡‡  ||",
-]
+# The labyrinths live in mazes/, one file per level with its initial viewport, player start and exit in
+# pad (y, x) coordinates. utils.LEVELS indexes them, and utils.maze1 and friends are the rows of a level
+# as a list of strings; both are only read the first time they are used.
 
 
+def __getattr__(name):
+    """
+    Load LEVELS, or the rows of a level by its name, the first time they are used.
+    """
+    if name == "LEVELS":
+        value = maze_files.LevelIndex()
+    else:
+        levels = globals()["LEVELS"] if "LEVELS" in globals() else __getattr__("LEVELS")
+        if name.startswith("__") or name not in levels:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        value = list(levels[name]["maze"])
+    globals()[name] = value
+    return value
@@ -0,0 +1,177 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import maze_cache
+import maze_files
+import solver
+import utils
+
+
+def parse_position(text):
+    """
+    Parse a "y,x" command-line position.
+    """
+    y, x = text.split(",")
+    return int(y), int(x)
+
+
+def find_openings(rows):
+    """
+    Guess the start and exit of a maze file from the gaps in its border: the exit is the first gap
+    on the west border, the start the first gap on the east border, mirroring the built-in mazes.
+
+    :return: is a (start, exit) pair; either may be None if no gap was found.
+    """
+    width = max((len(row) for row in rows), default=0)
+    exit_position = next(((y, 1) for y, row in enumerate(rows) if row[:1] == " "), None)
+    start = next(((y, width - 2) for y, row in enumerate(rows) if len(row) < width or row[-1:] == " "), None)
+    return start, exit_position
+
+
+def load_maze_file(path, start=None, exit_position=None):
+    """
+    Read a maze file into a validation job: a maze_files file with its header, or a plain text file
+    (one row per line) whose start and exit are guessed.
+    """
+    if path.endswith(maze_files.EXTENSION):
+        maze = maze_files.MazeFile(path)
+        return {
+            "name": os.path.basename(path),
+            "rows": list(maze),
+            "start": start or maze.start,
+            "exit": exit_position or maze.exit,
+        }
+    with open(path, encoding="utf-8") as f:
+        rows = [line.rstrip("\n") for line in f]
+    while rows and not rows[-1]:
+        rows.pop()
+    guessed_start, guessed_exit = find_openings(rows)
+    return {
+        "name": os.path.basename(path),
+        "rows": rows,
+        "start": start or guessed_start,
+        "exit": exit_position or guessed_exit,
+    }
+
+
+def validate_maze(job):
+    """
+    Validate one maze: dimension consistency, entrance and exit consistency, and reachability.
+
+    :param job: is a dict with the maze "name", its "rows", and the "start" and "exit" positions.
+    :return: is a report dict with the status ("OK", "WARN" or "FAIL"), the issues found and the time taken.
+    """
+    started = time.perf_counter()
+    rows, start, exit_position = job["rows"], job["start"], job["exit"]
+    errors, warnings = [], []
+    moves = None
+
+    # Dimension consistency
+    height = len(rows)
+    widths = [len(row) for row in rows]
+    width = max(widths, default=0)
+    if height == 0 or width == 0:
+        errors.append("maze is empty")
+    else:
+        uneven = [y for y, row_width in enumerate(widths) if row_width != width]
+        if uneven:
+            listed = ", ".join(f"{y} ({widths[y]})" for y in uneven[:5])
+            more = f" and {len(uneven) - 5} more" if len(uneven) > 5 else ""
+            warnings.append(f"uneven rows: width is {width} but rows {listed}{more} differ")
+
+    # Entrance and exit consistency
+    for label, position in (("start", start), ("exit", exit_position)):
+        if position is None:
+            errors.append(f"no {label} position")
+        elif not (0 < position[0] < height and 0 < position[1] < width):
+            errors.append(f"{label} {position} is outside the {height}x{width} maze")
+
+    if not errors:
+        # Compiled in memory: validating a level pack leaves nothing in the maze cache, on disk or in memory
+        grid = solver.PassableGrid.from_maze(maze_cache.parse_artifact(None, maze_cache.compile_maze(rows)))
+        if not grid.is_passable(*exit_position):
+            errors.append(f"exit {exit_position} is a wall")
+        if not grid.is_passable(*start):
+            warnings.append(f"start {start} is on a wall glyph")
+        if start == exit_position:
+            errors.append("start and exit are the same cell")
+
+    # Reachability from the start to the exit
+    if not errors:
+        field = solver.compute_distance_field(grid, exit_position)
+        moves = field.distance(*start)
+        if moves < 0:
+            step = field.next_step(*start)
+            moves = field.distance(*step) + 1 if step is not None else -1
+        if moves < 0:
+            errors.append(f"exit {exit_position} cannot be reached from start {start}")
+
+    status = "FAIL" if errors else "WARN" if warnings else "OK"
+    return {
+        "name": job["name"],
+        "size": (height, width),
+        "status": status,
+        "moves": moves,
+        "issues": errors + warnings,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def build_jobs(targets, start=None, exit_position=None):
+    """
+    Turn command-line targets into validation jobs: names from utils.LEVELS or paths to maze files.
+    """
+    jobs = []
+    for target in targets or list(utils.LEVELS):
+        if target in utils.LEVELS:
+            level = utils.LEVELS[target]
+            jobs.append({
+                "name": target,
+                "rows": list(level["maze"]),
+                "start": start or level["start"],
+                "exit": exit_position or level["exit"],
+            })
+        elif os.path.isfile(target):
+            jobs.append(load_maze_file(target, start, exit_position))
+        else:
+            raise SystemExit(f"Unknown maze: {target}")
+    return jobs
+
+
+def print_report(reports, total_seconds, file=sys.stdout):
+    """
+    Print one line per maze followed by its issues, and a summary line.
+    """
+    for report in reports:
+        height, width = report["size"]
+        moves = report["moves"] if report["moves"] is not None and report["moves"] >= 0 else "-"
+        print(f"{report['status']:<4}  {report['name']:<24} {height:>5}x{width:<6} moves={moves:<8} {report['seconds'] * 1000:8.1f} ms", file=file)
+        for issue in report["issues"]:
+            print(f"      - {issue}", file=file)
+
+    failed = sum(report["status"] == "FAIL" for report in reports)
+    print(f"{len(reports)} mazes checked, {failed} failed, in {total_seconds:.2f} s", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that mazes are consistent and solvable from start to exit.")
+    parser.add_argument("targets", nargs="*", help="names from utils.LEVELS or maze text files (default: every level)")
+    parser.add_argument("--start", type=parse_position, help="start position y,x for every target")
+    parser.add_argument("--exit", type=parse_position, dest="exit_position", help="exit position y,x for every target")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: one per CPU)")
+    arguments = parser.parse_args(argv)
+
+    jobs = build_jobs(arguments.targets, arguments.start, arguments.exit_position)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=arguments.workers) as pool:
+        reports = list(pool.map(validate_maze, jobs))
+    print_report(reports, time.perf_counter() - started)
+
+    return 1 if any(report["status"] == "FAIL" for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
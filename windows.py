@@ -1,10 +1,77 @@
 import curses
-import time
 import curses.textpad
 from input_handler import InputHandler
 
 
+class Typewriter:
+    def __init__(self, window, text, start_y, start_x, delay):
+        """
+        Initialize the Typewriter class.
+
+        Reveals text according to the game time elapsed since the first reveal, one character per delay.
+        Characters revealed together are drawn with one addstr per row, and nothing is refreshed here,
+        so the caller decides how often frames are sent (at most once per frame).
+
+        :param window: is the curses window to type in.
+        :param text: is the text to type; '\n' starts a new line at start_x.
+        :param start_y: is the starting y position in the window.
+        :param start_x: is the starting x position in the window.
+        :param delay: is the delay (in seconds) between each character; 0 reveals everything at once.
+        """
+        self.window = window
+        self.delay = delay
+        self.cells = []  # (y, x, char) of every visible character, in typing order
+        y, x = start_y, start_x
+        for char in text:
+            if char == '\n':
+                y, x = y + 1, start_x
+            else:
+                self.cells.append((y, x, char))
+                x += 1
+        self.shown = 0
+        self.started = None
+
+    @property
+    def finished(self):
+        return self.shown == len(self.cells)
+
+    def reveal(self, now):
+        """
+        Draw every character due by now.
+
+        :param now: is the game-clock time in seconds to reveal up to, as returned by TickScheduler.time().
+        :return: is the number of characters drawn.
+        """
+        if self.started is None:
+            self.started = now
+        if self.delay <= 0:
+            return self.finish()
+        return self._draw_to(min(len(self.cells), int((now - self.started) / self.delay) + 1))
+
+    def finish(self):
+        """
+        Draw the rest of the text at once, when the player skips the typing.
+
+        :return: is the number of characters drawn.
+        """
+        return self._draw_to(len(self.cells))
+
+    def _draw_to(self, target):
+        first = self.shown
+        index = first
+        while index < target:
+            y, x, _ = self.cells[index]
+            end = index + 1
+            while end < target and self.cells[end][0] == y and self.cells[end][1] == x + end - index:
+                end += 1
+            self.window.addstr(y, x, "".join(char for _, _, char in self.cells[index:end]))
+            index = end
+        self.shown = max(first, target)
+        return self.shown - first
+
+
 class Windows:
+    overlay = False  # True for windows shown on top of a scene, which is repainted under them after a resize
 
     def __init__(self, stdscr: curses.window, input_handler: InputHandler):
         """
@@ -18,6 +85,41 @@ class Windows:
         self.stdscrheight, self.stdscrwidth = self.stdscr.getmaxyx()  # Get dimensions of the main screen
         self.middle_height = self.stdscrheight // 2  # Calculate the middle height of the screen
         self.middle_width = self.stdscrwidth // 2  # Calculate the middle width of the screen
+        self.draw_calls = 0  # Number of curses draw calls issued by this window's batched draws
+        input_handler.windows.add(self)  # Re-laid out when the terminal is resized
+
+    def relayout(self, height, width):
+        """
+        Recompute the cached screen geometry after the terminal was resized.
+        Subclasses move their curses windows here; nothing is rebuilt.
+
+        :param height: is the new terminal height.
+        :param width: is the new terminal width.
+        """
+        self.stdscrheight, self.stdscrwidth = height, width
+        self.middle_height = height // 2
+        self.middle_width = width // 2
+
+    def repaint(self):
+        """
+        Queue this window to be redrawn from its existing contents after the screen was cleared.
+        """
+        window = getattr(self, 'window', None)
+        if window is not None:
+            window.touchwin()
+            self.input_handler.scheduler.mark_window(window)
+
+    def move_window(self, window, y, x):
+        """
+        Move a curses window to (y, x), kept inside the screen so mvwin cannot fail.
+
+        :return: is the (y, x) position the window was moved to.
+        """
+        height, width = window.getmaxyx()
+        y = max(0, min(y, self.stdscrheight - height))
+        x = max(0, min(x, self.stdscrwidth - width))
+        window.mvwin(y, x)
+        return y, x
 
     def handle_input(self):
         """
@@ -39,30 +141,34 @@ class Windows:
             window.refresh()
 
     @staticmethod
-    def type_text(window: curses.window, text, start_y, start_x, delay=0.09):
+    async def type_text(window: curses.window, text, start_y, start_x, ticks, delay=0.09, skip=None):
         """
         Simulate typing text in the given window with a delay between each character.
+        Characters are revealed by game time, and the window is refreshed at most once per tick,
+        only when new characters were revealed.
 
         :param window: is the curses window object to print the text in.
         :param text: is the text to be typed.
         :param start_y: is the starting y position in the window.
         :param start_x: is the starting x position in the window.
+        :param ticks: is the game_loop.TickScheduler the game runs on.
         :param delay: is the delay (in seconds) between each character.
+        :param skip: is an optional function returning True when the player asks to show the whole text at once.
         """
-        y, x = start_y, start_x  # Initialize current position
-        
-        for char in text:
-            if char == '\n':  # Move to next line when encountering a newline character
-                y += 1
-                x = start_x  # Reset x position to the starting x
-            else:
-                window.addch(y, x, char)
-                x += 1  # Move to the next character position horizontally
-            
-            window.refresh()
-            time.sleep(delay)
+        typewriter = Typewriter(window, text, start_y, start_x, delay)
+        while True:
+            if typewriter.reveal(ticks.time()):
+                window.refresh()
+            if typewriter.finished:
+                return
+            await ticks.next_tick()
+            if skip is not None and skip():
+                typewriter.finish()
+                window.refresh()
+                return
 
 
+@InputHandler.register(InputHandler.handle_menu_input)
 class Menu_Window(Windows):
     _instance = None
 
@@ -151,16 +257,31 @@ class Menu_Window(Windows):
             else:
                 self.stdscr.addstr(y, x, row)
 
-    def render(self):
+    def repaint(self):
         """
-        Clear the screen and render the closed scroll, open scroll, and menu.
+        Redraw the open scroll and the menu on the cleared screen.
         """
-        self.clear_and_refresh()
+        self.render_open_scroll()
+        self.render_menu()
 
-        self.render_closed_scroll()
-        self.stdscr.refresh()
-        time.sleep(0.2)  # Pause for 0.2 seconds to show the closed scroll
+    def render(self):
+        """
+        Clear the screen and render the open scroll and the menu.
+        """
         self.stdscr.clear()
         self.render_open_scroll()
         self.render_menu()
         self.stdscr.refresh()
+
+    async def unroll(self, ticks):
+        """
+        Show the closed scroll for 0.2 seconds of game time, then open it on the menu, without blocking the game loop.
+
+        :param ticks: is the game_loop.TickScheduler the game runs on.
+        """
+        self.clear_and_refresh()
+
+        self.render_closed_scroll()
+        self.stdscr.refresh()
+        await ticks.sleep(0.2)  # Show the closed scroll
+        self.render()
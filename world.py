@@ -0,0 +1,266 @@
+import random
+import time
+from entity import Entity
+from flow import FlowField
+
+# Size of one spatial hash bucket, in maze cells. The 18 x 64 viewport spans at most 2 x 3 buckets.
+BUCKET_HEIGHT = 16
+BUCKET_WIDTH = 32
+
+# Entities within this many buckets of the viewport are updated every tick
+ACTIVE_MARGIN = 1
+
+# Entities further away are updated in turns, this many per tick, so a tick costs the same with 10 or 10,000
+DORMANT_BATCH = 32
+
+# Moves a behaviour can return, as (dy, dx)
+STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def wanderer(seed=None):
+    """
+    A behaviour that takes a random step, or stands still, each time it is updated.
+
+    :param seed: is the seed of its random generator, so a replayed session moves it the same way.
+    :return: is the behaviour, called with (entity, world) and returning a (dy, dx) step or None.
+    """
+    rng = random.Random(seed)
+
+    def behave(entity, world):
+        step = rng.choice(STEPS + (None,))
+        if step is not None and world.is_free(entity.y + step[0], entity.x + step[1]):
+            return step
+        return None
+    return behave
+
+
+def pursuer():
+    """
+    A behaviour that steps towards the player along the world's shared flow field, or stands still when the
+    player is out of its reach or the way is taken. Costs the same O(1) lookup however far the player is.
+
+    :return: is the behaviour, called with (entity, world) and returning a (dy, dx) step or None.
+    """
+    def behave(entity, world):
+        step = world.flow.next_step(entity.y, entity.x)
+        if step is not None and world.is_free(entity.y + step[0], entity.x + step[1]):
+            return step
+        return None
+    return behave
+
+
+class World:
+    def __init__(self, window, bucket_height=BUCKET_HEIGHT, bucket_width=BUCKET_WIDTH, dormant_batch=DORMANT_BATCH):
+        """
+        Initialize the World class.
+
+        Holds the NPCs and enemies of a Battle_Window besides the player. A dict of occupied cells answers
+        "who is here" in O(1), and a uniform grid of buckets (a spatial hash) answers "who is near" and
+        "who is on screen" by only visiting the buckets a query overlaps. Each tick, the entities around the
+        viewport are updated and the rest take turns, a fixed batch per tick; only entities inside the
+        viewport are drawn.
+
+        :param window: is the Battle_Window the entities live in.
+        :param bucket_height: is the number of rows in each bucket.
+        :param bucket_width: is the number of columns in each bucket.
+        :param dormant_batch: is the number of entities away from the viewport updated per tick.
+        """
+        self.window = window
+        self.maze = window.maze
+        self.bucket_height = bucket_height
+        self.bucket_width = bucket_width
+        self.dormant_batch = dormant_batch
+        self.behaviours = {}  # Entity -> behaviour, or None for entities that never move by themselves
+        self.updated = 0  # Entities updated on the last tick
+        self._cells = {}  # (y, x) -> Entity standing there
+        self._buckets = {}  # (bucket_y, bucket_x) -> set of Entity
+        self._roster = []  # Every entity, in turn order for the dormant updates
+        self._turn = 0  # Position of the next dormant entity in the roster
+        self._drawn = {}  # Entity -> (y, x) cell it was last drawn on
+        self._flow = None
+        # Time the last tick spent refreshing the flow field, running behaviours and drawing
+        self.timings = {"flow_seconds": 0.0, "behaviour_seconds": 0.0, "draw_seconds": 0.0}
+
+    def __len__(self):
+        return len(self.behaviours)
+
+    @property
+    def flow(self):
+        """
+        The FlowField towards the player shared by every pursuer, built the first time one asks for it
+        and refreshed once per tick from then on.
+        """
+        if self._flow is None:
+            self._flow = FlowField(self.maze)
+            self._flow.update(self.window.entity.y, self.window.entity.x)
+        return self._flow
+
+    def spawn(self, y, x, char="&", behaviour=None):
+        """
+        Create an entity on a free cell of the maze.
+
+        :param char: is the glyph it is drawn with.
+        :param behaviour: is called with (entity, world) when it is updated, and returns a (dy, dx) step or None.
+        :return: is the new Entity.
+        """
+        if not self.is_free(y, x):
+            raise ValueError(f"cannot spawn an entity on {(y, x)}: the cell is a wall or taken")
+        entity = Entity(self.window.window, y, x, char)
+        self.behaviours[entity] = behaviour
+        self._roster.append(entity)
+        self._cells[(y, x)] = entity
+        self._bucket(y, x).add(entity)
+        return entity
+
+    def remove(self, entity):
+        """
+        Take an entity out of the world, erasing it from the screen on the next update.
+        """
+        del self.behaviours[entity]
+        self._roster.remove(entity)
+        del self._cells[(entity.y, entity.x)]
+        self._unbucket(entity)
+
+    def entity_at(self, y, x):
+        """
+        Return the entity on (y, x), or None. O(1).
+        """
+        return self._cells.get((y, x))
+
+    def is_free(self, y, x):
+        """
+        Check whether an entity could step on (y, x): inside the maze, not a wall, not taken, not the player.
+        """
+        player = self.window.entity
+        return (0 < y < self.maze.height and 0 < x < self.maze.width and not self.window.walls.is_wall(y, x)
+                and (y, x) not in self._cells and (y, x) != (player.y, player.x))
+
+    def neighbours(self, y, x, radius=1):
+        """
+        Return the entities at most radius cells away from (y, x) on both axes, not counting one on (y, x) itself.
+        """
+        return [entity for entity in self.in_rect(y - radius, x - radius, y + radius, x + radius)
+                if (entity.y, entity.x) != (y, x)]
+
+    def in_rect(self, top, left, bottom, right):
+        """
+        Return the entities inside a rectangle of cells, bounds included, visiting only the buckets it overlaps.
+        """
+        found = []
+        for bucket_y in range(max(0, top) // self.bucket_height, max(0, bottom) // self.bucket_height + 1):
+            for bucket_x in range(max(0, left) // self.bucket_width, max(0, right) // self.bucket_width + 1):
+                for entity in self._buckets.get((bucket_y, bucket_x), ()):
+                    if top <= entity.y <= bottom and left <= entity.x <= right:
+                        found.append(entity)
+        return found
+
+    def move(self, entity, y, x):
+        """
+        Move an entity to a free cell, keeping the occupancy and the buckets up to date. Nothing is drawn.
+
+        :return: is True if the entity moved.
+        """
+        if not self.is_free(y, x):
+            return False
+        del self._cells[(entity.y, entity.x)]
+        old_bucket = (entity.y // self.bucket_height, entity.x // self.bucket_width)
+        entity.y, entity.x = y, x
+        self._cells[(y, x)] = entity
+        if (y // self.bucket_height, x // self.bucket_width) != old_bucket:
+            bucket = self._buckets[old_bucket]
+            bucket.discard(entity)
+            if not bucket:
+                del self._buckets[old_bucket]
+            self._bucket(y, x).add(entity)
+        return True
+
+    def update(self):
+        """
+        One tick: ask every entity due for an update where it goes, then move them all and draw the viewport.
+        Behaviours all see the world as it was at the start of the tick; when two pick the same cell, the
+        first one gets it. Called once per tick by the game loop.
+
+        :return: is the list of pad cells that changed.
+        """
+        started = time.perf_counter()
+        if self._flow is not None:
+            self._flow.update(self.window.entity.y, self.window.entity.x)
+        flowed = time.perf_counter()
+
+        due = self._due()
+        steps = []
+        for entity in due:
+            behaviour = self.behaviours[entity]
+            step = behaviour(entity, self) if behaviour is not None else None
+            if step is not None:
+                steps.append((entity, step))
+        for entity, (dy, dx) in steps:
+            self.move(entity, entity.y + dy, entity.x + dx)
+        self.updated = len(due)
+        behaved = time.perf_counter()
+
+        changed = self.draw()
+        self.timings = {"flow_seconds": flowed - started, "behaviour_seconds": behaved - flowed,
+                        "draw_seconds": time.perf_counter() - behaved}
+        return changed
+
+    def draw(self):
+        """
+        Draw the entities inside the viewport, and erase the ones that moved or left it since the last draw.
+        Under fog of war, only the entities the player can see are drawn.
+
+        :return: is the list of pad cells that changed.
+        """
+        pad_y, pad_x, top, left, bottom, right = self.window.viewport()
+        in_view = self.in_rect(pad_y, pad_x, pad_y + bottom - top, pad_x + right - left)
+        fov = self.window.fov
+        if fov is not None:
+            in_view = [entity for entity in in_view if fov.is_visible(entity.y, entity.x)]
+
+        pad, player = self.window.window, self.window.entity
+        changed = []
+        drawn = {entity: (entity.y, entity.x) for entity in in_view}
+        for entity, position in self._drawn.items():
+            if drawn.get(entity) != position:
+                changed.append(position)
+                if position != (player.y, player.x) and position not in self._cells:
+                    pad.addch(position[0], position[1], " ")  # Entities only ever stand on open floor
+        for entity, position in drawn.items():
+            entity.draw()  # Every frame: fog of war may have redrawn the cell under it
+            if self._drawn.get(entity) != position:
+                changed.append(position)
+        self._drawn = drawn
+        return changed
+
+    def _due(self):
+        """
+        Return the entities to update this tick: all of those around the viewport, and the next batch of the others.
+        """
+        pad_y, pad_x, top, left, bottom, right = self.window.viewport()
+        margin_y, margin_x = ACTIVE_MARGIN * self.bucket_height, ACTIVE_MARGIN * self.bucket_width
+        active = self.in_rect(pad_y - margin_y, pad_x - margin_x,
+                              pad_y + bottom - top + margin_y, pad_x + right - left + margin_x)
+        if len(active) == len(self._roster):
+            return active
+
+        due, seen = list(active), set(active)
+        count = min(self.dormant_batch, len(self._roster) - len(active))
+        while count:
+            self._turn %= len(self._roster)
+            entity = self._roster[self._turn]
+            self._turn += 1
+            if entity not in seen:
+                due.append(entity)
+                seen.add(entity)
+                count -= 1
+        return due
+
+    def _bucket(self, y, x):
+        return self._buckets.setdefault((y // self.bucket_height, x // self.bucket_width), set())
+
+    def _unbucket(self, entity):
+        key = (entity.y // self.bucket_height, entity.x // self.bucket_width)
+        bucket = self._buckets[key]
+        bucket.discard(entity)
+        if not bucket:
+            del self._buckets[key]